@@ -0,0 +1,61 @@
+"""
+Benchmark of model compaction: size, latency and accuracy of the compact model against the original.
+
+Trains the fixed model on a preprocessed synthetic dataset of N rows (see
+bench_preprocessing.make_synthetic) with --n-estimators trees, then compacts it once per
+--epsilons value (leaf_epsilon, with min_tree_contribution at half of it) and reports what each
+actually achieved: the share of nodes removed, trees dropped and subtrees collapsed, the largest
+probability change, AUC / F1 on the test split, single-row and batch booster latency, and the
+pickled artifact size with and without compression. Epsilon 0 only removes subtrees whose leaves
+are identical, so that row shows the effect of the rewrite itself (and of --dtype).
+
+Usage: python -m benchmarks.bench_compaction [--rows 200000] [--n-estimators 300] [--epsilons 0 0.005 0.01 0.02] [--dtype float32]
+"""
+import argparse
+import json
+import logging
+
+from src.preprocessing import DataPreprocessor
+from src.model_training import ModelTrainer
+from src.compaction import compact_pipeline
+from benchmarks.bench_preprocessing import make_synthetic
+from benchmarks.common import run_metadata
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Compact model against the original")
+    parser.add_argument("--rows" , type = int , default = 200_000)
+    parser.add_argument("--n-estimators" , type = int , default = 300)
+    parser.add_argument("--epsilons" , type = float , nargs = "+" , default = [0.0 , 0.005 , 0.01 , 0.02])
+    parser.add_argument("--dtype" , choices = ("float32" , "float16") , default = "float32")
+    parser.add_argument("--seed" , type = int , default = 42)
+    args = parser.parse_args()
+
+    for name in ("src.preprocessing" , "src.model_training" , "src.compaction") :
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    trainer = ModelTrainer(DataPreprocessor(make_synthetic(args.rows , args.seed)).preprocess()).transform_data()
+    model = trainer._default_model()
+    model.set_params(n_estimators = args.n_estimators)
+    trainer._fit_evaluate(model)
+
+    results = []
+    for epsilon in args.epsilons :
+        _ , report = compact_pipeline(trainer.pipe , trainer.X_test , trainer.y_test , leaf_epsilon = epsilon ,
+                                      min_tree_contribution = epsilon / 2 , dtype = args.dtype)
+        original , compact , stats = report["original"] , report["compact"] , report["compaction"]
+        print(f"epsilon {epsilon} | nodes {stats['nodes'][0]:,} -> {stats['nodes'][1]:,} (-{stats['nodes_removed_pct']}%)"
+              f" | trees dropped {stats['dropped_trees']} , subtrees collapsed {stats['collapsed_subtrees']}"
+              f" | max proba diff {report['max_abs_proba_diff']:.5f}"
+              f" | AUC {original['roc_auc']:.4f} -> {compact['roc_auc']:.4f} | F1 {original['f1']:.4f} -> {compact['f1']:.4f}"
+              f" | 1 row {original['single_row_us']} -> {compact['single_row_us']} us"
+              f" | batch {original['batch_per_row_us']} -> {compact['batch_per_row_us']} us/row"
+              f" | size {original['size_bytes']:,} -> {compact['size_bytes']:,} B"
+              f" ({original['compressed_size_bytes']:,} -> {compact['compressed_size_bytes']:,} B compressed) | accepted {report['accepted']}" , flush = True)
+        results.append({"leaf_epsilon" : epsilon , **report})
+
+    print(json.dumps({"meta" : run_metadata() , "rows" : args.rows , "n_estimators" : args.n_estimators , "dtype" : args.dtype , "results" : results} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark of the compact schema dtypes (schema/dtypes.py) against pandas' inferred dtypes.
+
+Writes a synthetic raw CSV of N rows (see bench_preprocessing.make_synthetic), then for each
+mode reads it, reports the memory of the raw frame, runs DataPreprocessor.preprocess() and
+reports the time and the memory of the cleaned frame. The cleaned data written to CSV must be
+identical in both modes.
+
+  inferred : pd.read_csv(path)                      int64/float64 numbers, object strings
+  compact  : pd.read_csv(path , dtype = RAW_DTYPES) Int8/Int16/Int32 numbers, category strings
+
+Usage: python -m benchmarks.bench_dtypes [--rows 1000000]
+"""
+import argparse
+import filecmp
+import json
+import logging
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from src.preprocessing import DataPreprocessor
+from schema.dtypes import RAW_DTYPES , memory_report
+from benchmarks.bench_preprocessing import make_synthetic
+from benchmarks.common import run_metadata
+
+MODES = {
+    "inferred" : None ,
+    "compact" : RAW_DTYPES ,
+}
+
+
+def run_mode(input_path : str , output_path : str , dtype) -> dict :
+    started = time.perf_counter()
+    df = pd.read_csv(input_path , dtype = dtype)
+    read_seconds = time.perf_counter() - started
+    raw_mb = memory_report(df)["total_mb"]
+
+    started = time.perf_counter()
+    cleaned = DataPreprocessor(df).preprocess()
+    preprocess_seconds = time.perf_counter() - started
+
+    cleaned.to_csv(output_path , index = False)
+    return {
+        "read_seconds" : round(read_seconds , 3) ,
+        "raw_mb" : raw_mb ,
+        "preprocess_seconds" : round(preprocess_seconds , 3) ,
+        "cleaned_mb" : memory_report(cleaned)["total_mb"] ,
+        "cleaned_columns_mb" : memory_report(cleaned)["columns"] ,
+    }
+
+
+def bench(n_rows : int , seed : int , workdir : str) -> dict :
+    input_path = os.path.join(workdir , f"raw_{n_rows}.csv")
+    make_synthetic(n_rows , seed).to_csv(input_path , index = False)
+
+    result = {"rows" : n_rows}
+    outputs = {}
+    for mode , dtype in MODES.items() :
+        outputs[mode] = os.path.join(workdir , f"cleaned_{mode}_{n_rows}.csv")
+        result[mode] = run_mode(input_path , outputs[mode] , dtype)
+
+    if not filecmp.cmp(outputs["inferred"] , outputs["compact"] , shallow = False) :
+        raise AssertionError("Cleaned data differs between inferred and compact dtypes")
+
+    result["raw_shrink"] = round(result["inferred"]["raw_mb"] / result["compact"]["raw_mb"] , 2)
+    result["cleaned_shrink"] = round(result["inferred"]["cleaned_mb"] / result["compact"]["cleaned_mb"] , 2)
+    result["preprocess_speedup"] = round(result["inferred"]["preprocess_seconds"] / result["compact"]["preprocess_seconds"] , 2)
+    return result
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Compact schema dtypes against pandas' inferred dtypes")
+    parser.add_argument("--rows" , type = int , nargs = "+" , default = [1_000_000])
+    parser.add_argument("--seed" , type = int , default = 42)
+    args = parser.parse_args()
+
+    logging.getLogger("src.preprocessing").setLevel(logging.WARNING)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir :
+        for n_rows in args.rows :
+            result = bench(n_rows , args.seed , workdir)
+            print(f"{n_rows:>11,} rows | raw {result['inferred']['raw_mb']} MB -> {result['compact']['raw_mb']} MB"
+                  f" | cleaned {result['inferred']['cleaned_mb']} MB -> {result['compact']['cleaned_mb']} MB"
+                  f" | preprocess {result['inferred']['preprocess_seconds']}s -> {result['compact']['preprocess_seconds']}s" ,
+                  flush = True)
+            results.append(result)
+
+    print(json.dumps({"meta" : run_metadata() , "results" : results} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,82 @@
+"""
+Latency of /explain against /predict on the serving model.
+
+Scores generated requests (validated through UserInput, as the API does) at several batch sizes
+through both hot paths, bypassing the cache:
+
+  predict : FeatureTransform -> CompiledPipeline encode -> inplace_predict
+  explain : the predict path, then one tree SHAP booster call on the encoded batch
+
+The probabilities of both paths must be identical, and every explanation must add up to its row's
+log-odds. Reports the median latency per call of each path and their ratio.
+
+Usage: python -m benchmarks.bench_explain [--batch-sizes 1 64 1000] [--repeat 50]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from predict import registry , _predict_proba , _explain
+from schema.user_input import UserInput
+from benchmarks.common import generate_payloads , run_metadata
+
+
+def median_seconds(fn , repeat : int) -> float :
+    timings = np.empty(repeat)
+    for i in range(repeat) :
+        started = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - started
+    return float(np.median(timings))
+
+
+def bench(model , payloads : list[dict] , repeat : int) -> dict :
+    expected = _predict_proba(model , payloads)
+    pred_proba , contributions , bias = _explain(model , payloads)
+
+    worst = float(np.abs(pred_proba - expected).max())
+    if not np.array_equal(pred_proba , expected) :
+        raise AssertionError(f"Explained probabilities differ from /predict (max abs diff {worst})")
+    p = np.clip(expected[: , 1].astype(np.float64) , 1e-7 , 1 - 1e-7)
+    log_odds = np.log(p / (1 - p))
+    additivity = float(np.abs(contributions.sum(axis = 1) + bias - log_odds).max())
+    if additivity > 1e-3 :
+        raise AssertionError(f"Contributions do not add up to the log-odds (max abs diff {additivity})")
+
+    predict_seconds = median_seconds(lambda : _predict_proba(model , payloads) , repeat)
+    explain_seconds = median_seconds(lambda : _explain(model , payloads) , repeat)
+    return {
+        "batch_size" : len(payloads) ,
+        "predict_ms" : round(predict_seconds * 1000 , 3) ,
+        "explain_ms" : round(explain_seconds * 1000 , 3) ,
+        "explain_per_row_us" : round(explain_seconds / len(payloads) * 1e6 , 1) ,
+        "ratio" : round(explain_seconds / predict_seconds , 2) ,
+        "max_proba_diff" : worst ,
+        "max_additivity_error" : additivity ,
+    }
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Latency of /explain against /predict")
+    parser.add_argument("--batch-sizes" , type = int , nargs = "+" , default = [1 , 64 , 1000])
+    parser.add_argument("--repeat" , type = int , default = 50)
+    parser.add_argument("--seed" , type = int , default = 42)
+    args = parser.parse_args()
+
+    model = registry.current
+    results = []
+    for batch_size in args.batch_sizes :
+        # THE PAYLOADS ARE API-SHAPED (Passport / OwnCar AS Yes / No); THE HOT PATHS TAKE VALIDATED RECORDS
+        records = [UserInput.model_validate(p).to_record() for p in generate_payloads(batch_size , seed = args.seed)]
+        result = bench(model , records , args.repeat)
+        print(f"{batch_size:>6} rows | predict {result['predict_ms']} ms | explain {result['explain_ms']} ms "
+              f"({result['explain_per_row_us']} us/row) | {result['ratio']}x" , flush = True)
+        results.append(result)
+
+    print(json.dumps({"meta" : run_metadata() , "model" : model.version , "results" : results} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark of ModelTrainer.retrain (warm start) against a full retrain after a daily delta.
+
+Preprocesses a synthetic raw dataset (see bench_preprocessing.make_synthetic) of --rows history
+rows plus --delta new rows. A base model is trained on the history, then the delta arrives:
+
+  full        : ModelTrainer.train on history + delta, from scratch
+  incremental : ModelTrainer.retrain on the delta only, --rounds more rounds on the base model
+
+Reports wall time, the gate outcome and the F1 of both models on the same held-out rows.
+
+Usage: python -m benchmarks.bench_incremental [--rows 1000000] [--delta 20000] [--rounds 50]
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+import joblib
+import pandas as pd
+from sklearn.metrics import f1_score
+
+from src.preprocessing import DataPreprocessor
+from src.model_training import ModelTrainer
+from benchmarks.bench_preprocessing import make_synthetic
+from benchmarks.common import run_metadata
+
+
+def bench(n_rows : int , n_delta : int , n_rounds : int , seed : int , workdir : str) -> dict :
+    cleaned = DataPreprocessor(make_synthetic(n_rows + 2 * n_delta , seed)).preprocess().reset_index(drop = True)
+    history , delta , holdout = cleaned.iloc[: n_rows] , cleaned.iloc[n_rows : n_rows + n_delta] , cleaned.iloc[n_rows + n_delta :]
+
+    base_path = os.path.join(workdir , "base.pkl")
+    ModelTrainer(history.copy()).transform_data().train(base_path)
+
+    def holdout_f1(path : str) -> float :
+        pipe = joblib.load(path)
+        return round(float(f1_score(holdout["ProdTaken"] , pipe.predict(holdout.drop(columns = "ProdTaken")))) , 4)
+
+    result = {"rows" : n_rows , "delta" : n_delta , "rounds" : n_rounds , "base_f1" : holdout_f1(base_path)}
+
+    full_path = os.path.join(workdir , "full.pkl")
+    started = time.perf_counter()
+    ModelTrainer(pd.concat([history , delta] , ignore_index = True)).transform_data().train(full_path)
+    result["full"] = {"seconds" : round(time.perf_counter() - started , 2) , "f1" : holdout_f1(full_path)}
+
+    incremental_path = os.path.join(workdir , "incremental.pkl")
+    started = time.perf_counter()
+    trainer = ModelTrainer(delta.copy()).transform_data()
+    trainer.retrain(base_path , incremental_path , n_rounds = n_rounds)
+    result["incremental"] = {"seconds" : round(time.perf_counter() - started , 2) , "promoted" : bool(trainer.promoted) ,
+                             "f1" : holdout_f1(incremental_path if trainer.promoted else base_path)}
+
+    result["speedup"] = round(result["full"]["seconds"] / result["incremental"]["seconds"] , 1)
+    return result
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Warm-start retraining on a delta against a full retrain")
+    parser.add_argument("--rows" , type = int , nargs = "+" , default = [1_000_000])
+    parser.add_argument("--delta" , type = int , default = 20_000)
+    parser.add_argument("--rounds" , type = int , default = 50)
+    parser.add_argument("--seed" , type = int , default = 42)
+    args = parser.parse_args()
+
+    for name in ("src.preprocessing" , "src.model_training") :
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir :
+        for n_rows in args.rows :
+            result = bench(n_rows , args.delta , args.rounds , args.seed , workdir)
+            print(f"{n_rows:>11,} rows + {args.delta:,} | full {result['full']['seconds']}s (F1 {result['full']['f1']})"
+                  f" | incremental {result['incremental']['seconds']}s (F1 {result['incremental']['f1']}, promoted: {result['incremental']['promoted']})"
+                  f" | {result['speedup']}x" , flush = True)
+            results.append(result)
+
+    print(json.dumps({"meta" : run_metadata() , "results" : results} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,88 @@
+"""
+Parity check and latency benchmark for the fused inference engine.
+
+Replays rows from the cleaned training data through both the sklearn pipeline
+(predict + predict_proba, the original serving path) and CompiledPipeline, fails
+if any probability or class differs, then reports per-request latency.
+
+Usage: python -m benchmarks.bench_inference [--rows 1000] [--repeat 2000]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from predict import registry
+from inference import CompiledPipeline
+
+DATA_PATH = "Data/cleaned/cleaned_Travel.csv"
+
+
+def load_records(n_rows : int) -> list[dict] :
+    df = pd.read_csv(DATA_PATH).drop(columns = ["ProdTaken"])
+    return df.head(n_rows).to_dict("records")
+
+
+def check_parity(engine : CompiledPipeline , model_pipeline , records : list[dict]) -> dict :
+    df = pd.DataFrame(records)
+    expected_proba = model_pipeline.predict_proba(df)
+    expected_class = model_pipeline.predict(df)
+
+    batch_proba = engine.predict_proba(records)
+    single_proba = np.vstack([engine.predict_proba_one(r) for r in records])
+
+    for name , proba in (("batch" , batch_proba) , ("single" , single_proba)) :
+        if not np.array_equal(proba , expected_proba) :
+            worst = float(np.abs(proba - expected_proba).max())
+            raise AssertionError(f"{name} probabilities differ from the sklearn pipeline (max abs diff {worst})")
+        if not np.array_equal(np.argmax(proba , axis = 1) , expected_class) :
+            raise AssertionError(f"{name} classes differ from the sklearn pipeline")
+
+    return {"rows" : len(records) , "parity" : "exact"}
+
+
+def time_per_call(fn , records : list[dict] , repeat : int) -> dict :
+    timings = np.empty(repeat)
+    for i in range(repeat) :
+        record = records[i % len(records)]
+        start = time.perf_counter()
+        fn(record)
+        timings[i] = time.perf_counter() - start
+    timings *= 1e6
+    return {
+        "p50_us" : round(float(np.percentile(timings , 50)) , 1) ,
+        "p95_us" : round(float(np.percentile(timings , 95)) , 1) ,
+        "p99_us" : round(float(np.percentile(timings , 99)) , 1) ,
+        "mean_us" : round(float(timings.mean()) , 1) ,
+    }
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--rows" , type = int , default = 1000 , help = "rows replayed for the parity check")
+    parser.add_argument("--repeat" , type = int , default = 2000 , help = "timed single-row calls per engine")
+    args = parser.parse_args()
+
+    records = load_records(args.rows)
+    model_pipeline = registry.current.pipeline
+    engine = CompiledPipeline(model_pipeline)
+
+    def sklearn_path(record) :
+        df = pd.DataFrame([record])
+        model_pipeline.predict(df)
+        model_pipeline.predict_proba(df)
+
+    results = {
+        "parity" : check_parity(engine , model_pipeline , records) ,
+        "sklearn_pipeline" : time_per_call(sklearn_path , records , args.repeat) ,
+        "compiled_pipeline" : time_per_call(engine.predict_proba_one , records , args.repeat) ,
+    }
+    results["speedup_p50"] = round(results["sklearn_pipeline"]["p50_us"] / results["compiled_pipeline"]["p50_us"] , 1)
+
+    print(json.dumps(results , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark of DataIngestion.load_from_s3 against the previous single-GET implementation.
+
+Runs against LocalS3, an in-process S3 stand-in that serves a synthetic raw CSV of N rows
+(see bench_preprocessing.make_synthetic) with a fixed latency per request and a bandwidth
+cap per connection, so parallel byte ranges behave as they would against a remote bucket.
+
+  legacy : one get_object, Body.read(), BytesIO, pd.read_csv
+  cold   : parallel ranges parsed while they stream in, written to an empty local cache
+  warm   : same object again, read from the local cache after a HEAD (no download)
+
+All three frames must be equal. Reports wall time, the tracemalloc peak and GET requests.
+
+Usage: python -m benchmarks.bench_ingestion [--rows 1000000] [--latency-ms 30] [--mbps 50]
+"""
+import argparse
+import hashlib
+import io
+import json
+import logging
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+from src.data_ingestion import DataIngestion
+from schema.dtypes import RAW_DTYPES
+from benchmarks.bench_preprocessing import make_synthetic
+from benchmarks.common import run_metadata
+
+
+class LocalS3 :
+    """Minimal S3 client stand-in: head_object, get_object (Range, IfMatch) and list_objects_v2 over in-memory objects."""
+
+    def __init__(self , objects : dict , latency_s : float = 0.0 , bytes_per_s : float = None) :
+        self.objects = objects
+        self.latency_s = latency_s
+        self.bytes_per_s = bytes_per_s
+        self.gets = 0
+        self._lock = threading.Lock()
+
+    def _etag(self , key : str) -> str :
+        return '"' + hashlib.md5(self.objects[key]).hexdigest() + '"'
+
+    def head_object(self , Bucket : str , Key : str) -> dict :
+        time.sleep(self.latency_s)
+        return {"ETag" : self._etag(Key) , "ContentLength" : len(self.objects[Key])}
+
+    def list_objects_v2(self , Bucket : str , Prefix : str = "" , ContinuationToken : str = None) -> dict :
+        time.sleep(self.latency_s)
+        contents = [{"Key" : key , "Size" : len(data) , "ETag" : self._etag(key)} for key , data in sorted(self.objects.items()) if key.startswith(Prefix)]
+        return {"Contents" : contents , "IsTruncated" : False}
+
+    def get_object(self , Bucket : str , Key : str , Range : str = None , IfMatch : str = None) -> dict :
+        with self._lock :
+            self.gets += 1
+        if IfMatch is not None and IfMatch != self._etag(Key) :
+            raise ValueError("PreconditionFailed")
+        data = self.objects[Key]
+        if Range is not None :
+            start , end = Range.removeprefix("bytes=").split("-")
+            data = data[int(start) : int(end) + 1]
+        time.sleep(self.latency_s + (len(data) / self.bytes_per_s if self.bytes_per_s else 0))
+        return {"Body" : io.BytesIO(data) , "ETag" : self._etag(Key) , "ContentLength" : len(data)}
+
+
+def legacy_load(s3 , bucket : str , key : str) -> pd.DataFrame :
+    obj = s3.get_object(Bucket = bucket , Key = key)
+    return pd.read_csv(io.BytesIO(obj["Body"].read()) , dtype = RAW_DTYPES)
+
+
+def measure(fn) -> tuple :
+    tracemalloc.start()
+    try :
+        started = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - started
+        return result , {"seconds" : round(seconds , 3) , "peak_mb" : round(tracemalloc.get_traced_memory()[1] / 2**20 , 1)}
+    finally :
+        tracemalloc.stop()
+
+
+def bench(n_rows : int , seed : int , latency_s : float , bytes_per_s : float , part_size : int , workers : int) -> dict :
+    body = make_synthetic(n_rows , seed).to_csv(index = False).encode()
+    s3 = LocalS3({"raw/travel.csv" : body} , latency_s , bytes_per_s)
+
+    result = {"rows" : n_rows , "object_mb" : round(len(body) / 2**20 , 1)}
+    legacy_df , result["legacy"] = measure(lambda : legacy_load(s3 , "bench" , "raw/travel.csv"))
+    del body
+
+    with tempfile.TemporaryDirectory() as cache_dir :
+        ingestion = DataIngestion(s3_client = s3 , cache_dir = cache_dir , part_size = part_size , max_workers = workers)
+        ingestion.bucket_name , ingestion.file_key = "bench" , "raw/travel.csv"
+
+        for mode in ("cold" , "warm") :
+            gets = s3.gets
+            df , result[mode] = measure(ingestion.load_from_s3)
+            result[mode]["gets"] = s3.gets - gets
+            pd.testing.assert_frame_equal(df , legacy_df)
+            del df
+
+    result["cold_speedup"] = round(result["legacy"]["seconds"] / result["cold"]["seconds"] , 2)
+    result["warm_speedup"] = round(result["legacy"]["seconds"] / result["warm"]["seconds"] , 2)
+    return result
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Parallel, cached S3 ingestion against a single GET")
+    parser.add_argument("--rows" , type = int , nargs = "+" , default = [1_000_000])
+    parser.add_argument("--seed" , type = int , default = 42)
+    parser.add_argument("--latency-ms" , type = float , default = 30.0 , help = "time to first byte per request")
+    parser.add_argument("--mbps" , type = float , default = 50.0 , help = "bandwidth per connection in MB/s")
+    parser.add_argument("--part-size-mb" , type = float , default = 8.0)
+    parser.add_argument("--workers" , type = int , default = 8)
+    args = parser.parse_args()
+
+    logging.getLogger("src.data_ingestion").setLevel(logging.WARNING)
+
+    results = []
+    for n_rows in args.rows :
+        result = bench(n_rows , args.seed , args.latency_ms / 1000 , args.mbps * 2**20 , int(args.part_size_mb * 2**20) , args.workers)
+        print(f"{n_rows:>11,} rows ({result['object_mb']} MB) | legacy {result['legacy']['seconds']}s {result['legacy']['peak_mb']} MB"
+              f" | cold {result['cold']['seconds']}s {result['cold']['peak_mb']} MB | warm {result['warm']['seconds']}s"
+              f" ({result['warm']['gets']} GETs)" , flush = True)
+        results.append(result)
+
+    print(json.dumps({"meta" : run_metadata() , "results" : results} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
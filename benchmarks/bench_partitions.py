@@ -0,0 +1,95 @@
+"""
+Benchmark of DataIngestion over a partitioned source: sequential against concurrent reads.
+
+Splits a synthetic raw CSV of N rows (see bench_preprocessing.make_synthetic) into one file per
+day, gzip-compressing every other day, and serves them from LocalS3 with a fixed latency per
+request and a bandwidth cap per connection. Partitions are then read with 1 worker and with
+--workers, and once more pruned to the last --recent-days days, as a retraining run would.
+
+The sequential and concurrent frames must be equal. Reports wall time and rows per second.
+
+Usage: python -m benchmarks.bench_partitions [--rows 1000000] [--days 30] [--workers 8]
+"""
+import argparse
+import gzip
+import json
+import logging
+import time
+from datetime import date , timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.data_ingestion import DataIngestion
+from src.data_sources import CompressedSource , S3PrefixSource
+from benchmarks.bench_ingestion import LocalS3
+from benchmarks.bench_preprocessing import make_synthetic
+from benchmarks.common import run_metadata
+
+
+def make_partitions(n_rows : int , days : int , seed : int) -> dict :
+    """{key: bytes} with one CSV per day under raw/dt=YYYY-MM-DD/, odd days gzip-compressed."""
+    df = make_synthetic(n_rows , seed)
+    first = date(2024 , 1 , 1)
+    objects = {}
+    for day , part in enumerate(np.array_split(np.arange(len(df)) , days)) :
+        body = df.iloc[part].to_csv(index = False).encode()
+        key = f"raw/dt={first + timedelta(days = day)}/part-0.csv"
+        if day % 2 :
+            key , body = key + ".gz" , gzip.compress(body)
+        objects[key] = body
+    return objects
+
+
+def timed_load(s3 , workers : int , since : date = None) -> tuple :
+    ingestion = DataIngestion(s3_client = s3 , max_workers = workers , source = CompressedSource(S3PrefixSource(s3 , "bench" , "raw/")))
+    started = time.perf_counter()
+    df = ingestion.load_partitions(since)
+    seconds = time.perf_counter() - started
+    return df , {"seconds" : round(seconds , 3) , "rows_per_s" : round(len(df) / seconds)}
+
+
+def bench(n_rows : int , days : int , seed : int , latency_s : float , bytes_per_s : float , workers : int , recent_days : int) -> dict :
+    objects = make_partitions(n_rows , days , seed)
+    s3 = LocalS3(objects , latency_s , bytes_per_s)
+
+    result = {"rows" : n_rows , "partitions" : days , "object_mb" : round(sum(map(len , objects.values())) / 2**20 , 1)}
+    sequential_df , result["sequential"] = timed_load(s3 , 1)
+    concurrent_df , result["concurrent"] = timed_load(s3 , workers)
+    pd.testing.assert_frame_equal(concurrent_df , sequential_df)
+    del sequential_df , concurrent_df
+
+    since = date(2024 , 1 , 1) + timedelta(days = days - recent_days)
+    _ , result["recent"] = timed_load(s3 , workers , since)
+
+    result["speedup"] = round(result["sequential"]["seconds"] / result["concurrent"]["seconds"] , 2)
+    return result
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Sequential against concurrent reads of a partitioned source")
+    parser.add_argument("--rows" , type = int , nargs = "+" , default = [1_000_000])
+    parser.add_argument("--days" , type = int , default = 30)
+    parser.add_argument("--recent-days" , type = int , default = 3)
+    parser.add_argument("--seed" , type = int , default = 42)
+    parser.add_argument("--latency-ms" , type = float , default = 30.0 , help = "time to first byte per request")
+    parser.add_argument("--mbps" , type = float , default = 50.0 , help = "bandwidth per connection in MB/s")
+    parser.add_argument("--workers" , type = int , default = 8)
+    args = parser.parse_args()
+
+    logging.getLogger("src.data_ingestion").setLevel(logging.WARNING)
+    logging.getLogger("src.data_sources").setLevel(logging.WARNING)
+
+    results = []
+    for n_rows in args.rows :
+        result = bench(n_rows , args.days , args.seed , args.latency_ms / 1000 , args.mbps * 2**20 , args.workers , args.recent_days)
+        print(f"{n_rows:>11,} rows in {args.days} partitions ({result['object_mb']} MB) | 1 worker {result['sequential']['seconds']}s"
+              f" | {args.workers} workers {result['concurrent']['seconds']}s ({result['speedup']}x)"
+              f" | last {args.recent_days} days {result['recent']['seconds']}s" , flush = True)
+        results.append(result)
+
+    print(json.dumps({"meta" : run_metadata() , "results" : results} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark of the DataPreprocessor chain against the previous row-wise implementation.
+
+Builds a synthetic raw dataset of N rows by resampling Data/raw/sample_travel.csv (missing
+values keep their original rates, ~1% of rows are exact duplicates, and a handful of rare
+categories are injected). Both chains then run on identical copies. The outputs must be
+equal, and the script reports wall time per step and the tracemalloc peak of the full chain.
+
+Usage: python -m benchmarks.bench_preprocessing [--rows 1000000 5000000 10000000]
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing import DataPreprocessor
+from benchmarks.common import run_metadata
+
+RAW_SAMPLE_PATH = "Data/raw/sample_travel.csv"
+
+STEPS = ("clean_col_names" , "drop_duplicates" , "drop_irrelevant_cols" , "handle_missing_vals" ,
+         "convert_to_int" , "fix_known_issues" , "group_rare_categories" , "feature_engineering")
+
+
+class LegacyDataPreprocessor :
+    """The chain as it was before the vectorized rewrite (logging removed), kept as the reference."""
+
+    def __init__(self , df : pd.DataFrame) :
+        self.df = df
+
+    def clean_col_names(self) :
+        self.df.columns = [col.strip().replace(" " , '') for col in self.df.columns]
+        return self
+
+    def drop_duplicates(self) :
+        initial_rows = self.df.shape[0]
+        final_rows = self.df.drop_duplicates().shape[0]
+        if final_rows < initial_rows :
+            self.df = self.df.drop_duplicates()
+        return self
+
+    def drop_irrelevant_cols(self) :
+        if 'CustomerID' in self.df.columns :
+            self.df = self.df.drop('CustomerID' , axis = 1)
+        return self
+
+    def handle_missing_vals(self) :
+        num_cols = self.df.select_dtypes(exclude = ['object']).columns
+        cat_cols = self.df.select_dtypes(include = ['object']).columns
+        for col in num_cols :
+            if self.df[col].isnull().sum() > 0 :
+                self.df[col] = self.df[col].fillna(self.df[col].median())
+        for col in cat_cols :
+            if self.df[col].isnull().sum() > 0 :
+                self.df[col] = self.df[col].fillna(self.df[col].mode()[0])
+        return self
+
+    def convert_to_int(self) :
+        num_cols = self.df.select_dtypes(exclude = ['object']).columns
+        for col in num_cols :
+            self.df[col] = self.df[col].astype('int')
+        return self
+
+    def fix_known_issues(self) :
+        if 'Gender' in self.df.columns :
+            self.df['Gender'] = self.df['Gender'].replace('Fe Male' , 'Female')
+        if 'MaritalStatus' in self.df.columns :
+            unique_vals = self.df['MaritalStatus'].unique().tolist()
+            if 'Single' in unique_vals and 'Unmarried' in unique_vals :
+                self.df['MaritalStatus'] = self.df['MaritalStatus'].replace('Single' , 'Unmarried')
+        return self
+
+    def group_rare_categories(self , threshold = 10) :
+        cat_cols = self.df.select_dtypes(include = ['object']).columns
+        for col in cat_cols :
+            val_counts = self.df[col].value_counts()
+            rare_categories = val_counts[val_counts < threshold].index
+            if len(rare_categories) > 0 :
+                self.df[col] = self.df[col].replace(rare_categories , 'Other')
+        return self
+
+    def feature_engineering(self) :
+        if {'NumberOfPersonVisiting' , 'NumberOfChildrenVisiting'}.issubset(self.df.columns) :
+            self.df['TotalPersonVisiting'] = self.df['NumberOfPersonVisiting'] + self.df['NumberOfChildrenVisiting']
+            self.df['isChildrenVisiting'] = self.df['NumberOfChildrenVisiting'].apply(lambda x : 1 if x > 0 else 0)
+            self.df.drop(['NumberOfPersonVisiting' , 'NumberOfChildrenVisiting'] , axis = 1 , inplace = True)
+        return self
+
+
+def make_synthetic(n_rows : int , seed : int = 42 , duplicate_rate : float = 0.01) -> pd.DataFrame :
+    rng = np.random.default_rng(seed)
+    sample = pd.read_csv(RAW_SAMPLE_PATH)
+
+    df = sample.iloc[rng.integers(0 , len(sample) , size = n_rows)].reset_index(drop = True)
+    df["CustomerID"] = np.arange(n_rows) + 200_000
+
+    # EXACT COPIES OF EARLIER ROWS (CustomerID INCLUDED) SO drop_duplicates HAS WORK TO DO
+    n_duplicates = int(n_rows * duplicate_rate)
+    if n_duplicates :
+        target = rng.choice(np.arange(1 , n_rows) , size = n_duplicates , replace = False)
+        df.iloc[target] = df.iloc[rng.integers(0 , n_rows , size = n_duplicates)].to_numpy()
+        df = df.astype(sample.dtypes.to_dict())
+
+    # A FEW RARE VALUES FOR group_rare_categories, AND THE KNOWN TYPOS FOR fix_known_issues
+    rare = rng.choice(n_rows , size = 12 , replace = False)
+    df.loc[rare[:5] , "Occupation"] = "Free Lancer"
+    df.loc[rare[5:8] , "Designation"] = "Intern"
+    df.loc[rare[8:] , "Gender"] = "Fe Male"
+    return df
+
+
+def time_chain(cls , df : pd.DataFrame) -> tuple[pd.DataFrame , dict] :
+    preprocessor = cls(df)
+    steps = {}
+    for step in STEPS :
+        started = time.perf_counter()
+        getattr(preprocessor , step)()
+        steps[step] = round(time.perf_counter() - started , 4)
+    steps["total"] = round(sum(steps.values()) , 4)
+    return preprocessor.df , steps
+
+
+def peak_memory(cls , df : pd.DataFrame) -> float :
+    """tracemalloc peak (MB) of the full chain on top of the input frame."""
+    tracemalloc.start()
+    try :
+        preprocessor = cls(df)
+        for step in STEPS :
+            getattr(preprocessor , step)()
+        return round(tracemalloc.get_traced_memory()[1] / 2**20 , 1)
+    finally :
+        tracemalloc.stop()
+
+
+def bench(n_rows : int , seed : int = 42) -> dict :
+    raw = make_synthetic(n_rows , seed)
+    input_mb = round(raw.memory_usage(deep = True).sum() / 2**20 , 1)
+
+    legacy_out , legacy_steps = time_chain(LegacyDataPreprocessor , raw.copy())
+    new_out , new_steps = time_chain(DataPreprocessor , raw.copy())
+    # THE CURRENT CHAIN USES THE COMPACT SCHEMA DTYPES, THE VALUES MUST STILL MATCH THE int64/object OUTPUT
+    legacy_dtypes = legacy_out.dtypes.to_dict()
+    pd.testing.assert_frame_equal(new_out.astype(legacy_dtypes) , legacy_out)
+    # preprocess() RUNS THE FITTED FeatureTransform INSTEAD OF THE STEP METHODS, IT MUST AGREE TOO
+    pd.testing.assert_frame_equal(DataPreprocessor(raw.copy()).preprocess().astype(legacy_dtypes) , legacy_out)
+    rows_out = len(new_out)
+    del legacy_out , new_out
+
+    legacy_peak = peak_memory(LegacyDataPreprocessor , raw.copy())
+    new_peak = peak_memory(DataPreprocessor , raw.copy())
+
+    return {
+        "rows" : n_rows ,
+        "rows_out" : rows_out ,
+        "input_mb" : input_mb ,
+        "legacy" : {"seconds" : legacy_steps , "peak_mb" : legacy_peak} ,
+        "current" : {"seconds" : new_steps , "peak_mb" : new_peak} ,
+        "speedup" : round(legacy_steps["total"] / new_steps["total"] , 2) ,
+    }
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "DataPreprocessor benchmark against the previous implementation")
+    parser.add_argument("--rows" , type = int , nargs = "+" , default = [1_000_000])
+    parser.add_argument("--seed" , type = int , default = 42)
+    args = parser.parse_args()
+
+    # THE CHAIN LOGS EVERY STEP, WHICH WOULD DOMINATE SMALL RUNS AND FILL logs/app.log
+    logging.getLogger("src.preprocessing").setLevel(logging.WARNING)
+
+    results = []
+    for n_rows in args.rows :
+        result = bench(n_rows , args.seed)
+        print(f"{n_rows:>11,} rows | legacy {result['legacy']['seconds']['total']:.2f}s {result['legacy']['peak_mb']} MB"
+              f" | current {result['current']['seconds']['total']:.2f}s {result['current']['peak_mb']} MB"
+              f" | {result['speedup']}x" , flush = True)
+        results.append(result)
+
+    print(json.dumps({"meta" : run_metadata() , "results" : results} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark of loading a cleaned frame from the run_pipeline stage cache against re-parsing CSV.
+
+Preprocesses a synthetic raw dataset of N rows once (see bench_preprocessing.make_synthetic),
+then writes the cleaned frame as CSV (the previous data/cleaned output) and as a StageCache
+entry (uncompressed Feather). Reports size on disk and load time for each; the frame loaded
+from the cache must equal the one that was stored, dtypes included.
+
+Usage: python -m benchmarks.bench_stage_cache [--rows 1000000]
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from src.preprocessing import DataPreprocessor
+from src.stage_cache import StageCache
+from benchmarks.bench_preprocessing import make_synthetic
+from benchmarks.common import run_metadata
+
+
+def timed(fn , repeat : int) -> tuple :
+    best = float("inf")
+    for _ in range(repeat) :
+        started = time.perf_counter()
+        result = fn()
+        best = min(best , time.perf_counter() - started)
+    return result , round(best , 4)
+
+
+def bench(n_rows : int , seed : int , workdir : str , repeat : int) -> dict :
+    cleaned = DataPreprocessor(make_synthetic(n_rows , seed)).preprocess()
+
+    csv_path = os.path.join(workdir , "cleaned.csv")
+    cleaned.to_csv(csv_path , index = False)
+    cache = StageCache(os.path.join(workdir , "cache"))
+    cache.save("preprocess" , "bench" , cleaned)
+
+    _ , csv_seconds = timed(lambda : pd.read_csv(csv_path) , repeat)
+    loaded , cache_seconds = timed(lambda : cache.load_frame("preprocess" , "bench") , repeat)
+    pd.testing.assert_frame_equal(loaded , cleaned.reset_index(drop = True))
+
+    return {
+        "rows" : n_rows ,
+        "csv" : {"mb" : round(os.path.getsize(csv_path) / 2**20 , 1) , "load_seconds" : csv_seconds} ,
+        "stage_cache" : {"mb" : round(os.path.getsize(cache.path("preprocess" , "bench" , "data.feather")) / 2**20 , 1) , "load_seconds" : cache_seconds} ,
+        "speedup" : round(csv_seconds / cache_seconds , 1) ,
+    }
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Stage cache load time against re-parsing the cleaned CSV")
+    parser.add_argument("--rows" , type = int , nargs = "+" , default = [1_000_000])
+    parser.add_argument("--seed" , type = int , default = 42)
+    parser.add_argument("--repeat" , type = int , default = 3)
+    args = parser.parse_args()
+
+    logging.getLogger("src.preprocessing").setLevel(logging.WARNING)
+    logging.getLogger("src.stage_cache").setLevel(logging.WARNING)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir :
+        for n_rows in args.rows :
+            result = bench(n_rows , args.seed , workdir , args.repeat)
+            print(f"{n_rows:>11,} rows | csv {result['csv']['load_seconds']}s ({result['csv']['mb']} MB)"
+                  f" | stage cache {result['stage_cache']['load_seconds']}s ({result['stage_cache']['mb']} MB)"
+                  f" | {result['speedup']}x" , flush = True)
+            results.append(result)
+
+    print(json.dumps({"meta" : run_metadata() , "results" : results} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,98 @@
+"""
+Parity check and memory benchmark for StreamingDataPreprocessor.
+
+Writes a synthetic raw CSV (see bench_preprocessing.make_synthetic), cleans it once with
+the in-memory DataPreprocessor and once with the two-phase streaming mode, each in its own
+process, fails if the two output files differ, and reports wall time and peak RSS of both.
+
+Usage: python -m benchmarks.bench_streaming_preprocessing [--rows 2000000] [--chunksize 100000]
+"""
+import argparse
+import filecmp
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import run_metadata
+
+
+def run_child(mode : str , input_path : str , output_path : str , chunksize : int , rows : int , seed : int) :
+    """
+    Runs in a fresh process so ru_maxrss is the peak of that mode alone. The synthetic file is
+    generated in a child as well: ru_maxrss survives fork+exec, so a parent that had held the
+    synthetic frame would inflate every later measurement.
+    """
+    import pandas as pd
+    from src.preprocessing import DataPreprocessor , StreamingDataPreprocessor
+
+    if mode == "generate" :
+        from benchmarks.bench_preprocessing import make_synthetic
+        make_synthetic(rows , seed).to_csv(output_path , index = False)
+        return
+
+    logging.getLogger("src.preprocessing").setLevel(logging.WARNING)
+    started = time.perf_counter()
+    if mode == "memory" :
+        preprocessor = DataPreprocessor(pd.read_csv(input_path))
+        preprocessor.preprocess()
+        preprocessor.save_cleaned_data(output_path)
+    else :
+        StreamingDataPreprocessor(input_path , chunksize).preprocess(output_path)
+
+    print(json.dumps({
+        "seconds" : round(time.perf_counter() - started , 2) ,
+        "peak_rss_mb" : round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 , 1) ,
+    }))
+
+
+def measure(mode : str , input_path : str , output_path : str , args) -> dict :
+    completed = subprocess.run(
+        [sys.executable , "-m" , "benchmarks.bench_streaming_preprocessing" , "--child" , mode , input_path , output_path ,
+         "--chunksize" , str(args.chunksize) , "--rows" , str(args.rows) , "--seed" , str(args.seed)] ,
+        capture_output = True , text = True ,
+    )
+    if completed.returncode != 0 :
+        sys.stderr.write(completed.stderr)
+        raise RuntimeError(f"{mode} preprocessing failed")
+    return json.loads(completed.stdout) if completed.stdout.strip() else {}
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Streaming vs in-memory preprocessing")
+    parser.add_argument("--rows" , type = int , default = 2_000_000)
+    parser.add_argument("--chunksize" , type = int , default = 100_000)
+    parser.add_argument("--seed" , type = int , default = 42)
+    parser.add_argument("--child" , nargs = 3 , metavar = ("MODE" , "INPUT" , "OUTPUT") , help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child :
+        run_child(*args.child , args.chunksize , args.rows , args.seed)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp :
+        raw_path = os.path.join(tmp , "raw.csv")
+        measure("generate" , "-" , raw_path , args)
+
+        memory_path , streaming_path = os.path.join(tmp , "memory.csv") , os.path.join(tmp , "streaming.csv")
+        result = {
+            "meta" : run_metadata() ,
+            "rows" : args.rows ,
+            "input_mb" : round(os.path.getsize(raw_path) / 2**20 , 1) ,
+            "chunksize" : args.chunksize ,
+            "memory" : measure("memory" , raw_path , memory_path , args) ,
+            "streaming" : measure("streaming" , raw_path , streaming_path , args) ,
+        }
+        result["identical_output"] = filecmp.cmp(memory_path , streaming_path , shallow = False)
+
+    print(json.dumps(result , indent = 2))
+    if not result["identical_output"] :
+        raise AssertionError("Streaming output differs from the in-memory DataPreprocessor")
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,104 @@
+"""
+Memory benchmark for StreamingModelTrainer against the in-memory ModelTrainer.
+
+Writes a synthetic cleaned Parquet file (bench_preprocessing.make_synthetic run through
+DataPreprocessor), then trains on it in three modes, each in its own process:
+
+  memory    : pd.read_parquet + ModelTrainer.transform_data().train()
+  quantized : StreamingModelTrainer, QuantileDMatrix built from the chunk iterator
+  external  : StreamingModelTrainer with external_memory, pages cached on disk
+
+Reports wall time, peak RSS and the test F1 of each mode (the splits differ, so F1 should be
+close, not equal), and checks each saved pipeline loads and scores the first rows.
+
+Usage: python -m benchmarks.bench_streaming_training [--rows 2000000] [--chunksize 100000]
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import run_metadata
+
+
+def run_child(mode : str , data_path : str , save_path : str , chunksize : int , rows : int , seed : int) :
+    """Runs in a fresh process so ru_maxrss is the peak of that mode alone."""
+    import joblib
+    import pandas as pd
+    from utils.chunked_io import iter_chunks
+
+    for name in ("src.preprocessing" , "src.model_training") :
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    if mode == "generate" :
+        from benchmarks.bench_preprocessing import make_synthetic
+        from src.preprocessing import DataPreprocessor
+        DataPreprocessor(make_synthetic(rows , seed)).preprocess().to_parquet(save_path , index = False)
+        return
+
+    from src.model_training import ModelTrainer , StreamingModelTrainer
+
+    started = time.perf_counter()
+    if mode == "memory" :
+        _ , metrics = ModelTrainer(pd.read_parquet(data_path)).transform_data().train(save_path)
+    else :
+        trainer = StreamingModelTrainer(lambda : iter_chunks(data_path , chunksize) , external_memory = mode == "external" ,
+                                        cache_dir = os.path.join(os.path.dirname(save_path) , "xgb"))
+        _ , metrics = trainer.transform_data().train(save_path)
+    seconds = time.perf_counter() - started
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    pipeline = joblib.load(save_path)
+    head = next(iter_chunks(data_path , 100)).drop(columns = "ProdTaken")
+    pipeline.predict_proba(head)
+
+    print(json.dumps({"seconds" : round(seconds , 2) , "peak_rss_mb" : round(peak_rss_mb , 1) , "f1" : round(float(metrics["f1"]) , 4)}))
+
+
+def measure(mode : str , data_path : str , save_path : str , args) -> dict :
+    completed = subprocess.run(
+        [sys.executable , "-m" , "benchmarks.bench_streaming_training" , "--child" , mode , data_path , save_path ,
+         "--chunksize" , str(args.chunksize) , "--rows" , str(args.rows) , "--seed" , str(args.seed)] ,
+        capture_output = True , text = True ,
+    )
+    if completed.returncode != 0 :
+        sys.stderr.write(completed.stderr)
+        raise RuntimeError(f"{mode} training failed")
+    return json.loads(completed.stdout) if completed.stdout.strip() else {}
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Streaming vs in-memory model training")
+    parser.add_argument("--rows" , type = int , default = 2_000_000)
+    parser.add_argument("--chunksize" , type = int , default = 100_000)
+    parser.add_argument("--seed" , type = int , default = 42)
+    parser.add_argument("--child" , nargs = 3 , metavar = ("MODE" , "DATA" , "SAVE_PATH") , help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child :
+        run_child(*args.child , args.chunksize , args.rows , args.seed)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp :
+        data_path = os.path.join(tmp , "cleaned.parquet")
+        measure("generate" , "-" , data_path , args)
+
+        result = {
+            "meta" : run_metadata() ,
+            "rows" : args.rows ,
+            "input_mb" : round(os.path.getsize(data_path) / 2**20 , 1) ,
+            "chunksize" : args.chunksize ,
+        }
+        for mode in ("memory" , "quantized" , "external") :
+            result[mode] = measure(mode , data_path , os.path.join(tmp , f"{mode}.pkl") , args)
+
+    print(json.dumps(result , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
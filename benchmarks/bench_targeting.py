@@ -0,0 +1,85 @@
+"""
+Throughput and memory of top-K targeting (BulkScorer.top_k) versus worker count.
+
+Writes a synthetic customer file in the raw travel schema (rows resampled from the cleaned
+data, see common.generate_payloads), then for every worker count ranks it with top_k and
+reports rows per second and the parent's peak RSS, which must not grow with the file.
+The first run is checked against scoring every row with BulkScorer.score and sorting.
+
+Usage: python -m benchmarks.bench_targeting [--rows 1000000] [--k 1000] [--workers 1 2 4] [--segment-by ProductPitched]
+"""
+import argparse
+import json
+import os
+import tempfile
+
+import pandas as pd
+import psutil
+
+from src.bulk_scoring import BulkScorer
+from benchmarks.common import generate_payloads , run_metadata
+
+
+def write_customers(path : str , n_rows : int , seed : int) :
+    df = pd.DataFrame(generate_payloads(n_rows , seed = seed))
+    # THE RAW FILE STORES Passport / OwnCar AS 0/1, NOT THE API'S Yes / No
+    for col in ("Passport" , "OwnCar") :
+        df[col] = (df[col] == "Yes").astype(int)
+    df.insert(0 , "CustomerID" , range(1 , n_rows + 1))
+    df.to_csv(path , index = False)
+
+
+def check_against_full_scoring(scorer : BulkScorer , input_path : str , top : pd.DataFrame , k : int , segment_by : str , tmp_dir : str) :
+    scores_path = os.path.join(tmp_dir , "scores.csv")
+    scorer.score(input_path , scores_path)
+    scores = pd.read_csv(scores_path)
+    scores["row"] = range(len(scores))
+    if segment_by :
+        scores[segment_by] = pd.read_csv(input_path , usecols = [segment_by])[segment_by]
+        expected = scores.sort_values("probability" , ascending = False , kind = "stable").groupby(segment_by , sort = False).head(k)
+    else :
+        expected = scores.sort_values("probability" , ascending = False , kind = "stable").head(k)
+    if sorted(expected["row"]) != sorted(top["row"]) :
+        raise AssertionError("top_k kept different customers than scoring every row and sorting")
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Top-K targeting throughput and memory versus worker count")
+    parser.add_argument("--rows" , type = int , default = 1_000_000)
+    parser.add_argument("--k" , type = int , default = 1000)
+    parser.add_argument("--workers" , type = int , nargs = "+" , default = [1 , 2 , 4])
+    parser.add_argument("--segment-by" , choices = ("ProductPitched" , "CityTier") , default = None)
+    parser.add_argument("--chunksize" , type = int , default = 100_000)
+    parser.add_argument("--seed" , type = int , default = 42)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir :
+        input_path = os.path.join(tmp_dir , "customers.csv")
+        write_customers(input_path , args.rows , args.seed)
+
+        process = psutil.Process()
+        for i , workers in enumerate(args.workers) :
+            scorer = BulkScorer(chunksize = args.chunksize , workers = workers)
+            rss_before = process.memory_info().rss
+            top , report = scorer.top_k(input_path , args.k , args.segment_by)
+            if i == 0 :
+                check_against_full_scoring(scorer , input_path , top , args.k , args.segment_by , tmp_dir)
+
+            result = {
+                "workers" : workers ,
+                "rows_per_second" : report["rows_per_second"] ,
+                "seconds" : report["seconds"] ,
+                "kept" : report["kept"] ,
+                "segments" : report["segments"] ,
+                "parent_rss_growth_mb" : round((process.memory_info().rss - rss_before) / 2**20 , 1) ,
+            }
+            print(f"{workers} workers | {result['rows_per_second']:,.0f} rows/s | {result['seconds']}s | "
+                  f"kept {result['kept']} in {result['segments']} segments" , flush = True)
+            results.append(result)
+
+    print(json.dumps({"meta" : run_metadata() , "rows" : args.rows , "k" : args.k , "segment_by" : args.segment_by , "results" : results} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark of evaluation.threshold_curve against re-thresholding the probabilities per candidate.
+
+Draws N synthetic labels and scores (scores rounded to 4 decimals so ties occur, as with real
+model output) and computes precision / recall / F1 at every distinct score:
+
+  per_threshold : sklearn precision_score / recall_score / f1_score for each distinct score
+                  (capped at --max-loop thresholds and extrapolated, it is quadratic)
+  sweep         : threshold_curve, one sort and one cumulative sum
+
+The sweep must agree with sklearn's precision_recall_curve at every point.
+
+Usage: python -m benchmarks.bench_threshold_sweep [--rows 10000 100000 1000000]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from sklearn.metrics import f1_score , precision_recall_curve , precision_score , recall_score
+
+from src.evaluation import threshold_curve
+from benchmarks.common import run_metadata
+
+
+def bench(n_rows : int , seed : int , max_loop : int) -> dict :
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n_rows) < 0.2).astype(np.int64)
+    proba = np.round(np.clip(rng.normal(0.35 + 0.3 * y , 0.2) , 0 , 1) , 4)
+
+    started = time.perf_counter()
+    curve = threshold_curve(y , proba)
+    sweep_seconds = time.perf_counter() - started
+
+    precision , recall , thresholds = precision_recall_curve(y , proba)
+    # sklearn LISTS THRESHOLDS ASCENDING WITH A FINAL (1, 0) POINT
+    if not (np.allclose(curve["precision"] , precision[:-1][::-1]) and np.allclose(curve["recall"] , recall[:-1][::-1])
+            and np.array_equal(curve["score"] , thresholds[::-1])) :
+        raise AssertionError("threshold_curve differs from sklearn's precision_recall_curve")
+
+    candidates = curve["score"][: max_loop]
+    started = time.perf_counter()
+    for t in candidates :
+        pred = proba >= t
+        precision_score(y , pred , zero_division = 0) , recall_score(y , pred) , f1_score(y , pred)
+    loop_seconds = (time.perf_counter() - started) * curve["score"].size / candidates.size
+
+    return {
+        "rows" : n_rows ,
+        "thresholds" : int(curve["score"].size) ,
+        "per_threshold_seconds" : round(loop_seconds , 3) ,
+        "sweep_seconds" : round(sweep_seconds , 4) ,
+        "speedup" : round(loop_seconds / sweep_seconds) ,
+    }
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Single-pass threshold sweep against per-threshold metrics")
+    parser.add_argument("--rows" , type = int , nargs = "+" , default = [10_000 , 100_000 , 1_000_000])
+    parser.add_argument("--seed" , type = int , default = 42)
+    parser.add_argument("--max-loop" , type = int , default = 200)
+    args = parser.parse_args()
+
+    results = []
+    for n_rows in args.rows :
+        result = bench(n_rows , args.seed , args.max_loop)
+        print(f"{n_rows:>11,} rows, {result['thresholds']:,} thresholds | per threshold {result['per_threshold_seconds']}s"
+              f" | sweep {result['sweep_seconds']}s | {result['speedup']}x" , flush = True)
+        results.append(result)
+
+    print(json.dumps({"meta" : run_metadata() , "results" : results} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark of ModelTrainer's hyperparameter search against a naive per-candidate Pipeline search.
+
+Preprocesses a synthetic raw dataset of N rows (see bench_preprocessing.make_synthetic) and
+draws the same candidates from tuning.SEARCH_SPACE for both searches:
+
+  naive   : every candidate refits the whole Pipeline (ColumnTransformer + XGBClassifier with
+            max_rounds trees) on every fold, one candidate after another
+  halving : HalvingSearch, preprocessor fitted once per fold, successive halving over boosting
+            rounds with early stopping, fits spread over --jobs threads
+
+Reports wall time and the best mean validation logloss each search found.
+
+Usage: python -m benchmarks.bench_tuning [--rows 50000] [--candidates 27] [--jobs 8]
+"""
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import log_loss
+from sklearn.model_selection import ParameterSampler , StratifiedKFold
+from sklearn.pipeline import Pipeline
+from xgboost import XGBClassifier
+
+from src.preprocessing import DataPreprocessor
+from src.model_training import ModelTrainer
+from src.tuning import SEARCH_SPACE , HalvingSearch
+from benchmarks.bench_preprocessing import make_synthetic
+from benchmarks.common import run_metadata
+
+
+def naive_search(preprocessor , X , y , n_candidates : int , max_rounds : int , n_folds : int , seed : int) -> float :
+    best = float("inf")
+    folds = list(StratifiedKFold(n_splits = n_folds , shuffle = True , random_state = seed).split(X , y))
+    for params in ParameterSampler(SEARCH_SPACE , n_candidates , random_state = seed) :
+        losses = []
+        for train_idx , valid_idx in folds :
+            pipe = Pipeline([("preprocessor" , clone(preprocessor)) , ("model" , XGBClassifier(**params , n_estimators = max_rounds , random_state = seed))])
+            pipe.fit(X.iloc[train_idx] , y.iloc[train_idx])
+            losses.append(log_loss(y.iloc[valid_idx] , pipe.predict_proba(X.iloc[valid_idx])[: , 1]))
+        best = min(best , float(np.mean(losses)))
+    return best
+
+
+def bench(n_rows : int , seed : int , n_candidates : int , max_rounds : int , n_folds : int , jobs : int) -> dict :
+    trainer = ModelTrainer(DataPreprocessor(make_synthetic(n_rows , seed)).preprocess()).transform_data()
+    X , y = trainer.X_train , trainer.y_train
+
+    result = {"rows" : n_rows , "candidates" : n_candidates , "max_rounds" : max_rounds}
+
+    started = time.perf_counter()
+    result["naive"] = {"best_logloss" : round(naive_search(trainer.preprocessor , X , y , n_candidates , max_rounds , n_folds , seed) , 4)}
+    result["naive"]["seconds"] = round(time.perf_counter() - started , 2)
+
+    started = time.perf_counter()
+    search = HalvingSearch(trainer.preprocessor , n_candidates = n_candidates , max_rounds = max_rounds , n_folds = n_folds ,
+                           n_jobs = jobs , random_state = seed).fit(X , y)
+    result["halving"] = {"best_logloss" : round(search.leaderboard[0]["logloss"] , 4) , "seconds" : round(time.perf_counter() - started , 2) ,
+                         "best_rounds" : search.best_rounds}
+
+    result["speedup"] = round(result["naive"]["seconds"] / result["halving"]["seconds"] , 2)
+    return result
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Successive-halving search with cached folds against a naive Pipeline search")
+    parser.add_argument("--rows" , type = int , nargs = "+" , default = [50_000])
+    parser.add_argument("--seed" , type = int , default = 42)
+    parser.add_argument("--candidates" , type = int , default = 27)
+    parser.add_argument("--max-rounds" , type = int , default = 450)
+    parser.add_argument("--folds" , type = int , default = 3)
+    parser.add_argument("--jobs" , type = int , default = None)
+    args = parser.parse_args()
+
+    for name in ("src.preprocessing" , "src.model_training" , "src.tuning") :
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    results = []
+    for n_rows in args.rows :
+        result = bench(n_rows , args.seed , args.candidates , args.max_rounds , args.folds , args.jobs)
+        print(f"{n_rows:>11,} rows | naive {result['naive']['seconds']}s (logloss {result['naive']['best_logloss']})"
+              f" | halving {result['halving']['seconds']}s (logloss {result['halving']['best_logloss']})"
+              f" | {result['speedup']}x" , flush = True)
+        results.append(result)
+
+    print(json.dumps({"meta" : run_metadata() , "results" : results} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
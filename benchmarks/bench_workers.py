@@ -0,0 +1,128 @@
+"""
+Memory and throughput of the pre-fork server versus worker count.
+
+For every worker count, starts serve.py (with and without --no-preload), waits for
+/health, records RSS / PSS / USS of the master and every worker, then drives /predict
+from client threads for a fixed duration and reports requests per second.
+
+Usage: python -m benchmarks.bench_workers [--workers 1 2 4] [--duration 10] [--clients 16]
+"""
+import argparse
+import http.client
+import json
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+
+PAYLOAD = {
+    "Age" : 41 , "TypeofContact" : "Self Enquiry" , "CityTier" : 3 , "DurationOfPitch" : 6 ,
+    "Occupation" : "Salaried" , "Gender" : "Female" , "NumberOfPersonVisiting" : 3 ,
+    "NumberOfFollowups" : 3 , "ProductPitched" : "Deluxe" , "PreferredPropertyStar" : 3 ,
+    "MaritalStatus" : "Unmarried" , "NumberOfTrips" : 1 , "Passport" : "Yes" ,
+    "PitchSatisfactionScore" : 2 , "OwnCar" : "Yes" , "NumberOfChildrenVisiting" : 0 ,
+    "Designation" : "Manager" , "MonthlyIncome" : 20993 ,
+}
+
+
+def wait_until_ready(port : int , timeout : float = 60) :
+    deadline = time.time() + timeout
+    while time.time() < deadline :
+        try :
+            conn = http.client.HTTPConnection("127.0.0.1" , port , timeout = 1)
+            conn.request("GET" , "/health")
+            if conn.getresponse().status == 200 :
+                return
+        except OSError :
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server on port {port} did not become ready")
+
+
+def memory_report(master_pid : int) -> dict :
+    master = psutil.Process(master_pid)
+    processes = [master] + master.children(recursive = True)
+    per_process = []
+    for p in processes :
+        m = p.memory_full_info()
+        per_process.append({"pid" : p.pid , "rss_mb" : m.rss / 2**20 , "pss_mb" : m.pss / 2**20 , "uss_mb" : m.uss / 2**20})
+    workers = per_process[1:] or per_process
+    return {
+        "total_pss_mb" : round(sum(p["pss_mb"] for p in per_process) , 1) ,
+        "total_rss_mb" : round(sum(p["rss_mb"] for p in per_process) , 1) ,
+        "mean_worker_uss_mb" : round(sum(p["uss_mb"] for p in workers) / len(workers) , 1) ,
+        "processes" : len(per_process) ,
+    }
+
+
+def drive_load(port : int , clients : int , duration : float) -> dict :
+    body = json.dumps(PAYLOAD)
+    counts , errors = [0] * clients , [0] * clients
+    stop_at = time.perf_counter() + duration
+
+    def client(i) :
+        conn = http.client.HTTPConnection("127.0.0.1" , port , timeout = 10)
+        while time.perf_counter() < stop_at :
+            try :
+                # VARY THE PAYLOAD SO THE PREDICTION CACHE DOES NOT ANSWER EVERYTHING
+                conn.request("POST" , "/predict" , body.replace('"Age": 41' , f'"Age": {18 + counts[i] % 60}') ,
+                             {"Content-Type" : "application/json"})
+                response = conn.getresponse()
+                response.read()
+                counts[i] += 1
+                if response.status != 200 :
+                    errors[i] += 1
+            except OSError :
+                errors[i] += 1
+                conn = http.client.HTTPConnection("127.0.0.1" , port , timeout = 10)
+
+    threads = [threading.Thread(target = client , args = (i ,)) for i in range(clients)]
+    started = time.perf_counter()
+    for t in threads :
+        t.start()
+    for t in threads :
+        t.join()
+    elapsed = time.perf_counter() - started
+    return {"requests" : sum(counts) , "errors" : sum(errors) , "rps" : round(sum(counts) / elapsed , 1)}
+
+
+def run_case(workers : int , preload : bool , port : int , clients : int , duration : float) -> dict :
+    cmd = [sys.executable , "-W" , "ignore" , "serve.py" , "--workers" , str(workers) , "--port" , str(port) , "--log-level" , "warning"]
+    if not preload :
+        cmd.append("--no-preload")
+    server = subprocess.Popen(cmd , stdout = sys.stderr)
+    try :
+        wait_until_ready(port)
+        # LET EVERY WORKER FINISH ITS LIFESPAN STARTUP BEFORE MEASURING
+        time.sleep(2)
+        result = {"workers" : workers , "preload" : preload , "memory" : memory_report(server.pid)}
+        result["throughput"] = drive_load(port , clients , duration)
+        result["memory_after_load"] = memory_report(server.pid)
+        return result
+    finally :
+        server.terminate()
+        server.wait(timeout = 30)
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--workers" , type = int , nargs = "+" , default = [1 , 2 , 4])
+    parser.add_argument("--duration" , type = float , default = 10)
+    parser.add_argument("--clients" , type = int , default = 16)
+    parser.add_argument("--port" , type = int , default = 8765)
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers :
+        for preload in (True , False) :
+            if workers == 1 and not preload :
+                continue
+            results.append(run_case(workers , preload , args.port , args.clients , args.duration))
+
+    print(json.dumps(results , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
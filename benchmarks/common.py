@@ -0,0 +1,85 @@
+"""
+Shared helpers for the benchmark scripts: payload generation, latency summaries and run metadata.
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+import pandas as pd
+
+CLEANED_DATA_PATH = "Data/cleaned/cleaned_Travel.csv"
+
+
+def generate_payloads(n : int , seed : int = 42 , jitter_income : bool = True , data_path : str = CLEANED_DATA_PATH) -> list[dict] :
+    """
+    Builds /predict request bodies (UserInput shape) by resampling rows of the cleaned data,
+    so categorical mixes and numeric ranges follow the training distribution.
+
+    The cleaned data only keeps TotalPersonVisiting / isChildrenVisiting, so the raw
+    NumberOfPersonVisiting / NumberOfChildrenVisiting split is drawn to match them.
+    jitter_income perturbs MonthlyIncome by up to 5% so replayed rows are not all cache hits.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.read_csv(data_path).drop(columns = ["ProdTaken"])
+    rows = df.iloc[rng.integers(0 , len(df) , size = n)].to_dict("records")
+
+    payloads = []
+    for row in rows :
+        total = int(row.pop("TotalPersonVisiting"))
+        has_children = int(row.pop("isChildrenVisiting"))
+        children = int(rng.integers(1 , max(total , 2))) if has_children else 0
+        row["NumberOfChildrenVisiting"] = children
+        row["NumberOfPersonVisiting"] = max(total - children , 1)
+
+        row["Passport"] = "Yes" if row["Passport"] == 1 else "No"
+        row["OwnCar"] = "Yes" if row["OwnCar"] == 1 else "No"
+        if jitter_income :
+            row["MonthlyIncome"] = int(row["MonthlyIncome"] * rng.uniform(0.95 , 1.05))
+
+        payloads.append({k : (v.item() if hasattr(v , "item") else v) for k , v in row.items()})
+    return payloads
+
+
+def load_payloads(path : str) -> list[dict] :
+    """Reads UserInput bodies from a JSONL/NDJSON file, one object per line."""
+    with open(path) as f :
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(latencies_s , elapsed_s : float = None) -> dict :
+    """Latency percentiles in milliseconds (and throughput if elapsed_s is given)."""
+    latencies = np.asarray(latencies_s , dtype = np.float64) * 1000
+    if latencies.size == 0 :
+        return {"count" : 0}
+    summary = {
+        "count" : int(latencies.size) ,
+        "mean_ms" : round(float(latencies.mean()) , 3) ,
+        "p50_ms" : round(float(np.percentile(latencies , 50)) , 3) ,
+        "p95_ms" : round(float(np.percentile(latencies , 95)) , 3) ,
+        "p99_ms" : round(float(np.percentile(latencies , 99)) , 3) ,
+        "max_ms" : round(float(latencies.max()) , 3) ,
+    }
+    if elapsed_s :
+        summary["throughput_per_s"] = round(latencies.size / elapsed_s , 1)
+    return summary
+
+
+def run_metadata() -> dict :
+    """Identifies the code and machine a result came from, so runs can be compared across commits."""
+    try :
+        commit = subprocess.run(["git" , "rev-parse" , "--short" , "HEAD"] , capture_output = True , text = True , check = True).stdout.strip()
+        dirty = bool(subprocess.run(["git" , "status" , "--porcelain" , "--untracked-files=no"] , capture_output = True , text = True).stdout.strip())
+    except (OSError , subprocess.CalledProcessError) :
+        commit , dirty = None , None
+
+    return {
+        "commit" : commit ,
+        "dirty" : dirty ,
+        "timestamp" : time.strftime("%Y-%m-%dT%H:%M:%S%z") ,
+        "python" : platform.python_version() ,
+        "platform" : platform.platform() ,
+        "cpu_count" : os.cpu_count() ,
+    }
@@ -0,0 +1,165 @@
+"""
+HTTP load test for the prediction API.
+
+Boots the API locally through serve.py (or targets --url), replays generated or recorded
+payloads from --concurrency client threads, either as fast as possible or paced to a total
+--rate, and reports throughput and p50/p95/p99 latency as JSON.
+
+When --rate is set, latency is measured from each request's scheduled send time, so a
+server that falls behind shows up as growing latency instead of silently lower load.
+
+Usage: python -m benchmarks.load_test [--workers 2] [--concurrency 16] [--rate 500] [--duration 20]
+       python -m benchmarks.load_test --endpoint batch --batch-size 256
+       python -m benchmarks.load_test --url http://10.0.0.5:8000 --payloads payloads.jsonl
+"""
+import argparse
+import http.client
+import json
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+from benchmarks.common import generate_payloads , load_payloads , summarize , run_metadata
+
+
+def wait_until_ready(host : str , port : int , timeout : float = 60) :
+    deadline = time.time() + timeout
+    while time.time() < deadline :
+        try :
+            conn = http.client.HTTPConnection(host , port , timeout = 1)
+            conn.request("GET" , "/health")
+            if conn.getresponse().status == 200 :
+                return
+        except OSError :
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server at {host}:{port} did not become ready")
+
+
+def build_bodies(payloads : list[dict] , endpoint : str , batch_size : int) -> tuple[str , list[bytes]] :
+    if endpoint == "batch" :
+        batches = [payloads[i : i + batch_size] for i in range(0 , len(payloads) - batch_size + 1 , batch_size)] or [payloads]
+        return "/predict/batch" , [json.dumps({"customers" : batch}).encode() for batch in batches]
+    return "/predict" , [json.dumps(payload).encode() for payload in payloads]
+
+
+def run_load(host : str , port : int , path : str , bodies : list[bytes] , concurrency : int , duration : float , rate : float) -> dict :
+    latencies = [[] for _ in range(concurrency)]
+    statuses = [{} for _ in range(concurrency)]
+    started = time.perf_counter()
+    stop_at = started + duration
+
+    # EACH CLIENT OWNS 1/concurrency OF THE TARGET RATE
+    interval = concurrency / rate if rate else 0.0
+
+    def client(i : int) :
+        conn = http.client.HTTPConnection(host , port , timeout = 30)
+        headers = {"Content-Type" : "application/json"}
+        n = 0
+        next_send = started + (interval * i / concurrency if interval else 0.0)
+        while True :
+            if interval :
+                now = time.perf_counter()
+                if next_send > now :
+                    time.sleep(next_send - now)
+                scheduled = next_send
+                next_send += interval
+            else :
+                scheduled = time.perf_counter()
+            if scheduled >= stop_at :
+                break
+
+            body = bodies[(i + n * concurrency) % len(bodies)]
+            n += 1
+            try :
+                conn.request("POST" , path , body , headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except OSError as e :
+                status = type(e).__name__
+                conn = http.client.HTTPConnection(host , port , timeout = 30)
+            latencies[i].append(time.perf_counter() - scheduled)
+            statuses[i][status] = statuses[i].get(status , 0) + 1
+
+    threads = [threading.Thread(target = client , args = (i ,) , daemon = True) for i in range(concurrency)]
+    for t in threads :
+        t.start()
+    for t in threads :
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    all_statuses = {}
+    for s in statuses :
+        for status , count in s.items() :
+            all_statuses[str(status)] = all_statuses.get(str(status) , 0) + count
+
+    result = summarize([x for per_client in latencies for x in per_client] , elapsed)
+    result["statuses"] = all_statuses
+    result["errors"] = sum(count for status , count in all_statuses.items() if status != "200")
+    return result
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "HTTP load test for the prediction API")
+    parser.add_argument("--url" , default = None , help = "target an already running server instead of booting one")
+    parser.add_argument("--workers" , type = int , default = 1 , help = "serve.py workers when booting locally")
+    parser.add_argument("--port" , type = int , default = 8790)
+    parser.add_argument("--endpoint" , choices = ["predict" , "batch"] , default = "predict")
+    parser.add_argument("--batch-size" , type = int , default = 100)
+    parser.add_argument("--concurrency" , type = int , default = 16)
+    parser.add_argument("--rate" , type = float , default = 0 , help = "total requests/s, 0 = as fast as possible")
+    parser.add_argument("--duration" , type = float , default = 20)
+    parser.add_argument("--warmup" , type = float , default = 2)
+    parser.add_argument("--payloads" , default = None , help = "JSONL file of UserInput bodies to replay")
+    parser.add_argument("--n-payloads" , type = int , default = 5000)
+    parser.add_argument("--seed" , type = int , default = 42)
+    parser.add_argument("--output" , default = None , help = "also write the JSON result to this file")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.payloads) if args.payloads else generate_payloads(args.n_payloads , seed = args.seed)
+    path , bodies = build_bodies(payloads , args.endpoint , args.batch_size)
+
+    server = None
+    if args.url :
+        parsed = urlparse(args.url)
+        host , port = parsed.hostname , parsed.port or 80
+    else :
+        host , port = "127.0.0.1" , args.port
+        server = subprocess.Popen(
+            [sys.executable , "-W" , "ignore" , "serve.py" , "--workers" , str(args.workers) , "--port" , str(port) , "--log-level" , "warning"] ,
+            stdout = sys.stderr ,
+        )
+
+    try :
+        wait_until_ready(host , port)
+        if args.warmup :
+            run_load(host , port , path , bodies , args.concurrency , args.warmup , 0)
+
+        result = {
+            "meta" : run_metadata() ,
+            "config" : {
+                "endpoint" : path , "workers" : None if args.url else args.workers , "concurrency" : args.concurrency ,
+                "rate" : args.rate or None , "duration" : args.duration ,
+                "rows_per_request" : args.batch_size if args.endpoint == "batch" else 1 ,
+                "payloads" : args.payloads or f"generated:{args.n_payloads}:seed{args.seed}" ,
+            } ,
+            "result" : run_load(host , port , path , bodies , args.concurrency , args.duration , args.rate) ,
+        }
+        result["result"]["rows_per_s"] = round(result["result"].get("throughput_per_s" , 0) * result["config"]["rows_per_request"] , 1)
+    finally :
+        if server is not None :
+            server.terminate()
+            server.wait(timeout = 30)
+
+    output = json.dumps(result , indent = 2)
+    print(output)
+    if args.output :
+        with open(args.output , "w") as f :
+            f.write(output)
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,85 @@
+"""
+In-process microbenchmarks of the serving code path, without HTTP or the micro-batcher.
+
+- validate:         UserInput.model_validate + to_record
+- predict_uncached: predict_output with the prediction cache disabled
+- predict_cached:   predict_output on inputs that are already cached
+- batch_<n>:        predict_batch on n uncached rows (latency per call, throughput in rows/s)
+
+Usage: python -m benchmarks.microbench [--repeat 2000] [--batch-sizes 1 16 256 4096]
+"""
+import argparse
+import json
+import time
+
+import predict
+from schema.user_input import UserInput
+from benchmarks.common import generate_payloads , summarize , run_metadata
+
+
+def time_calls(fn , inputs : list , repeat : int) -> list[float] :
+    latencies = []
+    for i in range(repeat) :
+        arg = inputs[i % len(inputs)]
+        started = time.perf_counter()
+        fn(arg)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run_microbenchmarks(repeat : int = 2000 , batch_sizes : tuple = (1 , 16 , 256 , 4096) , seed : int = 42) -> dict :
+    payloads = generate_payloads(max(repeat , max(batch_sizes)) , seed = seed)
+    model_inputs = [UserInput.model_validate(p).to_record() for p in payloads]
+    cache = predict.prediction_cache
+    max_size = cache.max_size
+    results = {}
+
+    try :
+        results["validate"] = summarize(time_calls(lambda p : UserInput.model_validate(p).to_record() , payloads , repeat))
+
+        # max_size = 0 DISABLES THE CACHE, SO EVERY CALL RUNS THE MODEL
+        cache.clear()
+        cache.max_size = 0
+        predict.predict_output(model_inputs[0])
+        results["predict_uncached"] = summarize(time_calls(predict.predict_output , model_inputs , repeat))
+
+        cache.max_size = max_size
+        hot = model_inputs[: min(100 , len(model_inputs))]
+        for x in hot :
+            predict.predict_output(x)
+        results["predict_cached"] = summarize(time_calls(predict.predict_output , hot , repeat))
+
+        cache.max_size = 0
+        for size in batch_sizes :
+            batches = [model_inputs[i : i + size] for i in range(0 , len(model_inputs) - size + 1 , size)]
+            calls = max(5 , min(repeat , 20_000 // size))
+            latencies = time_calls(predict.predict_batch , batches , calls)
+            summary = summarize(latencies)
+            summary["rows_per_s"] = round(size * len(latencies) / sum(latencies) , 1)
+            results[f"batch_{size}"] = summary
+    finally :
+        cache.max_size = max_size
+        cache.clear()
+
+    return {
+        "model" : predict.registry.current.key ,
+        "compiled" : predict.registry.current.compiled is not None ,
+        "repeat" : repeat ,
+        "results" : results ,
+    }
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "In-process microbenchmarks of predict_output / predict_batch")
+    parser.add_argument("--repeat" , type = int , default = 2000)
+    parser.add_argument("--batch-sizes" , type = int , nargs = "+" , default = [1 , 16 , 256 , 4096])
+    parser.add_argument("--seed" , type = int , default = 42)
+    args = parser.parse_args()
+
+    result = run_microbenchmarks(args.repeat , tuple(args.batch_sizes) , args.seed)
+    result["meta"] = run_metadata()
+    print(json.dumps(result , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,99 @@
+"""
+Runs the in-process microbenchmarks and the HTTP load tests and stores one machine-readable
+result per commit, so performance regressions between commits show up as deltas.
+
+Results go to benchmarks/results/<commit>[-dirty].json. With --compare, the latency and
+throughput figures are printed next to a previous result, with the relative change.
+
+Usage: python -m benchmarks.run_suite [--quick] [--workers 1 2] [--compare benchmarks/results/abc1234.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import run_metadata
+
+RESULTS_DIR = "benchmarks/results"
+
+# FIGURES WHERE LOWER IS BETTER; EVERYTHING ELSE COMPARED (THROUGHPUT) IS HIGHER IS BETTER
+LOWER_IS_BETTER = ("mean_ms" , "p50_ms" , "p95_ms" , "p99_ms" , "max_ms")
+COMPARED = LOWER_IS_BETTER + ("throughput_per_s" , "rows_per_s")
+
+
+def run_module(module : str , *args) -> dict :
+    """Runs a benchmark in a fresh interpreter so runs do not share caches or warmed state."""
+    completed = subprocess.run([sys.executable , "-W" , "ignore" , "-m" , module , *args] , capture_output = True , text = True)
+    if completed.returncode != 0 :
+        sys.stderr.write(completed.stderr)
+        raise RuntimeError(f"{module} {' '.join(args)} failed with exit code {completed.returncode}")
+    return json.loads(completed.stdout)
+
+
+def flatten(result : dict) -> dict :
+    """{"microbench": {"batch_16": {"p50_ms": ...}}} -> {"microbench.batch_16.p50_ms": ...} for the compared figures."""
+    flat = {}
+
+    def walk(prefix : str , node) :
+        for key , value in node.items() :
+            if isinstance(value , dict) :
+                walk(f"{prefix}{key}." , value)
+            elif key in COMPARED :
+                flat[prefix + key] = value
+
+    walk("" , {k : v for k , v in result.items() if k != "meta"})
+    return flat
+
+
+def compare(current : dict , baseline : dict) -> str :
+    now , before = flatten(current) , flatten(baseline)
+    lines = [f"{'metric':<55} {'baseline':>12} {'current':>12} {'change':>9}"]
+    for name in sorted(now.keys() & before.keys()) :
+        old , new = before[name] , now[name]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = change > 0 if name.endswith(LOWER_IS_BETTER) else change < 0
+        flag = "  <- worse" if worse and abs(change) >= 10 else ""
+        lines.append(f"{name:<55} {old:>12.3f} {new:>12.3f} {change:>+8.1f}%{flag}")
+    return "\n".join(lines)
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Run the benchmark suite and store the results for this commit")
+    parser.add_argument("--quick" , action = "store_true" , help = "short runs, for a smoke check rather than numbers")
+    parser.add_argument("--workers" , type = int , nargs = "+" , default = [1 , 2])
+    parser.add_argument("--concurrency" , type = int , default = 16)
+    parser.add_argument("--payloads" , default = None , help = "JSONL file of UserInput bodies to replay instead of generated ones")
+    parser.add_argument("--compare" , default = None , help = "previous result file to diff against")
+    parser.add_argument("--output" , default = None)
+    args = parser.parse_args()
+
+    duration = "3" if args.quick else "20"
+    repeat = "300" if args.quick else "2000"
+    payload_args = ["--payloads" , args.payloads] if args.payloads else []
+
+    result = {"meta" : run_metadata() , "microbench" : run_module("benchmarks.microbench" , "--repeat" , repeat)["results"] , "load" : {}}
+
+    for workers in args.workers :
+        common = ["--workers" , str(workers) , "--concurrency" , str(args.concurrency) , "--duration" , duration , *payload_args]
+        for endpoint in ("predict" , "batch") :
+            print(f"Load test: /{endpoint} with {workers} worker(s)" , file = sys.stderr , flush = True)
+            run = run_module("benchmarks.load_test" , "--endpoint" , endpoint , *common)
+            result["load"][f"{endpoint}_w{workers}"] = run["result"]
+
+    meta = result["meta"]
+    output = args.output or os.path.join(RESULTS_DIR , f"{meta['commit'] or 'unknown'}{'-dirty' if meta['dirty'] else ''}.json")
+    os.makedirs(os.path.dirname(output) or "." , exist_ok = True)
+    with open(output , "w") as f :
+        json.dump(result , f , indent = 2)
+    print(f"Results written to {output}" , file = sys.stderr)
+
+    if args.compare :
+        with open(args.compare) as f :
+            print(compare(result , json.load(f)))
+    else :
+        print(json.dumps(result , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache :
+    """
+    Thread-safe in-process LRU cache for prediction results.
+
+    Entries are keyed on a stable hash of the normalised model input and belong to one
+    model key (version + artifact fingerprint + threshold). Looking up with a different model key
+    drops every entry, so a new model never serves predictions made by the old one.
+    A max_size of 0 disables the cache; ttl_seconds of None keeps entries until evicted.
+    """
+
+    def __init__(self , max_size : int = 10000 , ttl_seconds : float | None = None) :
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_key = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+
+    @property
+    def enabled(self) -> bool :
+        return self.max_size > 0
+
+
+    @staticmethod
+    def make_key(user_input : dict) -> str :
+        """Hashes a feature dictionary independently of key order."""
+        payload = json.dumps(user_input , sort_keys = True , separators = (",", ":") , default = str)
+        return hashlib.blake2b(payload.encode() , digest_size = 16).hexdigest()
+
+
+    def _bind(self , model_key : str) :
+        # CALLER HOLDS THE LOCK
+        if model_key != self._model_key :
+            if self._entries :
+                self.invalidations += 1
+            self._entries.clear()
+            self._model_key = model_key
+
+
+    def get(self , key : str , model_key : str) :
+        """Returns the cached value or None."""
+        if not self.enabled :
+            return None
+
+        with self._lock :
+            self._bind(model_key)
+            entry = self._entries.get(key)
+            if entry is None :
+                self.misses += 1
+                return None
+
+            value , expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic() :
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+
+    def put(self , key : str , value , model_key : str) :
+        if not self.enabled :
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock :
+            self._bind(model_key)
+            self._entries[key] = (value , expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size :
+                self._entries.popitem(last = False)
+                self.evictions += 1
+
+
+    def clear(self) :
+        with self._lock :
+            self._entries.clear()
+
+
+    def stats(self) -> dict :
+        with self._lock :
+            lookups = self.hits + self.misses
+            return {
+                "max_size" : self.max_size ,
+                "ttl_seconds" : self.ttl_seconds ,
+                "size" : len(self._entries) ,
+                "hits" : self.hits ,
+                "misses" : self.misses ,
+                "hit_ratio" : self.hits / lookups if lookups else 0.0 ,
+                "evictions" : self.evictions ,
+                "expirations" : self.expirations ,
+                "invalidations" : self.invalidations ,
+            }
@@ -0,0 +1,28 @@
+import os
+
+# SERVING CONFIGURATION
+# EVERY VALUE CAN BE OVERRIDDEN WITH AN ENVIRONMENT VARIABLE OF THE SAME NAME
+
+
+# MAXIMUM NUMBER OF CUSTOMERS ACCEPTED BY /predict/batch IN A SINGLE REQUEST
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
+# MICRO-BATCHING OF CONCURRENT /predict CALLS
+# A BATCH IS SCORED ONCE IT HOLDS MICROBATCH_MAX_SIZE REQUESTS OR ITS OLDEST REQUEST HAS WAITED MICROBATCH_MAX_WAIT_MS
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+MICROBATCH_MAX_QUEUE_SIZE = int(os.getenv("MICROBATCH_MAX_QUEUE_SIZE", "1024"))
+
+# IN-PROCESS PREDICTION CACHE, PREDICTION_CACHE_SIZE = 0 DISABLES IT
+# PREDICTION_CACHE_TTL_SECONDS IS OPTIONAL, WITHOUT IT ENTRIES LIVE UNTIL EVICTED OR THE MODEL CHANGES
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS")) if os.getenv("PREDICTION_CACHE_TTL_SECONDS") else None
+
+# HOT RELOAD OF artifacts/best_model_pipeline.pkl
+# THE ARTIFACT IS POLLED EVERY MODEL_WATCH_INTERVAL_SECONDS (0 DISABLES WATCHING, POST /admin/reload STILL WORKS)
+# WHEN ADMIN_TOKEN IS SET, /admin/* CALLS MUST SEND IT IN THE X-Admin-Token HEADER
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "10"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# /predict/stream SCORES VALID NDJSON LINES IN BATCHES OF AT MOST STREAM_BATCH_SIZE
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "256"))
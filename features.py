@@ -0,0 +1,454 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from schema.dtypes import is_text_dtype , int_dtype
+
+
+class QuantileSketch :
+    """
+    Mergeable quantile summary of one numeric column.
+
+    Values are counted exactly while the column has at most max_exact distinct values
+    (true for every numeric column of the travel data), so the median matches pandas exactly.
+    Past that it becomes a KLL-style compactor sketch holding about k items per level,
+    with a rank error of roughly 1/k.
+    """
+
+    def __init__(self , k : int = 4096 , max_exact : int = 50_000 , seed : int = 0) :
+        self.k = k
+        self.max_exact = max_exact
+        self.count = 0
+        self._exact = {}        # value -> count, None once the sketch is compacting
+        self._levels = []       # items at level i carry a weight of 2**i
+        self._rng = np.random.default_rng(seed)
+
+
+    def update(self , values) :
+        values = np.asarray(values , dtype = np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0 :
+            return
+
+        self.count += int(values.size)
+        if self._exact is not None :
+            uniques , counts = np.unique(values , return_counts = True)
+            for value , count in zip(uniques.tolist() , counts.tolist()) :
+                self._exact[value] = self._exact.get(value , 0) + count
+            if len(self._exact) > self.max_exact :
+                self._switch_to_levels()
+        else :
+            self._add(0 , values)
+            self._compact()
+
+
+    def merge(self , other : "QuantileSketch") -> "QuantileSketch" :
+        """Folds another sketch (e.g. from another file or worker) into this one."""
+        self.count += other.count
+        if self._exact is not None and other._exact is not None :
+            for value , count in other._exact.items() :
+                self._exact[value] = self._exact.get(value , 0) + count
+            if len(self._exact) > self.max_exact :
+                self._switch_to_levels()
+            return self
+
+        if self._exact is not None :
+            self._switch_to_levels()
+        other_levels = other._exact_as_levels() if other._exact is not None else other._levels
+        for level , items in enumerate(other_levels) :
+            self._add(level , items)
+        self._compact()
+        return self
+
+
+    def _switch_to_levels(self) :
+        self._levels = self._exact_as_levels()
+        self._exact = None
+        self._compact()
+
+
+    def _exact_as_levels(self) -> list :
+        # A VALUE SEEN c TIMES GOES TO EVERY LEVEL i WHERE BIT i OF c IS SET, SO NO WEIGHT IS LOST
+        values = np.fromiter(self._exact.keys() , dtype = np.float64 , count = len(self._exact))
+        counts = np.fromiter(self._exact.values() , dtype = np.int64 , count = len(self._exact))
+        levels = []
+        while counts.any() :
+            levels.append(values[(counts & 1) == 1])
+            counts = counts >> 1
+        return levels
+
+
+    def _add(self , level : int , items : np.ndarray) :
+        while len(self._levels) <= level :
+            self._levels.append(np.empty(0 , dtype = np.float64))
+        self._levels[level] = np.concatenate((self._levels[level] , items))
+
+
+    def _compact(self) :
+        level = 0
+        while level < len(self._levels) :
+            items = self._levels[level]
+            if items.size > self.k :
+                items = np.sort(items)
+                # AN ODD ITEM STAYS BEHIND, EVERY OTHER ONE OF THE REST MOVES UP WITH DOUBLE WEIGHT
+                paired = items.size - items.size % 2
+                self._levels[level] = items[paired :]
+                self._add(level + 1 , items[int(self._rng.integers(2)) : paired : 2])
+            level += 1
+
+
+    def median(self) -> float :
+        """Same definition as pandas: the middle value, or the mean of the two middle values."""
+        if self.count == 0 :
+            return float("nan")
+
+        if self._exact is not None :
+            values = np.array(sorted(self._exact) , dtype = np.float64)
+            weights = np.array([self._exact[value] for value in values.tolist()] , dtype = np.int64)
+        else :
+            values = np.concatenate(self._levels)
+            weights = np.concatenate([np.full(items.size , 2 ** level , dtype = np.int64) for level , items in enumerate(self._levels)])
+            order = np.argsort(values , kind = "stable")
+            values , weights = values[order] , weights[order]
+
+        cumulative = np.cumsum(weights)
+        total = int(cumulative[-1])
+        lower = values[np.searchsorted(cumulative , (total - 1) // 2 , side = "right")]
+        upper = values[np.searchsorted(cumulative , total // 2 , side = "right")]
+        return float((lower + upper) / 2)
+
+
+    def to_dict(self) -> dict :
+        if self._exact is not None :
+            return {"count" : self.count , "exact" : [list(self._exact.keys()) , list(self._exact.values())]}
+        return {"count" : self.count , "k" : self.k , "levels" : [items.tolist() for items in self._levels]}
+
+
+    @classmethod
+    def from_dict(cls , state : dict) -> "QuantileSketch" :
+        sketch = cls(k = state.get("k" , 4096))
+        sketch.count = state["count"]
+        if "exact" in state :
+            values , counts = state["exact"]
+            sketch._exact = dict(zip(values , counts))
+        else :
+            sketch._exact = None
+            sketch._levels = [np.asarray(items , dtype = np.float64) for items in state["levels"]]
+        return sketch
+
+
+class FeatureTransform :
+    """
+    Fitted preprocessing state shared by training, serving and bulk scoring.
+
+    Holds what DataPreprocessor learns from the training data (median / mode fill values,
+    the known fixes, rare categories) and the mergeable statistics they came from, so the
+    state can be updated when new data is appended instead of being refitted from scratch.
+
+    finalize() compiles the statistics into per-column lookups that transform() applies to
+    a DataFrame chunk and transform_record() applies to a single request dictionary.
+    An unfitted transform only applies the known fixes and the feature engineering.
+    """
+
+    def __init__(self , rare_threshold : int = 10) :
+        self.rare_threshold = rare_threshold
+
+        # MERGEABLE STATISTICS
+        self.n_rows = 0
+        self.columns = []
+        self.missing_counts = {}
+        self.sketches = {}
+        self.value_counts = {}
+
+        # COMPILED STATE, BUILT BY finalize()
+        self.numeric_cols = []
+        self.fill_values = {}
+        self.merge_single = False
+        self.rare_categories = {}
+        self.replacements = {}
+
+
+    @property
+    def fitted(self) -> bool :
+        return self.n_rows > 0
+
+
+    def update(self , df : pd.DataFrame) -> "FeatureTransform" :
+        """Adds a cleaned, deduplicated chunk (column names fixed, no CustomerID) to the statistics."""
+        self.n_rows += len(df)
+        for col in df.columns :
+            if col not in self.missing_counts :
+                self.columns.append(col)
+            values = df[col]
+            n_missing = int(values.isna().sum())
+            self.missing_counts[col] = self.missing_counts.get(col , 0) + n_missing
+
+            if is_text_dtype(values.dtype) :
+                counts = self.value_counts.setdefault(col , {})
+                for value , count in values.value_counts().items() :
+                    # UNUSED CATEGORIES OF A category COLUMN ARE LISTED WITH A COUNT OF 0
+                    if count :
+                        counts[value] = counts.get(value , 0) + int(count)
+            elif n_missing < len(values) :
+                # A CATEGORICAL COLUMN THAT IS EMPTY IN THIS CHUNK IS READ AS float64, IT ONLY ADDS MISSING COUNTS
+                self.sketches.setdefault(col , QuantileSketch()).update(values.to_numpy(dtype = np.float64 , na_value = np.nan))
+        return self
+
+
+    def merge(self , other : "FeatureTransform") -> "FeatureTransform" :
+        """Folds in the statistics of another transform, e.g. one fitted on newly appended data."""
+        self.n_rows += other.n_rows
+        for col in other.columns :
+            if col not in self.missing_counts :
+                self.columns.append(col)
+            self.missing_counts[col] = self.missing_counts.get(col , 0) + other.missing_counts[col]
+        for col , sketch in other.sketches.items() :
+            if col in self.sketches :
+                self.sketches[col].merge(sketch)
+            else :
+                self.sketches[col] = QuantileSketch.from_dict(sketch.to_dict())
+        for col , counts in other.value_counts.items() :
+            mine = self.value_counts.setdefault(col , {})
+            for value , count in counts.items() :
+                mine[value] = mine.get(value , 0) + count
+        return self
+
+
+    def finalize(self) -> "FeatureTransform" :
+        """Compiles the statistics into fill values and category replacements."""
+        mixed = set(self.sketches) & set(self.value_counts)
+        if mixed :
+            raise ValueError(f"Columns are numeric in some chunks and text in others: {sorted(mixed)}")
+
+        self.numeric_cols = [col for col in self.columns if col not in self.value_counts]
+
+        # EVERY COLUMN GETS A FILL VALUE (A NO-OP WHERE NOTHING IS MISSING), SO SERVING AND BULK
+        # SCORING CAN FILL GAPS IN COLUMNS THAT HAPPENED TO BE COMPLETE IN THE TRAINING DATA
+        self.fill_values = {col : self.sketches[col].median() for col in self.numeric_cols if col in self.sketches}
+
+        # COUNTS AS THEY LOOK AFTER FILLING (THE MODE ABSORBS THE GAPS) AND AFTER THE KNOWN FIXES
+        final_counts = {}
+        for col , counts in self.value_counts.items() :
+            counts = dict(counts)
+            if counts :
+                top = max(counts.values())
+                # pandas mode() IS SORTED, SO TIES GO TO THE SMALLEST VALUE
+                mode = min(value for value , count in counts.items() if count == top)
+                self.fill_values[col] = mode
+                counts[mode] += self.missing_counts[col]
+            final_counts[col] = counts
+
+        if 'Fe Male' in final_counts.get('Gender' , {}) :
+            gender = final_counts['Gender']
+            gender['Female'] = gender.get('Female' , 0) + gender.pop('Fe Male')
+
+        marital = final_counts.get('MaritalStatus' , {})
+        self.merge_single = marital.get('Single' , 0) > 0 and marital.get('Unmarried' , 0) > 0
+        if self.merge_single :
+            marital['Unmarried'] += marital.pop('Single')
+
+        self.rare_categories = {}
+        for col , counts in final_counts.items() :
+            rare = [value for value , count in counts.items() if count < self.rare_threshold]
+            if rare :
+                self.rare_categories[col] = rare
+
+        self._compile_replacements()
+        return self
+
+
+    def _compile_replacements(self) :
+        # ONE {raw value: final value} LOOKUP PER CATEGORICAL COLUMN: FIX FIRST, THEN RARE -> 'Other'
+        self.replacements = {'Gender' : {'Fe Male' : 'Female'}}
+        if self.merge_single :
+            self.replacements['MaritalStatus'] = {'Single' : 'Unmarried'}
+        for col , rare in self.rare_categories.items() :
+            mapping = self.replacements.setdefault(col , {})
+            for source , target in list(mapping.items()) :
+                if target in rare :
+                    mapping[source] = 'Other'
+            for value in rare :
+                mapping[value] = 'Other'
+
+
+    def transform(self , df : pd.DataFrame) -> pd.DataFrame :
+        """
+        Applies the fitted state to a cleaned, deduplicated frame, in place: fill, convert to
+        the compact int dtypes, known fixes, rare categories, feature engineering.
+        Unknown columns pass through.
+        """
+        fill_missing(df , self.fill_values)
+
+        for col in self.numeric_cols :
+            if col in df.columns and df[col].dtype != int_dtype(col) :
+                df[col] = df[col].astype(int_dtype(col))
+
+        for col , mapping in self.replacements.items() :
+            if col in df.columns :
+                replace_values(df , col , mapping)
+
+        return engineer_features(df)
+
+
+    def transform_record(self , record : dict) -> dict :
+        """Same as transform() for one request dictionary, without building a DataFrame."""
+        out = {}
+        for col , value in record.items() :
+            # None FROM JSON, NaN FROM A DataFrame ROW
+            if value is None or value != value :
+                value = self.fill_values.get(col)
+                if col in self.numeric_cols and value is not None :
+                    value = int(value)
+            mapping = self.replacements.get(col)
+            if mapping is not None :
+                value = mapping.get(value , value)
+            out[col] = value
+
+        if 'NumberOfPersonVisiting' in out and 'NumberOfChildrenVisiting' in out :
+            children = out.pop('NumberOfChildrenVisiting')
+            out['TotalPersonVisiting'] = out.pop('NumberOfPersonVisiting') + children
+            out['isChildrenVisiting'] = 1 if children > 0 else 0
+        return out
+
+
+    def to_dict(self) -> dict :
+        return {
+            "rare_threshold" : self.rare_threshold ,
+            "n_rows" : self.n_rows ,
+            "columns" : self.columns ,
+            "missing_counts" : self.missing_counts ,
+            "sketches" : {col : sketch.to_dict() for col , sketch in self.sketches.items()} ,
+            "value_counts" : self.value_counts ,
+            "fill_values" : self.fill_values ,
+            "merge_single" : self.merge_single ,
+            "rare_categories" : self.rare_categories ,
+        }
+
+
+    @classmethod
+    def from_dict(cls , state : dict) -> "FeatureTransform" :
+        features = cls(rare_threshold = state["rare_threshold"])
+        features.n_rows = state["n_rows"]
+        features.columns = state["columns"]
+        features.missing_counts = state["missing_counts"]
+        features.sketches = {col : QuantileSketch.from_dict(sketch) for col , sketch in state["sketches"].items()}
+        features.value_counts = state["value_counts"]
+        features.numeric_cols = [col for col in features.columns if col not in features.value_counts]
+        features.fill_values = state["fill_values"]
+        features.merge_single = state["merge_single"]
+        features.rare_categories = state["rare_categories"]
+        features._compile_replacements()
+        return features
+
+
+    def save(self , path : str) :
+        """Writes the state as JSON through a temporary file, like the model artifacts."""
+        with open(path + ".tmp" , "w") as f :
+            json.dump(self.to_dict() , f , separators = (",", ":"))
+        os.replace(path + ".tmp" , path)
+
+
+    @classmethod
+    def load(cls , path : str) -> "FeatureTransform" :
+        with open(path) as f :
+            return cls.from_dict(json.load(f))
+
+
+def fill_missing(df : pd.DataFrame , fill_values : dict) -> pd.DataFrame :
+    """
+    df.fillna(fill_values) in place that also works on compact dtypes: a fractional median is
+    truncated for nullable integer columns (the int conversion that follows would truncate it
+    anyway) and a mode that is not one of a category column's categories is added first.
+    """
+    for col , value in fill_values.items() :
+        if col not in df.columns or not df[col].hasnans :
+            continue
+        values = df[col]
+        if isinstance(values.dtype , pd.CategoricalDtype) :
+            if value not in values.cat.categories :
+                values = values.cat.add_categories([value])
+        elif pd.api.types.is_integer_dtype(values.dtype) :
+            value = int(value)
+        df[col] = values.fillna(value)
+    return df
+
+
+def replace_values(df : pd.DataFrame , col : str , mapping : dict) :
+    """
+    df[col].replace(mapping) in place. Category columns are remapped through their categories
+    and integer codes, so the cost no longer depends on how many rows hold each value.
+    """
+    values = df[col]
+    if isinstance(values.dtype , pd.CategoricalDtype) :
+        categories = list(values.cat.categories)
+        renamed = [mapping.get(category , category) for category in categories]
+        if renamed == categories :
+            return
+        # SORTED LIKE read_csv CATEGORIES, SO mode() TIES STILL GO TO THE SMALLEST VALUE
+        new_categories = pd.Index(sorted(set(renamed)))
+        lookup = new_categories.get_indexer(renamed)
+        codes = values.cat.codes.to_numpy()
+        new_codes = np.where(codes >= 0 , lookup[codes] , -1)
+        df[col] = pd.Categorical.from_codes(new_codes , categories = new_categories)
+        return
+
+    targets = {}
+    for source , target in mapping.items() :
+        targets.setdefault(target , []).append(source)
+    for target , sources in targets.items() :
+        mask = values.isin(sources)
+        if mask.any() :
+            df.loc[mask , col] = target
+
+
+# RAW RECORD FIELDS EACH ENGINEERED COLUMN IS COMPUTED FROM; EVERY OTHER MODEL COLUMN IS A RAW FIELD ITSELF
+ENGINEERED_SOURCES = {
+    'TotalPersonVisiting' : ('NumberOfPersonVisiting' , 'NumberOfChildrenVisiting') ,
+    'isChildrenVisiting' : ('NumberOfChildrenVisiting' ,) ,
+}
+
+
+def field_projection(columns : list) -> tuple :
+    """
+    (fields, matrix) mapping values per model input column back to the raw record fields:
+    values @ matrix is one value per field. An engineered column is split evenly between the
+    fields it is computed from, so per-column attributions keep their sum.
+    """
+    fields = []
+    for col in columns :
+        for field in ENGINEERED_SOURCES.get(col , (col ,)) :
+            if field not in fields :
+                fields.append(field)
+
+    matrix = np.zeros((len(columns) , len(fields)) , dtype = np.float32)
+    for i , col in enumerate(columns) :
+        sources = ENGINEERED_SOURCES.get(col , (col ,))
+        for field in sources :
+            matrix[i , fields.index(field)] = 1.0 / len(sources)
+    return fields , matrix
+
+
+def engineer_features(df : pd.DataFrame) -> pd.DataFrame :
+    """NumberOfPersonVisiting + NumberOfChildrenVisiting -> TotalPersonVisiting, isChildrenVisiting."""
+    if {'NumberOfPersonVisiting', 'NumberOfChildrenVisiting'}.issubset(df.columns):
+        children = df.pop('NumberOfChildrenVisiting')
+        total = df.pop('NumberOfPersonVisiting') + children
+        # AN UNFITTED TRANSFORM (BULK SCORING WITH AN OLD ARTIFACT) CAN LEAVE GAPS, THOSE STAY FLOAT
+        df['TotalPersonVisiting'] = total if total.hasnans else total.astype(int_dtype('TotalPersonVisiting'))
+        df['isChildrenVisiting'] = children.gt(0).fillna(False).astype(int_dtype('isChildrenVisiting'))
+    return df
+
+
+def features_path(pipeline_path : str) -> str :
+    """artifacts/best_model_pipeline.pkl -> artifacts/best_model_pipeline.features.json"""
+    return os.path.splitext(pipeline_path)[0] + ".features.json"
+
+
+def load_features(pipeline_path : str) -> FeatureTransform :
+    """The transform saved next to a pipeline, or an unfitted one for artifacts that predate it."""
+    path = features_path(pipeline_path)
+    if not os.path.exists(path) :
+        return FeatureTransform().finalize()
+    return FeatureTransform.load(path)
@@ -0,0 +1,206 @@
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+
+class CompiledPipeline :
+    """
+    Flattens a fitted ColumnTransformer + XGBClassifier pipeline into NumPy lookup arrays.
+
+    One-hot categories and scaler means/scales are extracted once, so a request is encoded
+    straight into a preallocated float32 row and scored with a single booster call instead of
+    running the ColumnTransformer and the booster twice (predict + predict_proba).
+    Raises ValueError if the pipeline contains steps it does not know how to compile.
+    """
+
+    def __init__(self , pipeline) :
+        preprocessor = pipeline.steps[0][1]
+        model = pipeline.steps[-1][1]
+
+        self.booster = model.get_booster()
+        objective = json.loads(self.booster.save_config())["learner"]["objective"]["name"]
+        if objective != "binary:logistic" :
+            raise ValueError(f"Unsupported objective for compiled inference: {objective}")
+
+        self.missing = model.missing
+        try :
+            self.iteration_range = (0 , model.best_iteration + 1)
+        except AttributeError :
+            self.iteration_range = (0 , 0)
+
+        # CATEGORICAL COLUMN -> {category : output position}, DROPPED / UNKNOWN CATEGORIES ENCODE AS ALL ZEROS
+        self.cat_lookup = {}
+
+        # NUMERIC COLUMNS ARE STANDARDISED AS (x - mean) / scale AND WRITTEN TO num_index
+        num_cols , num_index , num_mean , num_scale = [] , [] , [] , []
+
+        # ENCODED POSITION -> INDEX OF THE INPUT COLUMN IT WAS ENCODED FROM, FOR ATTRIBUTIONS
+        self.input_columns , owner = [] , []
+
+        position = 0
+        for name , transformer , columns in preprocessor.transformers_ :
+            columns = self._column_names(preprocessor , columns)
+            if transformer == "drop" or not columns :
+                continue
+
+            if isinstance(transformer , OneHotEncoder) :
+                if transformer.handle_unknown != "ignore" or getattr(transformer , "_infrequent_enabled" , False) :
+                    raise ValueError(f"Unsupported OneHotEncoder configuration in '{name}'")
+
+                drop_idx = transformer.drop_idx_
+                for i , (col , categories) in enumerate(zip(columns , transformer.categories_)) :
+                    dropped = None if drop_idx is None else drop_idx[i]
+                    lookup = {}
+                    for j , category in enumerate(categories) :
+                        if j == dropped :
+                            continue
+                        lookup[category] = position
+                        owner.append(len(self.input_columns))
+                        position += 1
+                    self.cat_lookup[col] = lookup
+                    self.input_columns.append(col)
+
+            elif isinstance(transformer , StandardScaler) or transformer == "passthrough" :
+                n = len(columns)
+                if transformer == "passthrough" :
+                    mean , scale = np.zeros(n) , np.ones(n)
+                else :
+                    mean = transformer.mean_ if transformer.with_mean else np.zeros(n)
+                    scale = transformer.scale_ if transformer.with_std else np.ones(n)
+
+                num_cols.extend(columns)
+                num_index.extend(range(position , position + n))
+                owner.extend(range(len(self.input_columns) , len(self.input_columns) + n))
+                self.input_columns.extend(columns)
+                num_mean.extend(mean)
+                num_scale.extend(scale)
+                position += n
+
+            else :
+                raise ValueError(f"Unsupported transformer for compiled inference: {type(transformer).__name__}")
+
+        self.n_features = position
+        if self.n_features != self.booster.num_features() :
+            raise ValueError(f"Encoded width {self.n_features} does not match booster features {self.booster.num_features()}")
+
+        self.num_cols = num_cols
+        self.num_index = np.asarray(num_index , dtype = np.intp)
+        self.num_mean = np.asarray(num_mean , dtype = np.float64)
+        self.num_scale = np.asarray(num_scale , dtype = np.float64)
+
+        # SUMS THE ONE-HOT COLUMNS OF EACH CATEGORICAL INPUT INTO ONE ATTRIBUTION
+        self.column_groups = np.zeros((self.n_features , len(self.input_columns)) , dtype = np.float32)
+        self.column_groups[np.arange(self.n_features) , owner] = 1.0
+
+        # ONE PREALLOCATED ROW PER THREAD SO CONCURRENT REQUESTS NEVER SHARE A BUFFER
+        self._local = threading.local()
+
+
+    @staticmethod
+    def _column_names(preprocessor , columns) -> list :
+        if isinstance(columns , str) :
+            return [columns]
+        columns = list(columns)
+        if columns and not isinstance(columns[0] , str) :
+            names = preprocessor.feature_names_in_
+            if isinstance(columns[0] , (bool , np.bool_)) :
+                return [n for n , keep in zip(names , columns) if keep]
+            return [names[i] for i in columns]
+        return columns
+
+
+    def _row(self) -> np.ndarray :
+        row = getattr(self._local , "row" , None)
+        if row is None :
+            row = self._local.row = np.zeros((1 , self.n_features) , dtype = np.float32)
+        return row
+
+
+    def encode_one(self , record : dict) -> np.ndarray :
+        """Encodes one feature dictionary into this thread's preallocated (1, n_features) row."""
+        row = self._row()
+        row.fill(0.0)
+        out = row[0]
+
+        for col , lookup in self.cat_lookup.items() :
+            idx = lookup.get(record[col])
+            if idx is not None :
+                out[idx] = 1.0
+
+        values = np.fromiter((record[col] for col in self.num_cols) , dtype = np.float64 , count = len(self.num_cols))
+        out[self.num_index] = (values - self.num_mean) / self.num_scale
+        return row
+
+
+    def transform(self , data) -> np.ndarray :
+        """Encodes a DataFrame or a list of feature dictionaries into an (n, n_features) float32 matrix."""
+        n = len(data)
+        X = np.zeros((n , self.n_features) , dtype = np.float32)
+        if n == 0 :
+            return X
+
+        if isinstance(data , pd.DataFrame) :
+            column = lambda col : data[col]
+            numeric = np.column_stack([data[col].to_numpy(dtype = np.float64 , na_value = np.nan) for col in self.num_cols])
+        else :
+            column = lambda col : np.array([record[col] for record in data] , dtype = object)
+            numeric = np.array([[record[col] for col in self.num_cols] for record in data] , dtype = np.float64)
+
+        rows = np.arange(n)
+        for col , lookup in self.cat_lookup.items() :
+            values = column(col)
+            if isinstance(values , pd.Series) and isinstance(values.dtype , pd.CategoricalDtype) :
+                # ONE SCATTER FROM THE CATEGORY CODES INSTEAD OF A STRING COMPARISON PER ONE-HOT COLUMN
+                code_to_idx = np.full(len(values.cat.categories) + 1 , -1 , dtype = np.intp)
+                codes = values.cat.categories.get_indexer(list(lookup))
+                code_to_idx[codes[codes >= 0]] = np.fromiter(lookup.values() , dtype = np.intp)[codes >= 0]
+                idx = code_to_idx[values.cat.codes.to_numpy()]
+                hit = idx >= 0
+                X[rows[hit] , idx[hit]] = 1.0
+                continue
+
+            values = np.asarray(values , dtype = object) if isinstance(values , pd.Series) else values
+            for category , idx in lookup.items() :
+                X[: , idx] = values == category
+
+        X[: , self.num_index] = (numeric - self.num_mean) / self.num_scale
+        return X
+
+
+    def predict_encoded(self , X : np.ndarray) -> np.ndarray :
+        """Returns [prob_class_0, prob_class_1] per row from one booster call on encoded rows."""
+        p = self.booster.inplace_predict(
+            X ,
+            iteration_range = self.iteration_range ,
+            missing = self.missing ,
+            validate_features = False ,
+        ).astype(np.float32 , copy = False)
+        return np.column_stack((1 - p , p))
+
+
+    def contributions(self , X : np.ndarray) -> tuple :
+        """
+        Tree SHAP attributions of encoded rows from one booster call: (contributions per input
+        column, shape (n, len(input_columns)), bias per row), both in log-odds. Each row's
+        contributions plus its bias add up to its margin, so the probability is
+        sigmoid(contributions.sum(axis=1) + bias) and needs no second booster call.
+        """
+        contribs = self.booster.predict(
+            xgb.DMatrix(X , missing = self.missing) ,
+            pred_contribs = True ,
+            iteration_range = self.iteration_range ,
+            validate_features = False ,
+        )
+        return contribs[: , :-1] @ self.column_groups , contribs[: , -1]
+
+
+    def predict_proba_one(self , record : dict) -> np.ndarray :
+        return self.predict_encoded(self.encode_one(record))[0]
+
+
+    def predict_proba(self , data) -> np.ndarray :
+        return self.predict_encoded(self.transform(data))
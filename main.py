@@ -1,13 +1,81 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+
+import json
+
+from fastapi import FastAPI , Header , Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.responses import JSONResponse , StreamingResponse , PlainTextResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 import joblib
 
 from schema.user_input import UserInput
-from predict import predict_output , MODEL_VERSION , model_pipeline
-from schema.prediction_response import PredictionResponse
+from schema.batch_input import BatchUserInput
+from predict import predict_batch , explain_batch , registry , prediction_cache
+from schema.prediction_response import PredictionResponse , BatchPredictionResponse , ExplanationResponse , BatchExplanationResponse
+from scheduler import MicroBatchScheduler , QueueFullError
+from metrics import REGISTRY , GaugeCollector , MetricsMiddleware , record_error
+from config import MICROBATCH_MAX_SIZE , MICROBATCH_MAX_WAIT_MS , MICROBATCH_MAX_QUEUE_SIZE , ADMIN_TOKEN , STREAM_BATCH_SIZE
+
+
+# CONCURRENT /predict CALLS ARE MERGED INTO ONE predict_batch CALL
+scheduler = MicroBatchScheduler(
+    predict_batch ,
+    max_batch_size = MICROBATCH_MAX_SIZE ,
+    max_wait_ms = MICROBATCH_MAX_WAIT_MS ,
+    max_queue_size = MICROBATCH_MAX_QUEUE_SIZE ,
+)
+
+
+@asynccontextmanager
+async def lifespan(app : FastAPI) :
+    await scheduler.start()
+    registry.start_watching()
+    yield
+    registry.stop_watching()
+    await scheduler.stop()
+
+
+app = FastAPI(lifespan = lifespan)
+app.add_middleware(MetricsMiddleware)
+
 
+# SERVING STATE EXPORTED AS GAUGES, READ AT SCRAPE TIME
+for name , documentation , fn in [
+    ("scheduler_queue_depth" , "Requests waiting in the micro-batching queue" , lambda : scheduler.stats()["queue_depth"]) ,
+    ("scheduler_max_batch_size" , "Configured micro-batch size limit" , lambda : scheduler.max_batch_size) ,
+    ("scheduler_max_wait_seconds" , "Configured micro-batch wait limit" , lambda : scheduler.max_wait) ,
+    ("scheduler_batches_total" , "Micro-batches scored since start" , lambda : scheduler.batches_total) ,
+    ("scheduler_rejected_total" , "Requests rejected because the queue was full" , lambda : scheduler.rejected_total) ,
+    ("prediction_cache_size" , "Entries in the prediction cache" , lambda : prediction_cache.stats()["size"]) ,
+    ("prediction_cache_hits_total" , "Prediction cache hits" , lambda : prediction_cache.hits) ,
+    ("prediction_cache_misses_total" , "Prediction cache misses" , lambda : prediction_cache.misses) ,
+    ("prediction_cache_evictions_total" , "Prediction cache LRU evictions" , lambda : prediction_cache.evictions) ,
+    ("model_reloads_total" , "Models hot-swapped since start" , lambda : registry.reloads) ,
+] :
+    REGISTRY.register(GaugeCollector(name , documentation , fn , kind = "counter" if name.endswith("_total") else "gauge"))
 
-app = FastAPI()
+
+@app.exception_handler(RequestValidationError)
+async def count_validation_errors(request : Request , exc : RequestValidationError) :
+    record_error(exc)
+    return await request_validation_exception_handler(request , exc)
+
+
+class DuplexStreamingResponse(StreamingResponse) :
+    """
+    StreamingResponse whose body generator may still be reading the request body.
+
+    The stock response listens for client disconnects by consuming receive() messages,
+    which would swallow request body chunks; here disconnects surface through
+    request.stream() instead.
+    """
+
+    async def __call__(self , scope , receive , send) :
+        await self.stream_response(send)
+        if self.background is not None :
+            await self.background()
 
 
 @app.get("/")
@@ -17,42 +85,170 @@ def read_root() :
 
 @app.get("/health")
 def health_check() :
-    return {"status" :"ok" , "version" : MODEL_VERSION , "model_loaded" : model_pipeline is not None}
+    model = registry.current
+    if model is None :
+        return {"status" :"ok" , "version" : None , "model_loaded" : False , "model" : None}
+    return {"status" :"ok" , "version" : model.version , "model_loaded" : True , "model" : model.info()}
+
+
+@app.get("/stats")
+def serving_stats() :
+    return {"scheduler" : scheduler.stats() , "cache" : prediction_cache.stats() , "registry" : registry.stats()}
+
+
+@app.get("/metrics" , response_class = PlainTextResponse)
+def prometheus_metrics() :
+    return PlainTextResponse(REGISTRY.render() , media_type = "text/plain; version=0.0.4")
+
+
+@app.post("/predict/stream")
+async def predict_prospenity_stream(request : Request) :
+
+    """
+    Scores an NDJSON body (one UserInput object per line) and streams NDJSON results back.
+
+    Each output line is {"line": n, ...PredictionResponse} or {"line": n, "error": ...} for a
+    line that failed validation, in input order. The body is read incrementally and valid
+    lines are scored in batches of STREAM_BATCH_SIZE, so results start flowing before the
+    whole payload has arrived.
+    """
+
+    async def score(pending : list) :
+        inputs = [item for _ , item , error in pending if error is None]
+        predictions = iter(await run_in_threadpool(predict_batch , inputs)) if inputs else iter(())
+
+        out = []
+        for line_no , _ , error in pending :
+            if error is None :
+                out.append(json.dumps({"line" : line_no , **next(predictions)}))
+            else :
+                out.append(json.dumps({"line" : line_no , "error" : error}))
+        return "\n".join(out) + "\n"
+
+    def parse(line_no : int , line : bytes) :
+        try :
+            return (line_no , UserInput.model_validate_json(line).to_record() , None)
+        except ValidationError as e :
+            return (line_no , None , json.loads(e.json(include_url = False , include_context = False)))
+
+    async def results() :
+        buffer = b""
+        line_no = 0
+        pending = []
+
+        try :
+            async for chunk in request.stream() :
+                buffer += chunk
+                *lines , buffer = buffer.split(b"\n")
+
+                for line in lines :
+                    line_no += 1
+                    if line.strip() :
+                        pending.append(parse(line_no , line))
+                    if len(pending) >= STREAM_BATCH_SIZE :
+                        yield await score(pending)
+                        pending = []
+
+                # SCORE WHAT ARRIVED WITH THIS CHUNK INSTEAD OF WAITING FOR THE NEXT ONE
+                if pending :
+                    yield await score(pending)
+                    pending = []
+
+            if buffer.strip() :
+                line_no += 1
+                pending.append(parse(line_no , buffer))
+            if pending :
+                yield await score(pending)
+
+        except Exception as e :
+            record_error(e)
+            # THE STATUS LINE IS ALREADY SENT, SO REPORT THE FAILURE IN-BAND AND STOP
+            yield json.dumps({"line" : line_no , "error" : str(e) , "fatal" : True}) + "\n"
+
+    return DuplexStreamingResponse(results() , media_type = "application/x-ndjson")
+
+
+
+@app.post("/admin/reload")
+async def reload_model(force : bool = False , x_admin_token : str | None = Header(default = None)) :
+
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN :
+        return JSONResponse(status_code=403, content={"error": "Invalid admin token"})
+
+    try :
+        # Loading and warming run on the threadpool, requests keep using the current model meanwhile
+        reloaded = await run_in_threadpool(registry.reload , force)
+
+        return {"reloaded" : reloaded , "version" : registry.current.version , "model" : registry.current.info()}
+
+    except Exception as e :
+        record_error(e)
+        return JSONResponse(status_code=500, content={"error": str(e) , "version" : registry.current.version})
 
 
 
 @app.post("/predict" , response_model = PredictionResponse)
-def predict_prospenity(data : UserInput) :
-
-    input_data = {
-
-        'Age': data.Age,
-        'TypeofContact': data.TypeofContact,
-        'CityTier': data.CityTier,
-        'DurationOfPitch': data.DurationOfPitch,
-        'Occupation': data.Occupation,
-        'Gender' : data.Gender,
-        'NumberOfFollowups' : data.NumberOfFollowups,
-        'ProductPitched' : data.ProductPitched,
-        'PreferredPropertyStar' : data.PreferredPropertyStar,
-        'MaritalStatus' : data.MaritalStatus,
-        'NumberOfTrips' : data.NumberOfTrips,
-        'Passport' : data.Passport,
-        'PitchSatisfactionScore' : data.PitchSatisfactionScore,
-        'OwnCar' : data.OwnCar,
-        'Designation' : data.Designation,
-        'MonthlyIncome' : data.MonthlyIncome,
-        'TotalPersonVisiting' : data.total_person_visiting,
-        'isChildrenVisiting' : data.is_children_visiting
-
-    }
+async def predict_prospenity(data : UserInput) :
+
+    input_data = data.to_record()
 
     try :
-        prediction = predict_output(input_data)
+        prediction = await scheduler.submit(input_data)
 
         return JSONResponse(status_code = 200 , content = prediction)
-    
+
+    except QueueFullError as e :
+        record_error(e)
+        return JSONResponse(status_code=503, content={"error": str(e)})
+
+    except Exception as e :
+        record_error(e)
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+
+@app.post("/predict/batch" , response_model = BatchPredictionResponse)
+def predict_prospenity_batch(data : BatchUserInput) :
+
+    input_data = [customer.to_record() for customer in data.customers]
+
+    try :
+        predictions = predict_batch(input_data)
+
+        return JSONResponse(status_code = 200 , content = {"predictions" : predictions})
+
     except Exception as e :
+        record_error(e)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+
+@app.post("/explain" , response_model = ExplanationResponse)
+def explain_prospenity(data : UserInput) :
+
+    input_data = data.to_record()
+
+    try :
+        explanation = explain_batch([input_data])[0]
+
+        return JSONResponse(status_code = 200 , content = explanation)
+
+    except Exception as e :
+        record_error(e)
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+
+@app.post("/explain/batch" , response_model = BatchExplanationResponse)
+def explain_prospenity_batch(data : BatchUserInput) :
+
+    input_data = [customer.to_record() for customer in data.customers]
+
+    try :
+        explanations = explain_batch(input_data)
+
+        return JSONResponse(status_code = 200 , content = {"predictions" : explanations})
+
+    except Exception as e :
+        record_error(e)
+        return JSONResponse(status_code=500, content={"error": str(e)})
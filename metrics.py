@@ -0,0 +1,178 @@
+import bisect
+import threading
+import time
+
+
+# LATENCY BUCKETS IN SECONDS, FROM 50us (ONE ENCODED ROW) TO 5s (A LARGE BATCH)
+DEFAULT_BUCKETS = (0.00005 , 0.0001 , 0.00025 , 0.0005 , 0.001 , 0.0025 , 0.005 , 0.01 , 0.025 , 0.05 , 0.1 , 0.25 , 0.5 , 1.0 , 2.5 , 5.0)
+
+
+def _escape(value) -> str :
+    return str(value).replace("\\" , "\\\\").replace('"' , '\\"').replace("\n" , "\\n")
+
+
+def _format_labels(labelnames : tuple , values : tuple , extra : str = "") -> str :
+    parts = [f'{name}="{_escape(value)}"' for name , value in zip(labelnames , values)]
+    if extra :
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter :
+    def __init__(self , name : str , documentation : str , labelnames : tuple = ()) :
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self , amount : float = 1 , *labelvalues) :
+        with self._lock :
+            self._values[labelvalues] = self._values.get(labelvalues , 0) + amount
+
+    def render(self) -> list :
+        lines = [f"# HELP {self.name} {self.documentation}" , f"# TYPE {self.name} counter"]
+        with self._lock :
+            for labelvalues , value in sorted(self._values.items()) :
+                lines.append(f"{self.name}{_format_labels(self.labelnames , labelvalues)} {value}")
+        return lines
+
+
+class Histogram :
+    def __init__(self , name : str , documentation : str , labelnames : tuple = () , buckets : tuple = DEFAULT_BUCKETS) :
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labelvalues -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self , value : float , *labelvalues) :
+        index = bisect.bisect_left(self.buckets , value)
+        with self._lock :
+            series = self._series.get(labelvalues)
+            if series is None :
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1) , 0.0 , 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list :
+        lines = [f"# HELP {self.name} {self.documentation}" , f"# TYPE {self.name} histogram"]
+        with self._lock :
+            for labelvalues , (counts , total , count) in sorted(self._series.items()) :
+                cumulative = 0
+                for bound , bucket_count in zip(self.buckets + (float("inf") ,) , counts) :
+                    cumulative += bucket_count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames , labelvalues , le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames , labelvalues)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames , labelvalues)} {count}")
+        return lines
+
+
+class GaugeCollector :
+    """
+    Value read from a callback at scrape time, e.g. scheduler queue depth or cache size.
+    kind="counter" exposes monotonic totals kept elsewhere (cache hits, reloads) as counters.
+    """
+
+    def __init__(self , name : str , documentation : str , fn , kind : str = "gauge") :
+        self.name = name
+        self.documentation = documentation
+        self.fn = fn
+        self.kind = kind
+
+    def render(self) -> list :
+        return [f"# HELP {self.name} {self.documentation}" , f"# TYPE {self.name} {self.kind}" , f"{self.name} {float(self.fn())}"]
+
+
+class MetricsRegistry :
+    def __init__(self) :
+        self._metrics = []
+
+    def register(self , metric) :
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str :
+        lines = []
+        for metric in self._metrics :
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "prediction_stage_seconds" ,
+    "Time spent in each stage of the prediction hot path" ,
+    ("stage" ,) ,
+))
+BATCH_ROWS = REGISTRY.register(Histogram(
+    "prediction_batch_rows" ,
+    "Rows scored per pipeline call" ,
+    buckets = (1 , 2 , 4 , 8 , 16 , 32 , 64 , 128 , 256 , 512 , 1024 , 4096) ,
+))
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "http_requests_total" ,
+    "HTTP requests by route and status code" ,
+    ("method" , "route" , "status") ,
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds" ,
+    "End-to-end HTTP request latency by route" ,
+    ("route" ,) ,
+))
+ERRORS_TOTAL = REGISTRY.register(Counter(
+    "prediction_errors_total" ,
+    "Errors raised while serving requests by exception type" ,
+    ("exception" ,) ,
+))
+
+
+def observe_stage(stage : str , started : float) -> float :
+    """Records perf_counter() - started for a stage and returns the current perf_counter()."""
+    now = time.perf_counter()
+    STAGE_SECONDS.observe(now - started , stage)
+    return now
+
+
+def record_error(error : BaseException) :
+    ERRORS_TOTAL.inc(1 , type(error).__name__)
+
+
+class MetricsMiddleware :
+    """
+    Pure ASGI middleware counting requests and timing them per route template
+    (e.g. /predict/batch, not the raw URL), so label cardinality stays bounded.
+    """
+
+    def __init__(self , app) :
+        self.app = app
+
+    async def __call__(self , scope , receive , send) :
+        if scope["type"] != "http" :
+            await self.app(scope , receive , send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message) :
+            nonlocal status
+            if message["type"] == "http.response.start" :
+                status = message["status"]
+            await send(message)
+
+        try :
+            await self.app(scope , receive , send_wrapper)
+        except Exception as e :
+            record_error(e)
+            raise
+        finally :
+            route = scope.get("route")
+            path = getattr(route , "path" , "unmatched")
+            REQUESTS_TOTAL.inc(1 , scope["method"] , path , status)
+            REQUEST_SECONDS.observe(time.perf_counter() - started , path)
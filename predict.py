@@ -1,37 +1,35 @@
-import joblib
+import time
+
 import pandas as pd
 import numpy as np
 
+from metrics import observe_stage , BATCH_ROWS
+from registry import ModelRegistry
+from cache import PredictionCache
+from config import PREDICTION_CACHE_SIZE , PREDICTION_CACHE_TTL_SECONDS , MODEL_WATCH_INTERVAL_SECONDS
+
 PIPELINE_PATH = "artifacts/best_model_pipeline.pkl"
-model_pipeline = joblib.load(PIPELINE_PATH)
 
-MODEL_VERSION = "1.0.0"
+# THE MODEL IS LOADED ONCE HERE AND CAN LATER BE SWAPPED WITHOUT A RESTART
+registry = ModelRegistry(PIPELINE_PATH , watch_interval = MODEL_WATCH_INTERVAL_SECONDS)
+registry.load()
 
+# CACHED PREDICTIONS ARE TIED TO registry.current.key AND DROPPED WHEN THE MODEL CHANGES
+prediction_cache = PredictionCache(max_size = PREDICTION_CACHE_SIZE , ttl_seconds = PREDICTION_CACHE_TTL_SECONDS)
 
 
-def predict_output(user_input: dict):
+
+def format_prediction(pred_class: int, pred_proba) -> dict:
 
     """
-    Takes user input as a dictionary and returns:
-    - predicted class as 'Will Buy' or 'Will Not Buy'
-    - probability of the predicted class
-    - full probability distribution
+    Builds the response dictionary for one row from its class and [prob_class_0, prob_class_1].
     """
-    # Convert input to DataFrame
-    df = pd.DataFrame([user_input])
-
-    # Predict using the pipeline
-    pred_class = model_pipeline.predict(df)[0]
-    pred_proba = model_pipeline.predict_proba(df)[0]  # returns [prob_class_0, prob_class_1]
-
     # Human-readable prediction
     pred_label = "Likely To Buy" if pred_class == 1 else "Not Likely To Buy"
 
     # Confidence of the predicted class
     confidence = pred_proba[pred_class]
 
-    # Return dictionary with all info
-    
     return {
         "prediction": pred_label,
         "confidence": float(confidence),
@@ -39,4 +37,167 @@ def predict_output(user_input: dict):
             "Will Not Buy": float(pred_proba[0]),
             "Will Buy": float(pred_proba[1])
         }
-    }
\ No newline at end of file
+    }
+
+
+def _predict_proba(model, user_inputs: list[dict]) -> np.ndarray:
+
+    """
+    Returns [prob_class_0, prob_class_1] per row, recording how long each stage took.
+    Every path starts with the model's FeatureTransform on the raw records.
+    Compiled path: encode -> booster. Fallback path: dataframe -> column_transformer -> booster.
+    """
+    BATCH_ROWS.observe(len(user_inputs))
+    started = time.perf_counter()
+
+    # Fill, fix and engineer features with the state fitted at training time
+    user_inputs = [model.features.transform_record(user_input) for user_input in user_inputs]
+    started = observe_stage("features", started)
+
+    if model.compiled is not None :
+        if len(user_inputs) == 1 :
+            # Encode straight into a float32 row and run the booster once
+            X = model.compiled.encode_one(user_inputs[0])
+        else :
+            X = model.compiled.transform(user_inputs)
+        started = observe_stage("encode", started)
+
+        pred_proba = model.compiled.predict_encoded(X)
+        observe_stage("booster", started)
+        return pred_proba
+
+    df = pd.DataFrame(user_inputs)
+    started = observe_stage("dataframe", started)
+
+    X = model.pipeline[:-1].transform(df)
+    started = observe_stage("column_transformer", started)
+
+    pred_proba = model.pipeline[-1].predict_proba(X)
+    observe_stage("booster", started)
+    return pred_proba
+
+
+def format_explanation(fields: list, contributions, bias) -> dict:
+
+    """
+    Builds the explanation of one row from its per-field contributions and bias, in log-odds,
+    fields ordered by the size of their effect.
+    """
+    order = np.argsort(-np.abs(contributions), kind="stable")
+    return {
+        "base_value": float(bias),
+        "contributions": {fields[i]: float(contributions[i]) for i in order},
+    }
+
+
+def _explain(model, user_inputs: list[dict]) -> tuple:
+
+    """
+    Returns ([prob_class_0, prob_class_1] per row, contributions per request field, bias per row).
+    The probabilities come from _predict_proba, so they are exactly what /predict returns (the
+    sigmoid of the summed contributions differs in the last float32 bits); the contributions
+    come from one tree SHAP booster call on the whole encoded batch.
+    """
+    if model.compiled is None or model.field_projection is None :
+        raise ValueError(f"Model {model.version} could not be compiled and cannot be explained")
+
+    pred_proba = _predict_proba(model, user_inputs)
+    started = time.perf_counter()
+
+    # THE PREDICTION STAGES ARE ALREADY RECORDED BY _predict_proba, ONLY THE ATTRIBUTION IS TIMED HERE
+    X = model.compiled.transform([model.features.transform_record(user_input) for user_input in user_inputs])
+    contributions, bias = model.compiled.contributions(X)
+    field_contributions = contributions @ model.field_projection
+    observe_stage("contributions", started)
+    return pred_proba, field_contributions, bias
+
+
+def predict_output(user_input: dict):
+
+    """
+    Takes user input as a raw record (UserInput.to_record()) and returns:
+    - predicted class as 'Will Buy' or 'Will Not Buy'
+    - probability of the predicted class
+    - full probability distribution
+    """
+    # Snapshot the model so a concurrent reload cannot change it mid-request
+    model = registry.current
+
+    cache_key = prediction_cache.make_key(user_input)
+    cached = prediction_cache.get(cache_key , model.key)
+    if cached is not None :
+        return cached
+
+    pred_proba = _predict_proba(model, [user_input])[0]  # returns [prob_class_0, prob_class_1]
+
+    # The class is derived from the probabilities at the model's operating threshold
+    # instead of a second predict() pass
+    pred_class = int(pred_proba[1] > model.threshold)
+
+    # Return dictionary with all info
+    prediction = format_prediction(pred_class, pred_proba)
+    prediction_cache.put(cache_key , prediction , model.key)
+
+    return prediction
+
+
+def predict_batch(user_inputs: list[dict]) -> list[dict]:
+
+    """
+    Scores many customers with a single pass through the pipeline and returns
+    one prediction dictionary per input, in the same order.
+    """
+    if not user_inputs:
+        return []
+
+    model = registry.current
+
+    # Only rows missing from the cache go through the pipeline
+    cache_keys = [prediction_cache.make_key(user_input) for user_input in user_inputs]
+    predictions = [prediction_cache.get(key , model.key) for key in cache_keys]
+    missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+    if not missing:
+        return predictions
+
+    to_score = [user_inputs[i] for i in missing]
+    pred_proba = _predict_proba(model, to_score)
+
+    # One pass for the whole batch; the class is derived from the probabilities at the
+    # model's operating threshold instead of running the pipeline a second time through predict()
+    pred_class = (pred_proba[:, 1] > model.threshold).astype(int)
+
+    for i, c, p in zip(missing, pred_class, pred_proba):
+        predictions[i] = format_prediction(int(c), p)
+        prediction_cache.put(cache_keys[i] , predictions[i] , model.key)
+
+    return predictions
+
+
+def explain_batch(user_inputs: list[dict]) -> list[dict]:
+
+    """
+    Scores and explains many customers in one batch and returns one prediction dictionary per
+    input, in the same order, each with an "explanation": the log-odds contribution of every
+    request field and the base value they add to.
+    Explanations are cached under their own key next to the plain predictions, which are left untouched.
+    """
+    if not user_inputs:
+        return []
+
+    model = registry.current
+
+    cache_keys = [prediction_cache.make_key(user_input) for user_input in user_inputs]
+    explanations = [prediction_cache.get(key + ":explain" , model.key) for key in cache_keys]
+    missing = [i for i, explanation in enumerate(explanations) if explanation is None]
+    if not missing:
+        return explanations
+
+    to_explain = [user_inputs[i] for i in missing]
+    pred_proba, contributions, bias = _explain(model, to_explain)
+    pred_class = (pred_proba[:, 1] > model.threshold).astype(int)
+
+    for i, c, p, contribution, b in zip(missing, pred_class, pred_proba, contributions, bias):
+        explanations[i] = {**format_prediction(int(c), p), "explanation": format_explanation(model.explain_fields, contribution, b)}
+        prediction_cache.put(cache_keys[i] + ":explain" , explanations[i] , model.key)
+
+    return explanations
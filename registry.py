@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from inference import CompiledPipeline
+from features import features_path , load_features , field_projection
+from thresholds import evaluation_path , read_threshold
+
+logger = logging.getLogger(__name__)
+
+# USED WHEN AN ARTIFACT HAS NO METADATA FILE NEXT TO IT
+DEFAULT_MODEL_VERSION = "1.0.0"
+
+
+def metadata_path(pipeline_path : str) -> str :
+    """artifacts/best_model_pipeline.pkl -> artifacts/best_model_pipeline.json"""
+    return os.path.splitext(pipeline_path)[0] + ".json"
+
+
+def read_model_metadata(pipeline_path : str) -> dict :
+    path = metadata_path(pipeline_path)
+    if not os.path.exists(path) :
+        return {}
+    with open(path) as f :
+        return json.load(f)
+
+
+class LoadedModel :
+    """
+    One loaded, warmed model and everything derived from it.
+    Never mutated after creation, so a request that grabbed it keeps a consistent view.
+    """
+
+    def __init__(self , pipeline_path : str) :
+        with open(pipeline_path , "rb") as f :
+            raw = f.read()
+
+        self.path = pipeline_path
+        self.fingerprint = hashlib.sha256(raw).hexdigest()[:16]
+        self.metadata = read_model_metadata(pipeline_path)
+        self.version = str(self.metadata.get("version" , DEFAULT_MODEL_VERSION))
+        self.loaded_at = time.time()
+
+        self.pipeline = joblib.load(pipeline_path)
+        self.features = load_features(pipeline_path)
+        # PROBABILITY ABOVE WHICH A CUSTOMER IS "Likely To Buy", FROM THE CROSS-VALIDATION REPORT
+        self.threshold = read_threshold(pipeline_path)
+
+        # FUSED SINGLE-PASS ENGINE, FALLS BACK TO THE SKLEARN PIPELINE IF IT CANNOT BE COMPILED
+        try :
+            self.compiled = CompiledPipeline(self.pipeline)
+        except ValueError :
+            self.compiled = None
+
+        # /explain MAPS PER-COLUMN ATTRIBUTIONS TO THE REQUEST FIELDS THROUGH THIS, COMPILED MODELS ONLY
+        self.explain_fields , self.field_projection = field_projection(self.compiled.input_columns) if self.compiled is not None else (None , None)
+
+    @property
+    def key(self) -> str :
+        """Identifies this exact model version, artifact and threshold, e.g. for cache invalidation."""
+        return f"{self.version}:{self.fingerprint}:{self.threshold:g}"
+
+    def warm_up(self) :
+        """Runs one prediction so lazy initialisation happens before the model takes traffic."""
+        if self.compiled is not None :
+            self.compiled.predict_encoded(np.zeros((1 , self.compiled.n_features) , dtype = np.float32))
+
+    def info(self) -> dict :
+        return {
+            "version" : self.version ,
+            "fingerprint" : self.fingerprint ,
+            "path" : self.path ,
+            "loaded_at" : self.loaded_at ,
+            "compiled" : self.compiled is not None ,
+            "explainable" : self.field_projection is not None ,
+            "threshold" : self.threshold ,
+            "features_fitted_rows" : self.features.n_rows ,
+            "metadata" : self.metadata ,
+        }
+
+
+class ModelRegistry :
+    """
+    Holds the model currently used for serving and swaps in new artifacts without a restart.
+
+    A new artifact is loaded and warmed on the caller's (or watcher's) thread while requests
+    keep using the current model, then published with a single reference assignment.
+    In-flight requests finish on the model they started with.
+    """
+
+    def __init__(self , pipeline_path : str , watch_interval : float = 0) :
+        self.pipeline_path = pipeline_path
+        self.watch_interval = watch_interval
+
+        self._current = None
+        self._load_lock = threading.Lock()
+        self._signature = None
+        self._watcher = None
+        self._stop = threading.Event()
+
+        self.reloads = 0
+        self.last_error = None
+
+
+    @property
+    def current(self) -> LoadedModel :
+        return self._current
+
+
+    def _artifact_signature(self) :
+        """Cheap change detector: mtime and size of the pipeline, its metadata, feature transform and evaluation."""
+        signature = []
+        for path in (self.pipeline_path , metadata_path(self.pipeline_path) , features_path(self.pipeline_path) , evaluation_path(self.pipeline_path)) :
+            try :
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns , stat.st_size))
+            except FileNotFoundError :
+                signature.append(None)
+        return tuple(signature)
+
+
+    def load(self) -> LoadedModel :
+        """Loads, warms and publishes the artifact currently on disk."""
+        with self._load_lock :
+            signature = self._artifact_signature()
+            model = LoadedModel(self.pipeline_path)
+            model.warm_up()
+
+            previous = self._current
+            self._current = model
+            self._signature = signature
+            if previous is not None :
+                self.reloads += 1
+            logger.info(f"Serving model version {model.version} ({model.fingerprint})")
+            return model
+
+
+    def reload(self , force : bool = False) -> bool :
+        """Reloads if the artifact changed on disk (always when force=True). Returns True if a new model was published."""
+        if not force and self._artifact_signature() == self._signature :
+            return False
+        try :
+            self.load()
+            self.last_error = None
+            return True
+        except Exception as e :
+            # KEEP SERVING THE PREVIOUS MODEL IF THE NEW ARTIFACT IS BROKEN OR HALF WRITTEN
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("Model reload failed, keeping the current model")
+            raise
+
+
+    def _watch(self) :
+        pending = None
+        while not self._stop.wait(self.watch_interval) :
+            signature = self._artifact_signature()
+            if signature == self._signature :
+                pending = None
+                continue
+
+            # ONLY RELOAD ONCE THE FILES HAVE STOPPED CHANGING FOR A FULL INTERVAL
+            if signature != pending :
+                pending = signature
+                continue
+
+            try :
+                self.reload()
+            except Exception :
+                # DO NOT RETRY THE SAME BROKEN FILES, WAIT FOR THE NEXT CHANGE
+                self._signature = signature
+            pending = None
+
+
+    def start_watching(self) :
+        if self.watch_interval <= 0 or (self._watcher is not None and self._watcher.is_alive()) :
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target = self._watch , name = "model-registry-watcher" , daemon = True)
+        self._watcher.start()
+
+
+    def stop_watching(self) :
+        self._stop.set()
+        if self._watcher is not None :
+            self._watcher.join()
+            self._watcher = None
+
+
+    def stats(self) -> dict :
+        return {
+            "reloads" : self.reloads ,
+            "watch_interval_seconds" : self.watch_interval ,
+            "watching" : self._watcher is not None and self._watcher.is_alive() ,
+            "last_error" : self.last_error ,
+        }
@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+
+class QueueFullError(RuntimeError) :
+    """Raised when a request arrives while the scheduler queue is at max_queue_size."""
+
+
+class MicroBatchScheduler :
+    """
+    Merges concurrent single-row prediction requests into one batched pipeline call.
+
+    Requests are queued and a background task closes a batch once it holds max_batch_size
+    requests or the oldest request has waited max_wait_ms. The batch is scored with one call
+    to predict_fn (run on the threadpool) and each caller's future receives its own row.
+    """
+
+    def __init__(self , predict_fn , max_batch_size : int = 64 , max_wait_ms : float = 2.0 , max_queue_size : int = 1024) :
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+
+        self._queue = None
+        self._task = None
+
+        # COUNTERS EXPORTED THROUGH stats()
+        self.requests_total = 0
+        self.rejected_total = 0
+        self.batches_total = 0
+        self.scored_total = 0
+        self.batch_size_max = 0
+        self.last_batch_size = 0
+        self.queue_wait_seconds_total = 0.0
+        self.batch_seconds_total = 0.0
+
+
+    @property
+    def running(self) -> bool :
+        return self._task is not None and not self._task.done()
+
+
+    async def start(self) :
+        if self.running :
+            return
+        self._queue = asyncio.Queue(maxsize = self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+
+
+    async def stop(self) :
+        if self._task is None :
+            return
+        self._task.cancel()
+        try :
+            await self._task
+        except asyncio.CancelledError :
+            pass
+        self._task = None
+
+        # FAIL ANYTHING STILL WAITING SO NO CALLER HANGS ON SHUTDOWN
+        while not self._queue.empty() :
+            _ , future , _ = self._queue.get_nowait()
+            if not future.done() :
+                future.set_exception(RuntimeError("Scheduler stopped before the request was scored"))
+
+
+    async def submit(self , item) :
+        """Queues one input and waits for its own prediction."""
+        if not self.running :
+            raise RuntimeError("Scheduler is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        try :
+            self._queue.put_nowait((item , future , time.perf_counter()))
+        except asyncio.QueueFull :
+            self.rejected_total += 1
+            raise QueueFullError(f"Prediction queue is full ({self.max_queue_size} pending requests)")
+
+        self.requests_total += 1
+        return await future
+
+
+    async def _collect(self) -> list :
+        """Blocks for the first request, then keeps filling the batch until it is full or max_wait elapses."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size :
+            if not self._queue.empty() :
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0 :
+                break
+            try :
+                batch.append(await asyncio.wait_for(self._queue.get() , timeout))
+            except asyncio.TimeoutError :
+                break
+
+        return batch
+
+
+    async def _run(self) :
+        while True :
+            batch = await self._collect()
+
+            # CALLERS THAT DISCONNECTED WHILE QUEUED ARE NOT SCORED
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch :
+                continue
+
+            started = time.perf_counter()
+            self.batches_total += 1
+            self.scored_total += len(batch)
+            self.last_batch_size = len(batch)
+            self.batch_size_max = max(self.batch_size_max , len(batch))
+            self.queue_wait_seconds_total += sum(started - queued_at for _ , _ , queued_at in batch)
+
+            try :
+                results = await run_in_threadpool(self.predict_fn , [item for item , _ , _ in batch])
+            except Exception as e :
+                for _ , future , _ in batch :
+                    if not future.done() :
+                        future.set_exception(e)
+            else :
+                for (_ , future , _) , result in zip(batch , results) :
+                    if not future.done() :
+                        future.set_result(result)
+            finally :
+                self.batch_seconds_total += time.perf_counter() - started
+
+
+    def stats(self) -> dict :
+        return {
+            "max_batch_size" : self.max_batch_size ,
+            "max_wait_ms" : self.max_wait * 1000 ,
+            "max_queue_size" : self.max_queue_size ,
+            "queue_depth" : self._queue.qsize() if self._queue is not None else 0 ,
+            "requests_total" : self.requests_total ,
+            "rejected_total" : self.rejected_total ,
+            "batches_total" : self.batches_total ,
+            "last_batch_size" : self.last_batch_size ,
+            "max_observed_batch_size" : self.batch_size_max ,
+            "mean_batch_size" : self.scored_total / self.batches_total if self.batches_total else 0.0 ,
+            "queue_wait_seconds_total" : self.queue_wait_seconds_total ,
+            "batch_seconds_total" : self.batch_seconds_total ,
+        }
@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+
+from typing import List , Annotated
+
+from config import MAX_BATCH_SIZE
+from schema.user_input import UserInput
+
+
+class BatchUserInput(BaseModel) :
+    customers: Annotated[List[UserInput], Field(min_length=1 , max_length=MAX_BATCH_SIZE , description="Customers to score in a single pipeline call")]
@@ -0,0 +1,88 @@
+"""
+Compact pandas dtypes for the travel data.
+
+RAW_DTYPES is used when reading raw files: nullable integers sized to each field's range
+(raw numeric fields can be missing) and pandas 'category' for the low-cardinality text
+fields. CLEAN_DTYPES is what preprocessing converts to once the gaps are filled.
+Columns not listed keep whatever dtype pandas infers.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+CATEGORICAL_COLUMNS = ('TypeofContact' , 'Occupation' , 'Gender' , 'ProductPitched' , 'MaritalStatus' , 'Designation')
+
+CLEAN_DTYPES = {
+    'CustomerID' : 'int32' ,
+    'ProdTaken' : 'int8' ,
+    'Age' : 'int8' ,
+    'CityTier' : 'int8' ,
+    # PITCHES UP TO 127 MINUTES ARE IN THE DATA ALREADY, THE EDGE OF int8
+    'DurationOfPitch' : 'int16' ,
+    'NumberOfPersonVisiting' : 'int8' ,
+    'NumberOfFollowups' : 'int8' ,
+    'PreferredPropertyStar' : 'int8' ,
+    'NumberOfTrips' : 'int8' ,
+    'Passport' : 'int8' ,
+    'PitchSatisfactionScore' : 'int8' ,
+    'OwnCar' : 'int8' ,
+    'NumberOfChildrenVisiting' : 'int8' ,
+    'MonthlyIncome' : 'int32' ,
+    'TotalPersonVisiting' : 'int16' ,
+    'isChildrenVisiting' : 'int8' ,
+    **{col : 'category' for col in CATEGORICAL_COLUMNS} ,
+}
+
+# int8 -> Int8 AND SO ON, SO MISSING VALUES SURVIVE THE READ
+RAW_DTYPES = {col : (dtype.capitalize() if dtype != 'category' else dtype) for col , dtype in CLEAN_DTYPES.items()}
+
+
+def is_text_dtype(dtype) -> bool :
+    """True for the columns preprocessing treats as categorical: object strings or pandas categories."""
+    return dtype == object or isinstance(dtype , pd.CategoricalDtype)
+
+
+def int_dtype(col : str) :
+    """Target integer dtype of a numeric column once its missing values are filled."""
+    dtype = CLEAN_DTYPES.get(col)
+    return np.dtype(dtype) if dtype is not None and dtype != 'category' else np.dtype(np.int64)
+
+
+def compact_dtypes(df : pd.DataFrame , dtypes : dict = RAW_DTYPES) -> pd.DataFrame :
+    """
+    Converts the listed columns of an already loaded frame in place, e.g. a Parquet chunk.
+    A column whose values do not fit its compact dtype (e.g. a fractional age) is left as it is.
+    """
+    for col , dtype in dtypes.items() :
+        if col in df.columns and df[col].dtype != dtype :
+            try :
+                df[col] = df[col].astype(dtype)
+            except (TypeError , ValueError , OverflowError) :
+                continue
+    return df
+
+
+def concat_frames(frames : list) -> pd.DataFrame :
+    """
+    pd.concat for chunks read with 'category' columns: each chunk has its own categories,
+    which plain concat would turn back into object, so they are unified (sorted, as
+    read_csv sorts them) first.
+    """
+    if len(frames) == 1 :
+        return frames[0]
+    for col in frames[0].columns :
+        if all(isinstance(frame[col].dtype , pd.CategoricalDtype) for frame in frames) :
+            categories = union_categoricals([frame[col] for frame in frames] , sort_categories = True).categories
+            for frame in frames :
+                frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames , ignore_index = True)
+
+
+def memory_report(df : pd.DataFrame) -> dict :
+    """Deep memory usage in MB, in total and per column, largest first."""
+    usage = df.memory_usage(deep = True , index = False)
+    return {
+        "total_mb" : round(float(usage.sum()) / 2**20 , 2) ,
+        "columns" : {col : round(float(mb) / 2**20 , 2) for col , mb in usage.sort_values(ascending = False).items()} ,
+    }
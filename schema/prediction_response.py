@@ -2,9 +2,26 @@
 # IT WILL GENERATE CLEAN DOCS AND REMOVE UNNECESSARY DATA FROM RESPONSE
 
 from pydantic import BaseModel , Field
-from typing import Dict     
+from typing import Dict , List
 
 class PredictionResponse(BaseModel):
     prediction : str = Field(... , description = "Predicted class" , examples = ["Likely To Buy" , "Not Likely To Buy"])
     confidence : float = Field(... , ge = 0.0, le = 1.0 ,  description = "Confidence of the prediction")
-    probabilities : Dict[str , float] = Field(... , description = "Probability of each class")
\ No newline at end of file
+    probabilities : Dict[str , float] = Field(... , description = "Probability of each class")
+
+
+class BatchPredictionResponse(BaseModel):
+    predictions : List[PredictionResponse] = Field(... , description = "Predictions in the same order as the submitted customers")
+
+
+class Explanation(BaseModel):
+    base_value : float = Field(... , description = "Log-odds of the model before any field is taken into account")
+    contributions : Dict[str , float] = Field(... , description = "Log-odds each field adds to base_value, largest effect first; they sum to the prediction's log-odds")
+
+
+class ExplanationResponse(PredictionResponse):
+    explanation : Explanation = Field(... , description = "Tree SHAP attribution of the prediction to the submitted fields")
+
+
+class BatchExplanationResponse(BaseModel):
+    predictions : List[ExplanationResponse] = Field(... , description = "Explained predictions in the same order as the submitted customers")
@@ -1,4 +1,8 @@
-from pydantic import BaseModel, Field , field_validator , computed_field
+import time
+
+from pydantic import BaseModel, Field , field_validator , model_validator
+
+from metrics import observe_stage
 
 from typing import List , Dict , Literal , Annotated
 
@@ -44,6 +48,16 @@ class UserInput(BaseModel) :
 
 
 
+    @model_validator(mode='wrap')
+    @classmethod
+    def time_validation(cls , data , handler) :
+        # RECORDS THE 'validation' STAGE OF THE PREDICTION LATENCY METRICS
+        started = time.perf_counter()
+        try :
+            return handler(data)
+        finally :
+            observe_stage('validation' , started)
+
     @field_validator('Passport')
     @classmethod
     def validate_passport(cls , value : str) -> int :
@@ -54,15 +68,12 @@ class UserInput(BaseModel) :
     def validate_own_car(cls , value : str) -> Literal[0 , 1] :
         return 1 if value == 'Yes' else 0
 
-    @computed_field
-    @property
-    def total_person_visiting(self) -> int :
-        return self.NumberOfPersonVisiting + self.NumberOfChildrenVisiting
-    
-    @computed_field
-    @property
-    def is_children_visiting(self) -> int :
-        return 1 if self.NumberOfChildrenVisiting > 0 else 0
+    def to_record(self) -> dict :
+        """
+        Returns the customer as a raw travel-data record (Passport / OwnCar as 0/1).
+        Derived features such as TotalPersonVisiting are added by the model's FeatureTransform.
+        """
+        return self.model_dump()
     
     
 
@@ -0,0 +1,124 @@
+"""
+Pre-fork server for the prediction API.
+
+The master process imports the app (which loads and warms the model once), freezes the
+garbage collector so those objects are never written to again, then forks the workers.
+Every worker serves main:app on the same listening socket and shares the model pages with
+the master copy-on-write, so memory per extra worker stays nearly flat.
+
+Usage: python serve.py --workers 4 --host 0.0.0.0 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+import uvicorn
+
+
+def parse_args() :
+    parser = argparse.ArgumentParser(description = "Pre-fork server for the prediction API")
+    parser.add_argument("--host" , default = "0.0.0.0")
+    parser.add_argument("--port" , type = int , default = 8000)
+    parser.add_argument("--workers" , type = int , default = int(os.getenv("WEB_CONCURRENCY" , "1")))
+    parser.add_argument("--log-level" , default = "info")
+    parser.add_argument("--no-preload" , dest = "preload" , action = "store_false" ,
+                        help = "import the app in every worker instead of once in the master (for comparison)")
+    return parser.parse_args()
+
+
+def bind_socket(host : str , port : int) -> socket.socket :
+    sock = socket.socket(socket.AF_INET , socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET , socket.SO_REUSEADDR , 1)
+    sock.bind((host , port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock : socket.socket , log_level : str) :
+    """Runs in the forked child until uvicorn shuts down."""
+    # THE MASTER'S HANDLERS ONLY FORWARD SIGNALS, UVICORN INSTALLS ITS OWN GRACEFUL ONES
+    signal.signal(signal.SIGTERM , signal.SIG_DFL)
+    signal.signal(signal.SIGINT , signal.SIG_DFL)
+
+    import main
+
+    config = uvicorn.Config(main.app , log_level = log_level , lifespan = "on")
+    uvicorn.Server(config).run(sockets = [sock])
+
+
+def spawn(sock : socket.socket , log_level : str) -> int :
+    pid = os.fork()
+    if pid == 0 :
+        status = 1
+        try :
+            run_worker(sock , log_level)
+            status = 0
+        except BaseException :
+            traceback.print_exc()
+        finally :
+            # NEVER FALL BACK INTO THE MASTER'S CODE PATH
+            os._exit(status)
+    return pid
+
+
+def serve() :
+    args = parse_args()
+    sock = bind_socket(args.host , args.port)
+
+    if args.workers <= 1 :
+        import main as app_module
+        uvicorn.Server(uvicorn.Config(app_module.app , log_level = args.log_level)).run(sockets = [sock])
+        return
+
+    # ONE OPENMP THREAD PER WORKER: THE WORKERS ARE THE PARALLELISM, AND LIBGOMP IS NOT FORK-SAFE
+    # ONCE ITS THREAD POOL HAS STARTED IN THE MASTER. MUST BE SET BEFORE main (AND XGBOOST) IS IMPORTED.
+    # A SINGLE PROCESS KEEPS THE DEFAULT SO ONE WORKER STILL USES EVERY CORE.
+    os.environ.setdefault("OMP_NUM_THREADS" , "1")
+
+    if args.preload :
+        # LOAD THE MODEL ONCE, THEN MOVE EVERYTHING ALIVE INTO THE PERMANENT GC GENERATION
+        # SO THE WORKERS' COLLECTORS NEVER TOUCH (AND COPY) THE SHARED PAGES
+        import main as app_module
+        gc.collect()
+        gc.freeze()
+
+    workers = {spawn(sock , args.log_level) for _ in range(args.workers)}
+    print(f"Master {os.getpid()} serving on {args.host}:{args.port} with workers {sorted(workers)}" , file = sys.stderr , flush = True)
+
+    stopping = False
+
+    def shutdown(signum , frame) :
+        nonlocal stopping
+        stopping = True
+        for pid in workers :
+            try :
+                os.kill(pid , signal.SIGTERM)
+            except ProcessLookupError :
+                pass
+
+    signal.signal(signal.SIGTERM , shutdown)
+    signal.signal(signal.SIGINT , shutdown)
+
+    # REAP EXITED WORKERS AND REPLACE ANY THAT DIED UNEXPECTEDLY
+    while workers :
+        try :
+            pid , status = os.wait()
+        except ChildProcessError :
+            break
+        except InterruptedError :
+            continue
+        workers.discard(pid)
+        if not stopping :
+            print(f"Worker {pid} exited with status {status}, restarting" , file = sys.stderr , flush = True)
+            time.sleep(0.5)
+            workers.add(spawn(sock , args.log_level))
+
+
+if __name__ == "__main__" :
+    serve()
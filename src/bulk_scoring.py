@@ -0,0 +1,316 @@
+import os
+import sys
+import json
+import time
+import heapq
+import logging
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from utils.logger import get_logger
+from utils.chunked_io import iter_chunks , ChunkWriter
+from src.preprocessing import DataPreprocessor
+from inference import CompiledPipeline
+from features import load_features
+from thresholds import read_threshold
+
+logger = get_logger(__name__)
+
+
+# PER-PROCESS MODEL, LOADED ONCE BY _init_worker
+_pipeline = None
+_compiled = None
+_features = None
+
+
+def _init_worker(pipeline_path : str) :
+    global _pipeline , _compiled , _features
+
+    # THE POOL IS THE PARALLELISM, ONE BOOSTER THREAD PER PROCESS AVOIDS OVERSUBSCRIPTION
+    _pipeline = joblib.load(pipeline_path)
+    _features = load_features(pipeline_path)
+    model = _pipeline.steps[-1][1]
+    model.set_params(n_jobs = 1)
+    model.get_booster().set_param({"nthread" : 1})
+
+    try :
+        _compiled = CompiledPipeline(_pipeline)
+    except ValueError :
+        _compiled = None
+
+    # PER-CHUNK PREPROCESSING LOGS WOULD FLOOD logs/app.log
+    logging.getLogger("src.preprocessing").setLevel(logging.WARNING)
+
+
+def prepare_features(chunk : pd.DataFrame) -> pd.DataFrame :
+    """
+    Applies the FeatureTransform saved with the model to one chunk: the medians, modes and
+    rare categories fitted at training time, the known fixes and the feature engineering.
+    Duplicate removal is the only training step that is skipped, every row gets a score.
+    """
+    chunk = DataPreprocessor(chunk).clean_col_names().df
+    return _features.transform(chunk)
+
+
+def score_chunk(chunk : pd.DataFrame , id_col : str , threshold : float) -> pd.DataFrame :
+    """Runs in a worker process: features -> one probability pass -> CustomerID, probability, label."""
+    features = prepare_features(chunk)
+
+    if _compiled is not None :
+        proba = _compiled.predict_proba(features)[: , 1]
+    else :
+        proba = _pipeline.predict_proba(features)[: , 1]
+
+    ids = features[id_col].to_numpy() if id_col in features.columns else np.arange(len(features))
+    return pd.DataFrame({
+        id_col : ids ,
+        "probability" : proba ,
+        "label" : (proba > threshold).astype(np.int8) ,
+    })
+
+
+def top_chunk(chunk : pd.DataFrame , id_col : str , threshold : float , k : int , segment_col : str , offset : int) -> pd.DataFrame :
+    """
+    Runs in a worker process: scores a chunk like score_chunk and returns only its k most likely
+    buyers (per segment_col value when given), with "row", their position in the whole file.
+    Only these rows travel back to the parent, never the whole chunk's scores.
+    """
+    features = prepare_features(chunk)
+    proba = _compiled.predict_proba(features)[: , 1] if _compiled is not None else _pipeline.predict_proba(features)[: , 1]
+
+    scored = pd.DataFrame({
+        id_col : features[id_col].to_numpy() if id_col in features.columns else np.arange(offset , offset + len(features)) ,
+        "probability" : proba ,
+        "label" : (proba > threshold).astype(np.int8) ,
+        "row" : np.arange(offset , offset + len(features)) ,
+    })
+    # STABLE SORT: AMONG EQUAL PROBABILITIES THE EARLIER ROW IS KEPT, AS IN TopK
+    if segment_col is None :
+        return scored.sort_values("probability" , ascending = False , kind = "stable").head(k)
+
+    scored.insert(0 , segment_col , features[segment_col].to_numpy())
+    scored = scored.sort_values("probability" , ascending = False , kind = "stable")
+    return scored.groupby(segment_col , dropna = False , sort = False).head(k)
+
+
+class TopK :
+    """
+    The k highest-probability customers per segment seen so far, each in a bounded min-heap, so
+    memory is O(k * segments) however many rows are offered. Ties go to the earlier row.
+    """
+
+    def __init__(self , k : int) :
+        self.k = k
+        self.heaps = {}
+
+    def offer(self , segment , probability : float , row : int , item : tuple) :
+        heap = self.heaps.setdefault(segment , [])
+        # THE SMALLEST ENTRY IS THE WORST KEPT CUSTOMER: LOWEST PROBABILITY, THEN LATEST ROW
+        entry = (probability , -row , item)
+        if len(heap) < self.k :
+            heapq.heappush(heap , entry)
+        elif entry > heap[0] :
+            heapq.heapreplace(heap , entry)
+
+    def ranked(self) -> dict :
+        """segment -> [(probability, row, item)], best first."""
+        return {segment : [(p , -neg_row , item) for p , neg_row , item in sorted(heap , reverse = True)]
+                for segment , heap in self.heaps.items()}
+
+
+class BulkScorer :
+    """
+    Scores customer files of any size with bounded memory.
+
+    The input (CSV or Parquet) is read in fixed-size chunks, chunks are fanned out over a
+    process pool that holds one copy of the pipeline per worker, and results are appended
+    to the output file in input order as soon as they are ready. At most
+    max_pending_chunks chunks are in memory at any time.
+    """
+
+    def __init__(self , pipeline_path : str = "artifacts/best_model_pipeline.pkl" , chunksize : int = 100_000 ,
+                 workers : int = None , id_col : str = "CustomerID" , threshold : float = None) :
+        self.pipeline_path = pipeline_path
+        self.chunksize = chunksize
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending_chunks = 2 * self.workers
+        self.id_col = id_col
+        # DEFAULTS TO THE THRESHOLD RECOMMENDED BY CROSS-VALIDATION, AS SERVING USES
+        self.threshold = threshold if threshold is not None else read_threshold(pipeline_path)
+
+
+    def iter_chunks(self , input_path : str) :
+        yield from iter_chunks(input_path , self.chunksize)
+
+
+    def _map_chunks(self , input_path : str , fn , *args , with_offset : bool = False) :
+        """
+        Yields (rows in chunk, fn(chunk, *args)) for every chunk of the input, in input order,
+        with fn running on the worker pool. with_offset also passes fn the position of the
+        chunk's first row in the file.
+        """
+        with ProcessPoolExecutor(max_workers = self.workers , initializer = _init_worker , initargs = (self.pipeline_path ,)) as pool :
+            pending = deque()
+            offset = 0
+
+            for chunk in self.iter_chunks(input_path) :
+                # BACKPRESSURE: NEVER HOLD MORE THAN max_pending_chunks CHUNKS IN FLIGHT
+                if len(pending) >= self.max_pending_chunks :
+                    n_rows , future = pending.popleft()
+                    yield n_rows , future.result()
+                pending.append((len(chunk) , pool.submit(fn , chunk , *args , *((offset ,) if with_offset else ()))))
+                offset += len(chunk)
+
+            while pending :
+                n_rows , future = pending.popleft()
+                yield n_rows , future.result()
+
+
+    @staticmethod
+    def _progress(verb : str , rows : int , chunks : int , started : float) :
+        elapsed = time.perf_counter() - started
+        progress = f"{verb} {rows:,} rows in {chunks} chunks | {rows / elapsed:,.0f} rows/s"
+        logger.info(progress)
+        print(progress , file = sys.stderr , flush = True)
+
+
+    def score(self , input_path : str , output_path : str) -> dict :
+        try :
+            logger.info(f"Bulk scoring {input_path} -> {output_path} | chunksize={self.chunksize} workers={self.workers}")
+
+            dir_name = os.path.dirname(output_path)
+            if dir_name :
+                os.makedirs(dir_name , exist_ok = True)
+
+            writer = ChunkWriter(output_path)
+            started = time.perf_counter()
+            rows = chunks = 0
+            positives = 0
+
+            for n_rows , result in self._map_chunks(input_path , score_chunk , self.id_col , self.threshold) :
+                writer.write(result)
+                rows += n_rows
+                chunks += 1
+                positives += int(result["label"].sum())
+                self._progress("Scored" , rows , chunks , started)
+
+            writer.close()
+            elapsed = time.perf_counter() - started
+
+            report = {
+                "input" : input_path ,
+                "output" : output_path ,
+                "rows" : rows ,
+                "chunks" : chunks ,
+                "likely_to_buy" : positives ,
+                "seconds" : round(elapsed , 2) ,
+                "rows_per_second" : round(rows / elapsed , 1) if elapsed else None ,
+                "workers" : self.workers ,
+                "threshold" : self.threshold ,
+            }
+            logger.info(f"Bulk scoring completed: {report}")
+            return report
+
+        except Exception as e :
+            logger.exception(f"Bulk scoring of {input_path} failed")
+            raise e
+
+
+    def top_k(self , input_path : str , k : int = 1000 , segment_by : str = None) -> tuple :
+        """
+        Streams the whole customer file through the pipeline and keeps the k customers most
+        likely to buy, overall or per value of segment_by (e.g. ProductPitched or CityTier).
+        Workers reduce every chunk to its own top k per segment and the parent merges those
+        into a TopK, so memory stays O(k * segments) plus the chunks in flight.
+
+        Returns (DataFrame of the kept customers: segment, rank within it, CustomerID,
+        probability, label and row position in the file; report).
+        """
+        try :
+            if k < 1 :
+                raise ValueError(f"k must be at least 1, got {k}")
+            logger.info(f"Top-{k} targeting over {input_path}" + (f" per {segment_by}" if segment_by else "") +
+                        f" | chunksize={self.chunksize} workers={self.workers}")
+
+            top = TopK(k)
+            started = time.perf_counter()
+            rows = chunks = 0
+
+            for n_rows , result in self._map_chunks(input_path , top_chunk , self.id_col , self.threshold , k , segment_by , with_offset = True) :
+                segments = result[segment_by].tolist() if segment_by else [None] * len(result)
+                for segment , customer_id , probability , label , row in zip(segments , result[self.id_col].tolist() , result["probability"].tolist() ,
+                                                                            result["label"].tolist() , result["row"].tolist()) :
+                    # MISSING SEGMENT VALUES ARE ONE SEGMENT, NOT ONE PER NaN
+                    top.offer(segment if segment == segment else None , probability , row , (customer_id , label))
+                rows += n_rows
+                chunks += 1
+                self._progress("Ranked" , rows , chunks , started)
+
+            records = []
+            for segment , ranked in top.ranked().items() :
+                for rank , (probability , row , (customer_id , label)) in enumerate(ranked , start = 1) :
+                    records.append({"segment" : segment , "rank" : rank , self.id_col : customer_id ,
+                                    "probability" : probability , "label" : label , "row" : row})
+            columns = ["segment" , "rank" , self.id_col , "probability" , "label" , "row"]
+            result = pd.DataFrame.from_records(records , columns = columns)
+            if segment_by :
+                result = result.rename(columns = {"segment" : segment_by}).sort_values([segment_by , "rank"] , kind = "stable" , ignore_index = True)
+            else :
+                result = result.drop(columns = "segment")
+
+            elapsed = time.perf_counter() - started
+            report = {
+                "input" : input_path ,
+                "k" : k ,
+                "segment_by" : segment_by ,
+                "segments" : len(top.heaps) ,
+                "rows" : rows ,
+                "chunks" : chunks ,
+                "kept" : len(result) ,
+                "seconds" : round(elapsed , 2) ,
+                "rows_per_second" : round(rows / elapsed , 1) if elapsed else None ,
+                "workers" : self.workers ,
+                "threshold" : self.threshold ,
+            }
+            logger.info(f"Top-{k} targeting completed: {report}")
+            return result , report
+
+        except Exception as e :
+            logger.exception(f"Top-{k} targeting over {input_path} failed")
+            raise e
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Score a customer file (CSV or Parquet) with the saved pipeline")
+    parser.add_argument("input" , help = "customer file in the raw travel schema")
+    parser.add_argument("output" , help = "output .csv or .parquet with CustomerID, probability and label")
+    parser.add_argument("--pipeline" , default = "artifacts/best_model_pipeline.pkl")
+    parser.add_argument("--chunksize" , type = int , default = 100_000)
+    parser.add_argument("--workers" , type = int , default = None)
+    parser.add_argument("--threshold" , type = float , default = None , help = "defaults to the pipeline's cross-validated threshold, or 0.5")
+    parser.add_argument("--top-k" , type = int , default = None , metavar = "K" , help = "write only the K customers most likely to buy, ranked, instead of every score")
+    parser.add_argument("--segment-by" , choices = ("ProductPitched" , "CityTier") , default = None , help = "with --top-k, keep the top K of every segment")
+    args = parser.parse_args()
+
+    scorer = BulkScorer(args.pipeline , args.chunksize , args.workers , threshold = args.threshold)
+    if args.top_k is None :
+        print(json.dumps(scorer.score(args.input , args.output) , indent = 2))
+        return
+
+    top , report = scorer.top_k(args.input , args.top_k , args.segment_by)
+    dir_name = os.path.dirname(args.output)
+    if dir_name :
+        os.makedirs(dir_name , exist_ok = True)
+    writer = ChunkWriter(args.output)
+    writer.write(top)
+    writer.close()
+    print(json.dumps({**report , "output" : args.output} , indent = 2 , default = str))
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,253 @@
+import os
+import io
+import json
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.pipeline import Pipeline
+from xgboost import XGBClassifier
+
+from utils.logger import get_logger
+from inference import CompiledPipeline
+from src.evaluation import DEFAULT_THRESHOLD , metrics_at
+
+logger = get_logger(__name__)
+
+
+# PARENT OF THE ROOT NODE IN XGBOOST'S JSON TREE FORMAT
+_NO_PARENT = 2147483647
+
+# LEAF VALUES ARE ROUNDED TO WHAT THESE TYPES CAN HOLD; XGBOOST ITSELF STORES float32, SO float32
+# LEAVES THEM EXACT. SPLIT THRESHOLDS ARE NEVER ROUNDED: A COARSER THRESHOLD SENDS ROWS DOWN THE OTHER BRANCH
+QUANTIZE_DTYPES = {"float32" : np.float32 , "float16" : np.float16}
+
+
+def compaction_path(pipeline_path : str) -> str :
+    """artifacts/best_model_pipeline.pkl -> artifacts/best_model_pipeline.compaction.json"""
+    return os.path.splitext(pipeline_path)[0] + ".compaction.json"
+
+
+def _quantize(values , dtype) -> list :
+    return np.asarray(values , dtype = np.float64).astype(dtype).astype(np.float32).tolist()
+
+
+def _leaf_values(tree : dict) -> tuple :
+    """(values, hessian sums) of a tree's leaves."""
+    leaves = [i for i , left in enumerate(tree["left_children"]) if left == -1]
+    return np.array([tree["split_conditions"][i] for i in leaves]) , np.array([tree["sum_hessian"][i] for i in leaves])
+
+
+def _tree_spread(values : np.ndarray , hessians : np.ndarray) -> tuple :
+    """
+    (mean, spread) of a tree's output over the training rows, each leaf weighted by the hessian
+    it covered: the weighted mean leaf and the weighted mean absolute deviation from it.
+    """
+    weights = hessians if hessians.sum() > 0 else None
+    mean = float(np.average(values , weights = weights))
+    return mean , float(np.average(np.abs(values - mean) , weights = weights))
+
+
+def _prune_tree(tree : dict , leaf_epsilon : float , offset : float , dtype) -> tuple :
+    """
+    Returns the tree with every subtree whose leaves span at most leaf_epsilon (max - min)
+    replaced by one leaf holding their hessian-weighted mean, so no row's output from the tree
+    moves by more than leaf_epsilon. The largest such subtrees are the ones collapsed, down to a
+    single leaf for a whole tree. offset is added to every leaf and leaf values are rounded to
+    dtype; split thresholds are kept exactly.
+    """
+    left , right = tree["left_children"] , tree["right_children"]
+    if any(tree["split_type"]) :
+        raise ValueError("Trees with categorical splits cannot be compacted")
+
+    value , hessian = tree["split_conditions"] , tree["sum_hessian"]
+
+    # POST-ORDER: CHILDREN BEFORE THEIR PARENT
+    order , stack = [] , [0]
+    while stack :
+        node = stack.pop()
+        order.append(node)
+        if left[node] != -1 :
+            stack.extend((left[node] , right[node]))
+
+    # RANGE AND HESSIAN-WEIGHTED SUM OF THE LEAVES UNDER EVERY NODE
+    n_nodes = len(left)
+    low , high = list(value) , list(value)
+    weighted , weight = [0.0] * n_nodes , [0.0] * n_nodes
+    for node in reversed(order) :
+        l , r = left[node] , right[node]
+        if l == -1 :
+            weighted[node] , weight[node] = hessian[node] * value[node] , hessian[node]
+        else :
+            low[node] , high[node] = min(low[l] , low[r]) , max(high[l] , high[r])
+            weighted[node] , weight[node] = weighted[l] + weighted[r] , weight[l] + weight[r]
+
+    # BREADTH-FIRST FROM THE ROOT, SO A SUBTREE IS COLLAPSED BEFORE ANY OF ITS DESCENDANTS IS VISITED;
+    # THE SURVIVING NODES ARE RENUMBERED IN THIS ORDER, AS XGBOOST NUMBERS THEM
+    is_leaf , new_ids , queue , collapsed = {} , {0 : 0} , [0] , 0
+    for node in queue :
+        is_leaf[node] = left[node] == -1 or high[node] - low[node] <= leaf_epsilon
+        if is_leaf[node] :
+            collapsed += left[node] != -1
+            continue
+        for child in (left[node] , right[node]) :
+            new_ids[child] = len(queue)
+            queue.append(child)
+
+    parents = {0 : _NO_PARENT}
+    for node in queue :
+        if not is_leaf[node] :
+            parents[new_ids[left[node]]] = parents[new_ids[right[node]]] = new_ids[node]
+
+    def leaf_value(node) :
+        if left[node] == -1 :
+            return value[node] + offset
+        mean = weighted[node] / weight[node] if weight[node] > 0 else (low[node] + high[node]) / 2
+        return mean + offset
+
+    leaves = [n for n in queue if is_leaf[n]]
+    leaf_values = dict(zip(leaves , _quantize([leaf_value(n) for n in leaves] , dtype)))
+    pruned = {
+        **tree ,
+        "left_children" : [new_ids[left[n]] if not is_leaf[n] else -1 for n in queue] ,
+        "right_children" : [new_ids[right[n]] if not is_leaf[n] else -1 for n in queue] ,
+        "parents" : [parents[i] for i in range(len(queue))] ,
+        "split_indices" : [tree["split_indices"][n] if not is_leaf[n] else 0 for n in queue] ,
+        "split_conditions" : [leaf_values[n] if is_leaf[n] else value[n] for n in queue] ,
+        "base_weights" : [leaf_values[n] if is_leaf[n] else tree["base_weights"][n] for n in queue] ,
+        "default_left" : [tree["default_left"][n] if not is_leaf[n] else 0 for n in queue] ,
+        "split_type" : [0] * len(queue) ,
+        "loss_changes" : [tree["loss_changes"][n] if not is_leaf[n] else 0.0 for n in queue] ,
+        "sum_hessian" : [hessian[n] for n in queue] ,
+        "tree_param" : {**tree["tree_param"] , "num_nodes" : str(len(queue)) , "num_deleted" : "0"} ,
+    }
+    return pruned , collapsed
+
+
+def compact_booster(booster , leaf_epsilon : float = 0.005 , min_tree_contribution : float = 0.002 , dtype : str = "float32") -> tuple :
+    """
+    Compacts a binary XGBoost booster through its JSON model:
+
+    - trees whose output varies by less than min_tree_contribution over the training rows
+      (hessian-weighted mean absolute deviation, see _tree_spread) are dropped; each one's mean
+      is added to the leaves of the first kept tree instead, so only that spread is lost
+    - subtrees whose leaves span at most leaf_epsilon become one leaf (see _prune_tree)
+    - leaf values are rounded to dtype (float32 keeps them exact)
+
+    Returns (compact JSON model as bytes, stats).
+    """
+    model = json.loads(booster.save_raw("json"))
+    gbtree = model["learner"]["gradient_booster"]["model"]
+    trees = gbtree["trees"]
+    quantize_dtype = QUANTIZE_DTYPES[dtype]
+
+    kept , offset = [] , 0.0
+    for i , tree in enumerate(trees) :
+        mean , spread = _tree_spread(*_leaf_values(tree))
+        if spread < min_tree_contribution and (kept or i < len(trees) - 1) :
+            offset += mean
+        else :
+            kept.append(tree)
+
+    compact_trees , collapsed = [] , 0
+    for i , tree in enumerate(kept) :
+        pruned , n = _prune_tree(tree , leaf_epsilon , offset if i == 0 else 0.0 , quantize_dtype)
+        pruned["id"] = i
+        compact_trees.append(pruned)
+        collapsed += n
+
+    gbtree["trees"] = compact_trees
+    gbtree["tree_info"] = [0] * len(compact_trees)
+    gbtree["gbtree_model_param"]["num_trees"] = str(len(compact_trees))
+    if "iteration_indptr" in gbtree :
+        gbtree["iteration_indptr"] = list(range(len(compact_trees) + 1))
+
+    # EARLY-STOPPING ATTRIBUTES COUNT ITERATIONS OF THE ORIGINAL MODEL
+    if len(compact_trees) != len(trees) :
+        for attr in ("best_iteration" , "best_score" , "best_ntree_limit") :
+            model["learner"].get("attributes" , {}).pop(attr , None)
+
+    nodes = [sum(len(t["left_children"]) for t in trees) , sum(len(t["left_children"]) for t in compact_trees)]
+    stats = {
+        "trees" : [len(trees) , len(compact_trees)] ,
+        "nodes" : nodes ,
+        "nodes_removed_pct" : round(100 * (1 - nodes[1] / nodes[0]) , 2) if nodes[0] else 0.0 ,
+        "collapsed_subtrees" : collapsed ,
+        "dropped_trees" : len(trees) - len(compact_trees) ,
+        "dtype" : dtype ,
+    }
+    return json.dumps(model).encode() , stats
+
+
+def _artifact_size(pipe , compress) -> int :
+    buffer = io.BytesIO()
+    joblib.dump(pipe , buffer , compress = compress)
+    return buffer.getbuffer().nbytes
+
+
+def _latency_us(compiled : CompiledPipeline , X : np.ndarray , repeat : int = 200) -> dict :
+    """Median single-row and per-row batch latency of the booster call, in microseconds."""
+    single = np.empty(repeat)
+    for i in range(repeat) :
+        row = X[i % len(X) : i % len(X) + 1]
+        started = time.perf_counter()
+        compiled.predict_encoded(row)
+        single[i] = time.perf_counter() - started
+
+    batch = np.empty(5)
+    for i in range(batch.size) :
+        started = time.perf_counter()
+        compiled.predict_encoded(X)
+        batch[i] = time.perf_counter() - started
+
+    return {"single_row_us" : round(float(np.median(single)) * 1e6 , 1) , "batch_per_row_us" : round(float(np.median(batch)) / len(X) * 1e6 , 3)}
+
+
+def _scores(proba : np.ndarray , y : np.ndarray , threshold : float) -> dict :
+    return {"roc_auc" : float(roc_auc_score(y , proba)) , **metrics_at(y , proba , threshold)}
+
+
+def compact_pipeline(pipe : Pipeline , X : pd.DataFrame , y : pd.Series , threshold : float = DEFAULT_THRESHOLD ,
+                     tolerance : float = 0.005 , compress : int = 3 , **compact_kwargs) -> tuple :
+    """
+    Compacts the XGBClassifier of a fitted pipeline (compact_booster) and compares the result
+    with the original on held-out rows: ROC AUC and F1 at threshold, booster latency through
+    CompiledPipeline, and the pickled artifact size (plain, and with joblib compression).
+
+    Returns (compact pipeline, report). report["accepted"] is False when AUC or F1 drop by more
+    than tolerance, in which case the compact pipeline must not replace the original.
+    """
+    model = pipe.steps[-1][1]
+    raw , stats = compact_booster(model.get_booster() , **compact_kwargs)
+
+    compact_model = XGBClassifier(**model.get_params())
+    compact_model.load_model(bytearray(raw))
+    compact = Pipeline(steps = [*pipe.steps[:-1] , (pipe.steps[-1][0] , compact_model)])
+
+    y_true = np.asarray(y)
+    report = {"compaction" : stats , "threshold" : threshold , "tolerance" : tolerance , "rows" : int(len(y_true))}
+    encoded = None
+    for name , candidate in (("original" , pipe) , ("compact" , compact)) :
+        compiled = CompiledPipeline(candidate)
+        encoded = compiled.transform(X) if encoded is None else encoded
+        proba = compiled.predict_encoded(encoded)[: , 1]
+        report[name] = {
+            **_scores(proba , y_true , threshold) ,
+            **_latency_us(compiled , encoded) ,
+            "size_bytes" : _artifact_size(candidate , 0) ,
+            "compressed_size_bytes" : _artifact_size(candidate , compress) ,
+        }
+        if name == "original" :
+            original_proba = proba
+    report["max_abs_proba_diff"] = float(np.abs(proba - original_proba).max()) if len(proba) else 0.0
+
+    drops = {metric : report["original"][metric] - report["compact"][metric] for metric in ("roc_auc" , "f1")}
+    report["accepted"] = all(drop <= tolerance for drop in drops.values())
+    report["drops"] = drops
+
+    logger.info(f"Compaction: trees {stats['trees'][0]} -> {stats['trees'][1]} , nodes {stats['nodes'][0]} -> {stats['nodes'][1]} | "
+                f"AUC {report['original']['roc_auc']:.4f} -> {report['compact']['roc_auc']:.4f} , "
+                f"F1 {report['original']['f1']:.4f} -> {report['compact']['f1']:.4f} | accepted: {report['accepted']}")
+    return compact , report
@@ -1,45 +1,264 @@
 import pandas as pd
+import numpy as np
 import os
-import boto3
 import io
+import json
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import boto3
 from dotenv import load_dotenv
 from utils.logger import get_logger
+from utils.profiling import profile_stage
+from schema.dtypes import RAW_DTYPES , compact_dtypes , concat_frames , memory_report
+from src.data_sources import open_source , iter_partition_chunks
 
 logger = get_logger(__name__)
 
 
+class ReservoirSample :
+    """
+    Uniform random sample of at most `size` rows from a stream of DataFrame chunks
+    (Algorithm R, vectorized per chunk), so the local sample never needs the whole frame.
+    """
+
+    def __init__(self , size : int = 1000 , seed : int = None) :
+        self.size = size
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+        # SLOT -> (PIECE, ROW IN PIECE); A PIECE HOLDS THE FEW ROWS ONE CHUNK CONTRIBUTED
+        self._piece = np.full(size , -1 , dtype = np.int64)
+        self._row = np.zeros(size , dtype = np.int64)
+        self._pieces = []
+
+    def update(self , chunk : pd.DataFrame) :
+        positions = np.arange(self.seen , self.seen + len(chunk))
+        self.seen += len(chunk)
+
+        # THE FIRST size ROWS FILL THE SLOTS, ROW i THEN TAKES A RANDOM SLOT WITH PROBABILITY size / (i + 1)
+        slots = np.where(positions < self.size , positions , self.rng.integers(0 , positions + 1))
+        accepted = np.flatnonzero(slots < self.size)
+        if accepted.size == 0 :
+            return self
+
+        # WHEN TWO ROWS OF THE CHUNK DRAW THE SAME SLOT THE LATER ONE WINS, AS IN THE SEQUENTIAL ALGORITHM
+        slots = slots[accepted]
+        _ , last = np.unique(slots[::-1] , return_index = True)
+        keep = np.sort(accepted.size - 1 - last)
+        rows , slots = accepted[keep] , slots[keep]
+
+        self._pieces.append(chunk.iloc[rows])
+        self._piece[slots] = len(self._pieces) - 1
+        self._row[slots] = np.arange(rows.size)
+        return self
+
+    def sample(self) -> pd.DataFrame :
+        if not self._pieces :
+            return None
+        offsets = np.cumsum([0] + [len(piece) for piece in self._pieces])
+        filled = self._piece >= 0
+        combined = concat_frames([piece.copy() for piece in self._pieces])
+        return combined.take(offsets[self._piece[filled]] + self._row[filled]).reset_index(drop = True)
+
+
+class _RangeReader(io.RawIOBase) :
+    """
+    Reads an object front to back while up to `window` byte-range GETs run ahead on `pool`.
+    Only the parts in flight are held in memory; each part is appended to `tee` (the local
+    cache file) as it is consumed.
+    """
+
+    def __init__(self , fetch , size : int , part_size : int , pool , window : int , tee = None) :
+        self._fetch = fetch
+        self._ranges = deque((start , min(start + part_size , size) - 1) for start in range(0 , size , part_size))
+        self._pool = pool
+        self._window = window
+        self._pending = deque()
+        self._buffer = memoryview(b"")
+        self._tee = tee
+
+    def readable(self) :
+        return True
+
+    def _next_part(self) :
+        while self._ranges and len(self._pending) < self._window :
+            self._pending.append(self._pool.submit(self._fetch , *self._ranges.popleft()))
+        if not self._pending :
+            return None
+        data = self._pending.popleft().result()
+        if self._tee is not None :
+            self._tee.write(data)
+        return data
+
+    def readinto(self , b) :
+        while not self._buffer :
+            data = self._next_part()
+            if data is None :
+                return 0
+            self._buffer = memoryview(data)
+        n = min(len(b) , len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def drain(self) :
+        """Fetches (and tees) whatever the parser did not read."""
+        while self._next_part() is not None :
+            pass
+
+
 
 class DataIngestion :
 
     """"
     Handles loading of raw CSV data from AWS S3
     and returns it as a pandas DataFrame.
+
+    The object is downloaded as parallel byte ranges and parsed in chunks while it streams in,
+    so the full file is never held twice in memory. The bytes are also written to an on-disk
+    cache keyed by bucket and key; as long as the object's ETag is unchanged later runs read
+    the local copy instead of downloading it again. A reservoir sample of the rows is drawn
+    during the parse for save_sample.
+
+    Pass s3_client (any object with head_object/get_object) or endpoint_url (e.g. a local
+    MinIO or moto server) to run against something other than AWS.
+
+    When the data is partitioned instead, source (or DATA_SOURCE in .env) names it: an
+    s3://bucket/prefix, a local directory, or a source object from src.data_sources. load()
+    then reads every partition, optionally only those dated within [since, until].
     """
-    def __init__(self) :
+    def __init__(self , s3_client = None , endpoint_url : str = None , cache_dir : str = "data/cache/s3" ,
+                 part_size : int = 8 * 2**20 , max_workers : int = 8 , chunksize : int = 100_000 , sample_size : int = 1000 ,
+                 source = None) :
         
         load_dotenv()
 
         self.bucket_name = os.getenv("AWS_BUCKET_NAME")
         self.file_key = os.getenv("AWS_FILE_KEY")
 
+        self.cache_dir = cache_dir
+        self.part_size = part_size
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+        self.sample_size = sample_size
+        # RESERVOIR SAMPLE OF THE LAST LOADED OBJECT, USED BY save_sample
+        self.sample = None
+
         # Create S3 client using credentials from .env
-        self.s3 = boto3.client(
+        self.s3 = s3_client or boto3.client(
             "s3",
+            endpoint_url=endpoint_url or os.getenv("AWS_ENDPOINT_URL"),
             aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
             aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
             region_name=os.getenv("AWS_REGION")
         )
 
+        source = source or os.getenv("DATA_SOURCE")
+        self.source = open_source(source , self.s3) if isinstance(source , str) else source
+
+    def source_fingerprint(self , since = None , until = None) -> dict :
+        """Identifies the current version of the S3 object (or of the partitions) without downloading it."""
+        if self.source is not None :
+            return {
+                "source" : repr(self.source) ,
+                "partitions" : [(p["key"] , p["version"]) for p in self.source.list_partitions(since , until)] ,
+            }
+        head = self.s3.head_object(Bucket=self.bucket_name, Key=self.file_key)
+        return {
+            "bucket" : self.bucket_name ,
+            "key" : self.file_key ,
+            "etag" : head["ETag"] ,
+            "size" : head["ContentLength"] ,
+        }
+
+
+    def _cache_paths(self) -> tuple :
+        name = hashlib.sha256(f"{self.bucket_name}/{self.file_key}".encode()).hexdigest()[:16]
+        base = os.path.join(self.cache_dir , f"{name}-{os.path.basename(self.file_key)}")
+        return base , base + ".json"
+
+
+    def _is_cached(self , data_path : str , meta_path : str , etag : str , size : int) -> bool :
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)) :
+            return False
+        with open(meta_path) as f :
+            meta = json.load(f)
+        return meta.get("etag") == etag and os.path.getsize(data_path) == size
+
+
+    def _parse(self , stream , local_path) -> pd.DataFrame :
+        """
+        Parses CSV chunks from stream into the compact schema dtypes and feeds the reservoir.
+        local_path() returns the complete file on disk, for the slow path where the data does
+        not fit the schema (e.g. a fractional age) and has to be read with inferred dtypes.
+        """
+        def read_chunks(source , dtype) :
+            reservoir = ReservoirSample(self.sample_size)
+            chunks = []
+            for chunk in pd.read_csv(source , dtype = dtype , chunksize = self.chunksize) :
+                reservoir.update(chunk)
+                chunks.append(compact_dtypes(chunk))
+            self.sample = reservoir.sample()
+            return chunks
+
+        try :
+            chunks = read_chunks(stream , RAW_DTYPES)
+        except (TypeError , ValueError , OverflowError) :
+            logger.warning("Raw data does not fit the compact schema, compacting column by column")
+            chunks = read_chunks(local_path() , None)
+
+        # CHUNKS THAT COMPACTED DIFFERENTLY ARE BROUGHT BACK TO ONE DTYPE PER COLUMN
+        return compact_dtypes(concat_frames(chunks))
+
+
+    def _download(self , etag : str , size : int , data_path : str , meta_path : str) -> pd.DataFrame :
+        def fetch(start : int , end : int) -> bytes :
+            # IfMatch MAKES A RANGE FAIL INSTEAD OF MIXING IN BYTES OF A NEWER VERSION OF THE OBJECT
+            obj = self.s3.get_object(Bucket=self.bucket_name, Key=self.file_key, Range=f"bytes={start}-{end}", IfMatch=etag)
+            return obj["Body"].read()
+
+        os.makedirs(self.cache_dir , exist_ok = True)
+        part_path = data_path + ".part"
+
+        with ThreadPoolExecutor(max_workers = self.max_workers) as pool , open(part_path , "wb") as tee :
+            reader = _RangeReader(fetch , size , self.part_size , pool , 2 * self.max_workers , tee)
+
+            def local_path() :
+                reader.drain()
+                tee.flush()
+                return part_path
+
+            df = self._parse(io.BufferedReader(reader , buffer_size = 2**20) , local_path)
+            reader.drain()
+
+        if os.path.getsize(part_path) != size :
+            raise IOError(f"Downloaded {os.path.getsize(part_path)} bytes, expected {size}")
+
+        os.replace(part_path , data_path)
+        with open(meta_path , "w") as f :
+            json.dump({"bucket" : self.bucket_name , "key" : self.file_key , "etag" : etag , "size" : size} , f)
+        return df
+
+
     def load_from_s3(self) -> pd.DataFrame:
 
         try:
             logger.info(f"Loading data from S3: s3://{self.bucket_name}/{self.file_key}")
 
-            obj = self.s3.get_object(Bucket=self.bucket_name, Key=self.file_key)
+            head = self.s3.head_object(Bucket=self.bucket_name, Key=self.file_key)
+            etag , size = head["ETag"] , head["ContentLength"]
+            data_path , meta_path = self._cache_paths()
 
-            df = pd.read_csv(io.BytesIO(obj["Body"].read()))
+            if self._is_cached(data_path , meta_path , etag , size) :
+                logger.info(f"Object unchanged (ETag {etag}), reading the local copy {data_path}")
+                with profile_stage("read_cache") as stage , open(data_path , "rb") as f :
+                    df = stage.shape(self._parse(f , lambda : data_path))
+            else :
+                logger.info(f"Downloading {size:,} bytes in {self.part_size:,}-byte ranges with {self.max_workers} workers")
+                with profile_stage("download") as stage :
+                    df = stage.shape(self._download(etag , size , data_path , meta_path))
 
-            logger.info(f"Data loaded successfully. Shape: {df.shape}")
+            logger.info(f"Data loaded successfully. Shape: {df.shape} | Memory: {memory_report(df)}")
 
             return df
         
@@ -48,17 +267,68 @@ class DataIngestion :
             raise e
             
 
+
+    def iter_partitions(self , since = None , until = None) :
+        """
+        Yields (partition, chunk) for the source's partitions dated within [since, until], in key
+        order, reading up to max_workers partitions concurrently.
+        """
+        if self.source is None :
+            raise ValueError("No partitioned source configured, pass source or set DATA_SOURCE")
+
+        partitions = self.source.list_partitions(since , until)
+        logger.info(f"Reading {len(partitions)} partitions from {self.source!r} with {self.max_workers} workers")
+        yield from iter_partition_chunks(self.source , partitions , self.max_workers , self.chunksize)
+
+
+    def load_partitions(self , since = None , until = None) -> pd.DataFrame :
+
+        try :
+            reservoir = ReservoirSample(self.sample_size)
+            chunks = []
+            with profile_stage("read_partitions") as stage :
+                for _ , chunk in self.iter_partitions(since , until) :
+                    reservoir.update(chunk)
+                    chunks.append(chunk)
+                stage["rows"] = sum(len(chunk) for chunk in chunks)
+
+            if not chunks :
+                raise ValueError(f"No partitions found in {self.source!r} (since={since}, until={until})")
+            self.sample = reservoir.sample()
+
+            # PARTITIONS THAT COMPACTED DIFFERENTLY ARE BROUGHT BACK TO ONE DTYPE PER COLUMN
+            with profile_stage("concat") as stage :
+                df = stage.shape(compact_dtypes(concat_frames(chunks)))
+            logger.info(f"Data loaded successfully. Shape: {df.shape} | Memory: {memory_report(df)}")
+
+            return df
+
+        except Exception as e:
+            logger.exception(f"Failed to load partitions from {self.source!r}")
+            raise e
+
+
+    def load(self , since = None , until = None) -> pd.DataFrame :
+        """The partitioned source when one is configured, otherwise the single S3 object."""
+        if self.source is not None :
+            return self.load_partitions(since , until)
+        return self.load_from_s3()
+
       
     def save_sample(self, df : pd.DataFrame , save_path : str = 'data/raw/sample_travel.csv' , sample_size : int = 1000) :
         """ 
-        Saves a small sample of the dataset locally.
+        Saves a small sample of the dataset locally: the reservoir sample drawn while the
+        last load streamed in, or a sample of df when there is none.
         """
 
         try : 
             dir_name = os.path.dirname(save_path)
             if dir_name :
                 os.makedirs(dir_name , exist_ok = True)
-            sample_df = df.sample(min(sample_size, len(df)))
+            if self.sample is not None and len(self.sample) >= min(sample_size , len(df)) :
+                sample_df = self.sample.head(sample_size)
+            else :
+                sample_df = df.sample(min(sample_size, len(df)))
             sample_df.to_csv(save_path, index=False)
 
             logger.info(f"Saved sample ({sample_df.shape[0]} rows) to {(save_path)}")
@@ -0,0 +1,230 @@
+"""
+Partitioned raw data sources for DataIngestion.
+
+The raw travel data lands as many files (e.g. one per day, some gzip-compressed) rather than a
+single object. A source lists those files as partitions and opens them as binary streams:
+
+    LocalDirectorySource   files under a local directory
+    S3PrefixSource         objects under an S3 prefix
+    CompressedSource       wraps either of them and decompresses .gz / .bz2 / .xz partitions
+
+A partition is a dict {"key", "size", "version", "date"}: version changes whenever the content
+does (mtime for local files, the ETag on S3) and date is parsed from the key (2024-05-01,
+dt=20240501, ...) so partitions can be pruned by date. Partitions are always listed sorted by
+key, which is the order iter_partition_chunks yields them in.
+"""
+import io
+import os
+import re
+import bz2
+import gzip
+import lzma
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pandas as pd
+
+from utils.logger import get_logger
+from schema.dtypes import RAW_DTYPES , compact_dtypes
+
+logger = get_logger(__name__)
+
+
+DATA_SUFFIXES = (".csv" ,)
+COMPRESSION_SUFFIXES = {".gz" : gzip.GzipFile , ".bz2" : bz2.BZ2File , ".xz" : lzma.LZMAFile}
+
+# YYYY-MM-DD, YYYY_MM_DD OR YYYYMMDD NOT SURROUNDED BY OTHER DIGITS
+_DATE_PATTERN = re.compile(r"(?<!\d)(\d{4})[-_]?(\d{2})[-_]?(\d{2})(?!\d)")
+
+
+def partition_date(key : str) -> date :
+    """The last date in the key (e.g. raw/dt=2024-05-01/part-0.csv.gz), or None when it has none."""
+    for match in reversed(list(_DATE_PATTERN.finditer(key))) :
+        try :
+            return date(*map(int , match.groups()))
+        except ValueError :
+            continue
+    return None
+
+
+def is_data_key(key : str) -> bool :
+    name = key.lower()
+    for suffix in COMPRESSION_SUFFIXES :
+        name = name.removesuffix(suffix)
+    return name.endswith(DATA_SUFFIXES)
+
+
+def prune_partitions(partitions : list , since : date = None , until : date = None) -> list :
+    """
+    Keeps the partitions dated within [since, until]. Partitions whose key carries no date
+    cannot be placed in the range and are kept, so a pruned read never silently loses data.
+    """
+    if since is None and until is None :
+        return partitions
+
+    kept , undated = [] , 0
+    for partition in partitions :
+        day = partition["date"]
+        if day is None :
+            undated += 1
+            kept.append(partition)
+        elif (since is None or day >= since) and (until is None or day <= until) :
+            kept.append(partition)
+
+    if undated :
+        logger.warning(f"{undated} partition(s) have no date in their key and were kept")
+    logger.info(f"Pruned {len(partitions)} partitions to {len(kept)} (since={since}, until={until})")
+    return kept
+
+
+class LocalDirectorySource :
+    """CSV partitions (optionally compressed) anywhere under a local directory."""
+
+    def __init__(self , root : str) :
+        self.root = root
+
+    def __repr__(self) :
+        return f"LocalDirectorySource({self.root!r})"
+
+    def list_partitions(self , since : date = None , until : date = None) -> list :
+        partitions = []
+        for dir_path , _ , file_names in os.walk(self.root) :
+            for name in file_names :
+                path = os.path.join(dir_path , name)
+                key = os.path.relpath(path , self.root).replace(os.sep , "/")
+                if not is_data_key(key) :
+                    continue
+                stat = os.stat(path)
+                partitions.append({"key" : key , "size" : stat.st_size , "version" : f"{stat.st_mtime_ns}-{stat.st_size}" , "date" : partition_date(key)})
+        partitions.sort(key = lambda partition : partition["key"])
+        return prune_partitions(partitions , since , until)
+
+    def open(self , partition : dict) :
+        return open(os.path.join(self.root , partition["key"]) , "rb")
+
+
+class S3PrefixSource :
+    """
+    CSV partitions (optionally compressed) under an S3 prefix. s3 is a boto3 client or any
+    object with list_objects_v2 and get_object, e.g. a local S3 stand-in.
+    """
+
+    def __init__(self , s3 , bucket : str , prefix : str = "") :
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def __repr__(self) :
+        return f"S3PrefixSource('s3://{self.bucket}/{self.prefix}')"
+
+    def list_partitions(self , since : date = None , until : date = None) -> list :
+        partitions = []
+        kwargs = {"Bucket" : self.bucket , "Prefix" : self.prefix}
+        while True :
+            page = self.s3.list_objects_v2(**kwargs)
+            for obj in page.get("Contents" , []) :
+                if is_data_key(obj["Key"]) :
+                    partitions.append({"key" : obj["Key"] , "size" : obj["Size"] , "version" : obj["ETag"] , "date" : partition_date(obj["Key"])})
+            if not page.get("IsTruncated") :
+                break
+            kwargs["ContinuationToken"] = page["NextContinuationToken"]
+        partitions.sort(key = lambda partition : partition["key"])
+        return prune_partitions(partitions , since , until)
+
+    def open(self , partition : dict) :
+        # IfMatch MAKES THE READ FAIL INSTEAD OF RETURNING A NEWER VERSION THAN THE ONE LISTED
+        return self.s3.get_object(Bucket=self.bucket, Key=partition["key"], IfMatch=partition["version"])["Body"]
+
+
+class _Decompressed(io.BufferedReader) :
+    """Decompressing reader that also closes the stream it reads from (GzipFile and co. leave it open)."""
+
+    def __init__(self , decompressor , stream) :
+        super().__init__(decompressor)
+        self._stream = stream
+
+    def close(self) :
+        try :
+            super().close()
+        finally :
+            self._stream.close()
+
+
+class CompressedSource :
+    """Wraps a source and decompresses partitions by their suffix while they are read."""
+
+    def __init__(self , source) :
+        self.source = source
+
+    def __repr__(self) :
+        return f"CompressedSource({self.source!r})"
+
+    def list_partitions(self , since : date = None , until : date = None) -> list :
+        return self.source.list_partitions(since , until)
+
+    def open(self , partition : dict) :
+        stream = self.source.open(partition)
+        for suffix , opener in COMPRESSION_SUFFIXES.items() :
+            if partition["key"].lower().endswith(suffix) :
+                return _Decompressed(opener(fileobj = stream , mode = "rb") , stream)
+        return stream
+
+
+def open_source(uri : str , s3 = None) :
+    """
+    Source for a URI: s3://bucket/prefix (read with the given client) or a local directory.
+    Either way compressed partitions are decompressed transparently.
+    """
+    if uri.startswith("s3://") :
+        if s3 is None :
+            raise ValueError(f"An S3 client is needed to read {uri}")
+        bucket , _ , prefix = uri.removeprefix("s3://").partition("/")
+        return CompressedSource(S3PrefixSource(s3 , bucket , prefix))
+    if not os.path.isdir(uri) :
+        raise ValueError(f"Data source {uri} is neither an s3:// prefix nor a local directory")
+    return CompressedSource(LocalDirectorySource(uri))
+
+
+def read_partition(source , partition : dict , chunksize : int = None , dtype : dict = RAW_DTYPES) -> list :
+    """
+    Reads one partition into a list of DataFrames of at most chunksize rows (one frame when
+    chunksize is None) in the compact schema dtypes. A partition that does not fit the schema
+    (e.g. a fractional age) is read again with inferred dtypes and compacted per column.
+    """
+    def read(dtype) :
+        with source.open(partition) as stream :
+            if chunksize is None :
+                return [compact_dtypes(pd.read_csv(stream , dtype = dtype))]
+            return [compact_dtypes(chunk) for chunk in pd.read_csv(stream , dtype = dtype , chunksize = chunksize)]
+
+    try :
+        return read(dtype)
+    except (TypeError , ValueError , OverflowError) :
+        logger.warning(f"Partition {partition['key']} does not fit the compact schema, compacting column by column")
+        return read(None)
+
+
+def iter_partition_chunks(source , partitions : list , max_workers : int = 4 , chunksize : int = None , dtype : dict = RAW_DTYPES) :
+    """
+    Yields (partition, chunk) for every partition, in the order given, while up to max_workers
+    partitions are read ahead on a thread pool. At most max_workers partitions beyond the one
+    being consumed are held in memory.
+    """
+    pending = deque()
+    remaining = deque(partitions)
+
+    with ThreadPoolExecutor(max_workers = max_workers) as pool :
+        try :
+            while remaining or pending :
+                while remaining and len(pending) < max_workers :
+                    partition = remaining.popleft()
+                    pending.append((partition , pool.submit(read_partition , source , partition , chunksize , dtype)))
+
+                partition , future = pending.popleft()
+                for chunk in future.result() :
+                    yield partition , chunk
+        finally :
+            # A CONSUMER THAT STOPS EARLY SHOULD NOT WAIT FOR PARTITIONS IT WILL NEVER READ
+            for _ , future in pending :
+                future.cancel()
@@ -0,0 +1,185 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel , delayed
+from sklearn.base import clone
+from sklearn.metrics import roc_auc_score , average_precision_score
+from sklearn.model_selection import StratifiedKFold
+
+from utils.logger import get_logger
+# SHARED WITH SERVING, WHICH SHIPS WITHOUT src/ AND utils/
+from thresholds import DEFAULT_THRESHOLD , evaluation_path , read_threshold
+
+logger = get_logger(__name__)
+
+
+# THE CURVE STORED IN THE EVALUATION FILE IS SAMPLED AT THESE THRESHOLDS
+CURVE_GRID = np.round(np.linspace(0 , 1 , 101) , 2)
+
+
+def threshold_curve(y_true , proba , beta : float = 1.0) -> dict :
+    """
+    Precision, recall and F-beta at every distinct score, in one sort and one cumulative sum.
+
+    Row k of the curve predicts positive for the rows scoring at least score[k] (scores are
+    descending), so tp[k] is the number of positives among them and fp[k] the rest; tied scores
+    are always on the same side. threshold[k] lies halfway between score[k] and the next lower
+    score, so "proba > threshold[k]" and "proba >= score[k]" select the same rows.
+    """
+    y = np.asarray(y_true , dtype = np.int64)
+    proba = np.asarray(proba , dtype = np.float64)
+
+    order = np.argsort(-proba , kind = "mergesort")
+    scores , y = proba[order] , y[order]
+
+    # LAST POSITION OF EVERY RUN OF TIED SCORES
+    last = np.r_[np.flatnonzero(np.diff(scores)) , scores.size - 1]
+    tp = np.cumsum(y)[last]
+    fp = last + 1 - tp
+    positives = int(y.sum())
+
+    score = scores[last]
+    lower = np.r_[score[1:] , min(score[-1] , 0.0) - 1e-9] if score.size else score
+    precision = tp / (tp + fp)
+    recall = tp / positives if positives else np.zeros_like(precision)
+    b2 = beta ** 2
+    with np.errstate(divide = "ignore" , invalid = "ignore") :
+        fbeta = np.where(tp > 0 , (1 + b2) * tp / ((1 + b2) * tp + b2 * (positives - tp) + fp) , 0.0)
+
+    return {
+        "score" : score ,
+        "threshold" : (score + lower) / 2 ,
+        "tp" : tp ,
+        "fp" : fp ,
+        "precision" : precision ,
+        "recall" : recall ,
+        "fbeta" : fbeta ,
+    }
+
+
+def sample_curve(curve : dict , grid = CURVE_GRID) -> dict :
+    """The curve at fixed thresholds (predict positive when proba > t), for a compact artifact."""
+    # NUMBER OF DISTINCT SCORES ABOVE EACH t; 0 MEANS NOTHING IS PREDICTED POSITIVE
+    above = np.searchsorted(-curve["score"] , -np.asarray(grid) , side = "left")
+    idx = np.maximum(above - 1 , 0)
+    none = above == 0
+    return {
+        "threshold" : [float(t) for t in grid] ,
+        "precision" : np.round(np.where(none , 1.0 , curve["precision"][idx]) , 4).tolist() ,
+        "recall" : np.round(np.where(none , 0.0 , curve["recall"][idx]) , 4).tolist() ,
+        "fbeta" : np.round(np.where(none , 0.0 , curve["fbeta"][idx]) , 4).tolist() ,
+    }
+
+
+def best_threshold(curve : dict) -> tuple :
+    """(threshold, fbeta, precision, recall) at the point of the curve with the highest F-beta."""
+    k = int(np.argmax(curve["fbeta"]))
+    return float(curve["threshold"][k]) , float(curve["fbeta"][k]) , float(curve["precision"][k]) , float(curve["recall"][k])
+
+
+def metrics_at(y_true , proba , threshold : float) -> dict :
+    y = np.asarray(y_true , dtype = np.int64)
+    pred = np.asarray(proba) > threshold
+    tp = int((pred & (y == 1)).sum())
+    fp = int((pred & (y == 0)).sum())
+    fn = int((~pred & (y == 1)).sum())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "threshold" : round(float(threshold) , 6) ,
+        "accuracy" : float((pred == (y == 1)).mean()) if y.size else 0.0 ,
+        "precision" : precision ,
+        "recall" : recall ,
+        "f1" : 2 * precision * recall / (precision + recall) if precision + recall else 0.0 ,
+    }
+
+
+def holdout_evaluation(y_valid , valid_proba , y_test , test_proba , beta : float = 1.0) -> dict :
+    """
+    Evaluation report from the probabilities of an already fitted model, for models that are not
+    cross-validated (continued boosting): the threshold with the highest F-beta on a validation
+    slice the model was not fitted on, and the test split's metrics at it and at DEFAULT_THRESHOLD.
+    The test split plays no part in choosing the threshold, so its metrics stay unbiased.
+    """
+    y_valid , y_test = np.asarray(y_valid) , np.asarray(y_test)
+    curve = threshold_curve(y_valid , valid_proba , beta)
+    threshold , fbeta , _ , _ = best_threshold(curve)
+    return {
+        "threshold" : round(threshold , 6) ,
+        "selection" : f"max F{beta:g} on a validation slice of the training rows" ,
+        "rows" : int(len(y_valid)) ,
+        "validation" : metrics_at(y_valid , valid_proba , threshold) ,
+        "test" : metrics_at(y_test , test_proba , threshold) ,
+        "at_default" : metrics_at(y_test , test_proba , DEFAULT_THRESHOLD) ,
+        "roc_auc" : round(float(roc_auc_score(y_test , test_proba)) , 4) ,
+        "curve" : sample_curve(curve) ,
+    }
+
+
+def _fit_fold(pipeline , X : pd.DataFrame , y : pd.Series , train_idx : np.ndarray , valid_idx : np.ndarray) -> np.ndarray :
+    """Runs in a worker process: fits a fresh copy of the pipeline on one fold, returns the validation probabilities."""
+    pipe = clone(pipeline)
+    # THE PROCESSES ARE THE PARALLELISM, ONE BOOSTER THREAD EACH AVOIDS OVERSUBSCRIPTION
+    pipe.set_params(**{f"{pipe.steps[-1][0]}__n_jobs" : 1})
+    pipe.fit(X.iloc[train_idx] , y.iloc[train_idx])
+    return pipe.predict_proba(X.iloc[valid_idx])[: , 1]
+
+
+def cross_validate(pipeline , X : pd.DataFrame , y : pd.Series , n_folds : int = 5 , n_jobs : int = None ,
+                   beta : float = 1.0 , random_state : int = 42) -> dict :
+    """
+    Stratified k-fold cross-validation of an (unfitted) pipeline, folds fitted in parallel
+    processes. The out-of-fold probabilities of all folds are pooled into one threshold curve,
+    and the threshold with the highest F-beta on it is the recommended operating point.
+
+    Returns the compact evaluation report that is saved next to the pipeline: the threshold,
+    pooled metrics at it and at 0.5, per-fold ROC AUC / average precision / best threshold,
+    and the curve sampled at CURVE_GRID.
+    """
+    started = time.perf_counter()
+    folds = list(StratifiedKFold(n_splits = n_folds , shuffle = True , random_state = random_state).split(X , y))
+    n_jobs = min(n_jobs or os.cpu_count() or 1 , n_folds)
+
+    probas = Parallel(n_jobs = n_jobs , prefer = "processes")(
+        delayed(_fit_fold)(pipeline , X , y , train_idx , valid_idx) for train_idx , valid_idx in folds
+    )
+
+    y_true = y.to_numpy()
+    oof = np.empty(len(y_true) , dtype = np.float64)
+    fold_reports = []
+    for i , ((_ , valid_idx) , proba) in enumerate(zip(folds , probas)) :
+        oof[valid_idx] = proba
+        threshold , fbeta , _ , _ = best_threshold(threshold_curve(y_true[valid_idx] , proba , beta))
+        fold_reports.append({
+            "fold" : i ,
+            "rows" : int(valid_idx.size) ,
+            "roc_auc" : round(float(roc_auc_score(y_true[valid_idx] , proba)) , 4) ,
+            "average_precision" : round(float(average_precision_score(y_true[valid_idx] , proba)) , 4) ,
+            "best_threshold" : round(threshold , 6) ,
+            "best_fbeta" : round(fbeta , 4) ,
+        })
+
+    curve = threshold_curve(y_true , oof , beta)
+    threshold , fbeta , _ , _ = best_threshold(curve)
+
+    report = {
+        "threshold" : round(threshold , 6) ,
+        "selection" : f"max F{beta:g} on pooled out-of-fold probabilities" ,
+        "n_folds" : n_folds ,
+        "rows" : int(len(y_true)) ,
+        "cv" : {
+            "at_threshold" : metrics_at(y_true , oof , threshold) ,
+            "at_default" : metrics_at(y_true , oof , DEFAULT_THRESHOLD) ,
+            "roc_auc" : round(float(roc_auc_score(y_true , oof)) , 4) ,
+            "average_precision" : round(float(average_precision_score(y_true , oof)) , 4) ,
+            "fold_threshold_std" : round(float(np.std([fold["best_threshold"] for fold in fold_reports])) , 4) ,
+        } ,
+        "folds" : fold_reports ,
+        "curve" : sample_curve(curve) ,
+        "seconds" : round(time.perf_counter() - started , 2) ,
+    }
+    logger.info(f"{n_folds}-fold CV in {report['seconds']}s on {n_jobs} processes | threshold {report['threshold']} "
+                f"(F{beta:g} {fbeta:.4f}) | ROC AUC {report['cv']['roc_auc']}")
+    return report
@@ -1,12 +1,25 @@
 import os
+import json
+import argparse
+from datetime import datetime, timezone
+import numpy as np
 import pandas as pd
 import joblib
 from utils.logger import get_logger
+from registry import metadata_path , read_model_metadata
+from features import FeatureTransform , features_path , load_features
+from schema.dtypes import memory_report
+from utils.chunked_io import iter_chunks
+from utils.profiling import profile_stage
+from src.tuning import HalvingSearch , leaderboard_path
+from src.evaluation import cross_validate as cross_validate_pipeline , holdout_evaluation , evaluation_path , read_threshold , metrics_at , DEFAULT_THRESHOLD
+from src.compaction import compact_pipeline , compaction_path
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, roc_auc_score
+import xgboost as xgb
 from xgboost import XGBClassifier
 
 logger = get_logger(__name__)
@@ -17,13 +30,18 @@ class ModelTrainer:
     Handles data transformation, model training, evaluation, and saving the final model pipeline.
     """
 
-    def __init__(self , df : pd.DataFrame , target_col : str = 'ProdTaken') :
+    def __init__(self , df : pd.DataFrame , target_col : str = 'ProdTaken' , features : FeatureTransform = None) :
         self.df = df
         self.target_col = target_col
+        # FITTED PREPROCESSING STATE, SAVED NEXT TO THE PIPELINE FOR SERVING AND BULK SCORING
+        self.features = features
         self.X_train = self.X_test = self.y_train = self.y_test = None
         self.preprocessor = None
         self.pipe = None
         self.metrics = {}
+        self.promoted = None
+        # CROSS-VALIDATION REPORT WITH THE RECOMMENDED THRESHOLD, SAVED AS <pipeline>.evaluation.json
+        self.evaluation = None
 
     def transform_data(self, test_size : float = 0.2, random_state: int = 42):
          """Split data and create preprocessing pipeline."""
@@ -31,21 +49,24 @@ class ModelTrainer:
          try:
             logger.info("Data Transformation started")
 
-            # Split into features and target
-            X = self.df.drop(self.target_col, axis=1)
-            y = self.df[self.target_col]
+            with profile_stage("transform_data") as stage :
+                # Split into features and target
+                X = self.df.drop(self.target_col, axis=1)
+                y = self.df[self.target_col]
 
-            logger.info("Defined dependent and independent variables")
+                logger.info("Defined dependent and independent variables")
 
-            self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-                X, y, test_size=test_size, random_state=random_state
-            )
+                self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
+                    X, y, test_size=test_size, random_state=random_state
+                )
+                stage.shape(self.X_train)
 
-            logger.info("Split data into train and test sets")
+            logger.info(f"Split data into train and test sets | X_train memory: {memory_report(self.X_train)['total_mb']} MB")
 
-            num_cols = self.X_train.select_dtypes(include=["int", "float"]).columns.tolist()
+            # "number" COVERS THE COMPACT int8/int16/int32 COLUMNS, "category" THE ENCODED TEXT FIELDS
+            num_cols = self.X_train.select_dtypes(include=["number"]).columns.tolist()
 
-            cat_cols = self.X_train.select_dtypes(include=["object"]).columns.tolist()
+            cat_cols = self.X_train.select_dtypes(include=["object", "category"]).columns.tolist()
 
             logger.info(f"Numeric columns: {num_cols}")
             logger.info(f"Categorical columns: {cat_cols}")
@@ -72,9 +93,9 @@ class ModelTrainer:
             raise e
         
 
-    def train(self, save_path: str = "artifacts/best_model_pipeline.pkl") :
+    def train(self, save_path: str = "artifacts/best_model_pipeline.pkl" , model_version : str = None) :
 
-        """Train model, evaluate performance, and save pipeline."""
+        """Train model, evaluate performance, and save pipeline with its metadata."""
 
         try :
             if self.X_train is None or self.preprocessor is None:
@@ -82,57 +103,558 @@ class ModelTrainer:
 
             logger.info("Training model started")
 
+            model = self._default_model()
+            logger.info(f"Model initialized with params: {model.get_params()}")
+
+            self._fit_evaluate(model)
+
+            self.save(save_path , model_version)
+
+            return self.pipe, self.metrics
+        
+        except Exception as e:
+            logger.exception("Error in model training")
+            raise e
+
+
+    def _default_model(self) -> XGBClassifier :
+        """The fixed XGBoost configuration train() fits."""
+
+        scale_pos = self.y_train.value_counts()[0] / self.y_train.value_counts()[1]
+        logger.info(f"⚖️ Calculated class imbalance ratio: {scale_pos:.2f}")
+
+        # Initialize model
+        return XGBClassifier(
+            reg_alpha=0.1,
+            reg_lambda=5,
+            random_state=42,
+            use_label_encoder=False,
+            eval_metric="logloss",
+            scale_pos_weight=scale_pos,
+        )
+
+
+    def cross_validate(self , model = None , n_folds : int = 5 , n_jobs : int = None , beta : float = 1.0) :
+
+        """
+        Stratified k-fold CV of preprocessor + model (train()'s model by default) on the training
+        split, folds fitted in parallel processes, and the operating threshold with the best
+        F-beta on the out-of-fold probabilities. The report is saved next to the pipeline by the
+        next save(), where serving and bulk scoring read the threshold from.
+        """
+
+        try :
+            if self.X_train is None or self.preprocessor is None:
+                raise ValueError("Data not transformed. Run transform_data() before cross-validating.")
+
+            logger.info(f"{n_folds}-fold cross-validation started")
+            pipeline = Pipeline(steps = [("preprocessor", self.preprocessor), ("model", model if model is not None else self._default_model())])
+            with profile_stage("cross_validate") as stage :
+                self.evaluation = cross_validate_pipeline(pipeline , self.X_train , self.y_train , n_folds , n_jobs , beta)
+                stage.shape(self.X_train)
+
+            return self
+
+        except Exception as e:
+            logger.exception("Error in cross-validation")
+            raise e
+
+
+    def _fit_evaluate(self , model) :
+        """Fits preprocessor + model on the training split and scores it on the test split."""
+
+        # Create pipeline
+        
+        self.pipe = Pipeline(steps = [("preprocessor", self.preprocessor), ("model", model)])
+        logger.info("Pipeline created")
+
+        # Train model
+        with profile_stage("fit") as stage :
+            self.pipe.fit(self.X_train, self.y_train)
+            stage.shape(self.X_train)
+        logger.info("Model trained successfully")
+
+        # Evaluation metrics
+        self.metrics = self._evaluate(self.pipe)
+        logger.info(f"Model Evaluation Metrics: {self.metrics}")
+
+        if self.evaluation is not None :
+            with profile_stage("evaluate_threshold") as stage :
+                proba = self.pipe.predict_proba(self.X_test)[: , 1]
+                self.evaluation["test"] = metrics_at(self.y_test , proba , self.evaluation["threshold"])
+                stage.shape(self.X_test)
+            logger.info(f"Test metrics at the cross-validated threshold: {self.evaluation['test']}")
+
+
+    def tune(self , save_path : str = "artifacts/best_model_pipeline.pkl" , model_version : str = None ,
+             n_candidates : int = 27 , max_rounds : int = 1000 , n_folds : int = 3 , n_jobs : int = None) :
+
+        """
+        Searches the XGBoost parameters with HalvingSearch on the training split (preprocessor
+        fitted once per fold), refits the best configuration as the pipeline, evaluates and saves
+        it like train(), and writes the leaderboard of every trial next to it.
+        """
+
+        try :
+            if self.X_train is None or self.preprocessor is None:
+                raise ValueError("Data not transformed. Run transform_data() before tuning.")
+
+            logger.info("Hyperparameter search started")
+
             scale_pos = self.y_train.value_counts()[0] / self.y_train.value_counts()[1]
-            logger.info(f"⚖️ Calculated class imbalance ratio: {scale_pos:.2f}")
+            with profile_stage("search") as stage :
+                search = HalvingSearch(self.preprocessor , base_params = {"scale_pos_weight" : float(scale_pos)} , n_candidates = n_candidates ,
+                                       max_rounds = max_rounds , n_folds = n_folds , n_jobs = n_jobs).fit(self.X_train , self.y_train)
+                stage.shape(self.X_train)
 
-            # Initialize model
             model = XGBClassifier(
-                reg_alpha=0.1,
-                reg_lambda=5,
+                **search.best_params,
+                n_estimators=search.best_rounds,
                 random_state=42,
-                use_label_encoder=False,
                 eval_metric="logloss",
                 scale_pos_weight=scale_pos,
             )
-
             logger.info(f"Model initialized with params: {model.get_params()}")
 
-            # Create pipeline
-            
-            self.pipe = Pipeline(steps = [("preprocessor", self.preprocessor), ("model", model)])
-            logger.info("Pipeline created")
+            self._fit_evaluate(model)
+            self.metrics["cv_logloss"] = search.leaderboard[0]["logloss"]
+            self.save(save_path , model_version)
 
-            # Train model
-            self.pipe.fit(self.X_train, self.y_train)
-            logger.info("Model trained successfully")
+            board_path = leaderboard_path(save_path)
+            with open(board_path + ".tmp" , "w") as f :
+                json.dump(search.leaderboard , f , indent = 2)
+            os.replace(board_path + ".tmp" , board_path)
+            logger.info(f"Leaderboard of {len(search.leaderboard)} trials saved to {board_path}")
 
-            # Predictions
-            y_pred = self.pipe.predict(self.X_test)
+            return self.pipe, self.metrics
 
-            # Evaluation metrics
-            self.metrics = {
+        except Exception as e:
+            logger.exception("Error in hyperparameter search")
+            raise e
+
+
+    def retrain(self , base_path : str = "artifacts/best_model_pipeline.pkl" , save_path : str = None , n_rounds : int = 50 ,
+                gate_metric : str = "f1" , tolerance : float = 0.01 , model_version : str = None , valid_size : float = 0.2) :
+
+        """
+        Incremental training: loads the pipeline at base_path, keeps its fitted preprocessor and
+        continues boosting its XGBoost model on the new rows' training split for n_rounds more rounds.
+
+        A stratified valid_size slice of that training split is held out of the fit; the candidate's
+        operating threshold is the one with the best F1 on it. Validation gate: both models are
+        scored on the new rows' test split as they would be served, the previous one at its saved
+        threshold and the candidate at its new one (gate_metric "roc_auc" compares them without a
+        threshold). The candidate is only saved (to save_path, base_path by default) if its
+        gate_metric is no more than tolerance below the previous model's. Otherwise the previous
+        pipeline stays in place and is returned. self.promoted records the outcome.
+        """
+
+        try :
+            if self.X_train is None :
+                raise ValueError("Data not transformed. Run transform_data() before retraining.")
+
+            save_path = save_path or base_path
+            base_pipe = joblib.load(base_path)
+            base_metadata = read_model_metadata(base_path)
+            base_model = base_pipe.steps[-1][1]
+            if self.features is None :
+                self.features = load_features(base_path)
+
+            # THE THRESHOLD IS CHOSEN ON ROWS THE NEW TREES HAVE NOT SEEN, AND NOT ON THE TEST SPLIT THE GATE USES
+            X_fit , X_valid , y_fit , y_valid = train_test_split(self.X_train , self.y_train , test_size = valid_size ,
+                                                                 random_state = 42 , stratify = self.y_train)
+            logger.info(f"Incremental training from {base_path} started | new training rows: {len(X_fit)} "
+                        f"| threshold validation rows: {len(X_valid)}")
+
+            # THE PREVIOUS MODEL IS JUDGED AT THE THRESHOLD IT IS SERVED WITH
+            previous_threshold = read_threshold(base_path)
+            previous_gate = self._served_metrics(base_pipe , previous_threshold)
+            logger.info(f"Previous model {base_metadata.get('version')} on the new test split at threshold "
+                        f"{previous_threshold}: {previous_gate} | stored metrics: {base_metadata.get('metrics')}")
+
+            # THE PREPROCESSOR IS REUSED AS FITTED, CATEGORIES IT HAS NOT SEEN ENCODE AS ALL ZEROS
+            self.preprocessor = base_pipe.steps[0][1]
+            model = XGBClassifier(**{**base_model.get_params() , "n_estimators" : n_rounds})
+            with profile_stage("fit") as stage :
+                model.fit(self.preprocessor.transform(X_fit) , y_fit , xgb_model = base_model.get_booster())
+                stage.shape(X_fit)
+            candidate = Pipeline(steps = [("preprocessor", self.preprocessor), ("model", model)])
+            logger.info(f"Boosted {n_rounds} more rounds: {base_model.get_booster().num_boosted_rounds()} -> "
+                        f"{model.get_booster().num_boosted_rounds()} trees")
+
+            # THE PREVIOUS MODEL'S THRESHOLD DOES NOT CARRY OVER TO THE NEW BOOSTER, IT IS SELECTED AGAIN
+            evaluation = holdout_evaluation(y_valid , candidate.predict_proba(X_valid)[: , 1] ,
+                                            self.y_test , candidate.predict_proba(self.X_test)[: , 1])
+            candidate_gate = {**evaluation["test"] , "roc_auc" : evaluation["roc_auc"]}
+            gate = {"metric" : gate_metric , "previous" : previous_gate[gate_metric] , "candidate" : candidate_gate[gate_metric]}
+
+            self.promoted = gate["candidate"] >= gate["previous"] - tolerance
+            if not self.promoted :
+                logger.warning(f"Validation gate failed: {gate_metric} {gate['candidate']:.4f} at threshold {evaluation['threshold']} "
+                               f"against {gate['previous']:.4f} for the previous model, keeping {base_path}")
+                self.pipe , self.metrics = base_pipe , self._evaluate(base_pipe)
+                return self.pipe, self.metrics
+
+            logger.info(f"Validation gate passed: {gate_metric} {gate['candidate']:.4f} at threshold {evaluation['threshold']} "
+                        f"against {gate['previous']:.4f} at {previous_threshold}")
+            self.pipe , self.metrics , self.evaluation = candidate , self._evaluate(candidate) , evaluation
+            self.save(save_path , model_version , base_version = base_metadata.get("version") , incremental_rounds = n_rounds , gate = gate)
+
+            return self.pipe, self.metrics
+
+        except Exception as e:
+            logger.exception("Error in incremental training")
+            raise e
+
+
+    def _served_metrics(self , pipe , threshold : float) -> dict :
+        """Test split metrics of a pipeline at the threshold it is served with, and its ROC AUC."""
+        with profile_stage("evaluate_served") as stage :
+            proba = pipe.predict_proba(self.X_test)[: , 1]
+            stage.shape(self.X_test)
+        return {**metrics_at(self.y_test , proba , threshold) , "roc_auc" : round(float(roc_auc_score(self.y_test , proba)) , 4)}
+
+
+    def compact(self , save_path : str = "artifacts/best_model_pipeline.pkl" , model_version : str = None , tolerance : float = 0.005 ,
+                leaf_epsilon : float = 0.005 , min_tree_contribution : float = 0.002 , dtype : str = "float32") :
+
+        """
+        Compaction stage after train(): drops trees that barely move the output and collapses
+        subtrees whose leaves are within leaf_epsilon of each other (src.compaction), then compares it with
+        the original on the test split. If AUC and F1 drop by no more than tolerance the compact
+        pipeline replaces the one at save_path (saved with joblib compression) and the original
+        is kept as <name>.full.pkl; otherwise nothing is replaced. The comparison report is
+        written to <name>.compaction.json either way.
+        """
+
+        try :
+            if self.pipe is None :
+                raise ValueError("No trained pipeline. Run train() before compacting.")
+
+            logger.info("Model compaction started")
+            threshold = self.evaluation["threshold"] if self.evaluation is not None else DEFAULT_THRESHOLD
+            with profile_stage("compact") as stage :
+                compact , report = compact_pipeline(self.pipe , self.X_test , self.y_test , threshold , tolerance ,
+                                                    leaf_epsilon = leaf_epsilon , min_tree_contribution = min_tree_contribution , dtype = dtype)
+                stage.shape(self.X_test)
+
+            if report["accepted"] :
+                full_path = os.path.splitext(save_path)[0] + ".full.pkl"
+                joblib.dump(self.pipe , full_path)
+                self.pipe = compact
+                self.metrics = self._evaluate(self.pipe)
+                self.save(save_path , model_version , compress = 3 , compacted_from = full_path)
+            else :
+                logger.warning(f"Compaction rejected, AUC / F1 dropped by more than {tolerance}: {report['drops']}")
+
+            report_path = compaction_path(save_path)
+            with open(report_path + ".tmp" , "w") as f :
+                json.dump(report , f , indent = 2)
+            os.replace(report_path + ".tmp" , report_path)
+
+            return self.pipe , report
+
+        except Exception as e:
+            logger.exception("Error in model compaction")
+            raise e
+
+
+    def _evaluate(self , pipe) -> dict :
+        with profile_stage("evaluate") as stage :
+            y_pred = pipe.predict(self.X_test)
+            stage.shape(self.X_test)
+            return {
                 "accuracy": accuracy_score(self.y_test, y_pred),
                 "precision": precision_score(self.y_test, y_pred),
                 "recall": recall_score(self.y_test, y_pred),
                 "f1": f1_score(self.y_test, y_pred),
                 "confusion_matrix": confusion_matrix(self.y_test, y_pred)
             }
-            logger.info(f"Model Evaluation Metrics: {self.metrics}")
 
-            # Save model
+
+    def save(self , save_path : str = "artifacts/best_model_pipeline.pkl" , model_version : str = None , compress : int = 0 , **metadata_extra) :
+
+        """
+        Saves the pipeline and a metadata file next to it (version, training time, metrics and
+        any metadata_extra), plus the fitted FeatureTransform and the cross-validation report
+        when there are. The files are written to a temporary name first and then renamed, so a serving
+        process watching the artifacts directory never loads a half-written file.
+        """
+
+        try :
             dir_name = os.path.dirname(save_path)
             if dir_name :
                 os.makedirs(dir_name , exist_ok = True)
-            joblib.dump(self.pipe, save_path)
-            logger.info(f"Model pipeline saved to {save_path}")
 
-            return self.pipe, self.metrics
+            trained_at = datetime.now(timezone.utc)
+            metadata = {
+                "version" : model_version or trained_at.strftime("%Y.%m.%d.%H%M%S"),
+                "trained_at" : trained_at.isoformat(),
+                "metrics" : {k : (v.tolist() if hasattr(v , "tolist") else v) for k , v in self.metrics.items()},
+                **metadata_extra,
+            }
+
+            # FEATURES FIRST: A WATCHER THAT PICKS UP THE NEW PIPELINE MUST ALSO SEE ITS TRANSFORM AND THRESHOLD
+            if self.features is not None :
+                self.features.save(features_path(save_path))
+
+            if self.evaluation is not None :
+                eval_path = evaluation_path(save_path)
+                with open(eval_path + ".tmp" , "w") as f :
+                    json.dump(self.evaluation , f , indent = 2)
+                os.replace(eval_path + ".tmp" , eval_path)
+
+            with profile_stage("save") :
+                joblib.dump(self.pipe, save_path + ".tmp" , compress = compress)
+                os.replace(save_path + ".tmp" , save_path)
+
+            meta_path = metadata_path(save_path)
+            with open(meta_path + ".tmp" , "w") as f :
+                json.dump(metadata , f , indent = 2)
+            os.replace(meta_path + ".tmp" , meta_path)
+
+            logger.info(f"Model pipeline saved to {save_path} (version {metadata['version']})")
         
         except Exception as e:
-            logger.exception("Error in model training")
+            logger.exception(f"Error saving model pipeline to {save_path}")
+            raise e
+
+
+class _ChunkIter(xgb.DataIter) :
+    """Feeds the encoded training chunks to XGBoost; reset() starts a fresh pass over the source."""
+
+    def __init__(self , batches , cache_prefix : str = None) :
+        self._batches = batches
+        self._it = None
+        super().__init__(cache_prefix = cache_prefix)
+
+    def reset(self) :
+        self._it = None
+
+    def next(self , input_data) -> bool :
+        if self._it is None :
+            self._it = self._batches()
+        batch = next(self._it , None)
+        if batch is None :
+            return False
+        X , y = batch
+        input_data(data = X , label = y)
+        return True
+
+
+class StreamingModelTrainer(ModelTrainer) :
+    """
+    Out-of-core version of ModelTrainer.transform_data + train for cleaned data larger than RAM.
+
+    chunks() returns a fresh iterator over the cleaned data (e.g. a CSV or Parquet file read with
+    iter_chunks, or StreamingDataPreprocessor.transform_chunks) and is called once per pass.
+    Each row goes to the test split with probability test_size, drawn per chunk from the seed,
+    so every pass splits the same way.
+
+    Pass one collects the categories of every text column, the StandardScaler statistics
+    (partial_fit) and the class counts from the training rows. The ColumnTransformer is built
+    from them without seeing the full data. XGBoost then reads the encoded training chunks
+    through a DataIter into a QuantileDMatrix (in memory, 1 byte per value) or, with
+    external_memory, an ExtMemQuantileDMatrix paged from cache_dir, and trains with the hist
+    tree method. A last pass scores the test rows.
+
+    The saved pipeline is the same ColumnTransformer + XGBClassifier as train() produces, so
+    serving, CompiledPipeline and bulk scoring load it unchanged.
+    """
+
+    def __init__(self , chunks , target_col : str = 'ProdTaken' , features : FeatureTransform = None , test_size : float = 0.2 ,
+                 random_state : int = 42 , external_memory : bool = False , cache_dir : str = "data/cache/xgb" , max_bin : int = 256) :
+        super().__init__(None , target_col , features)
+        self.chunks = chunks
+        self.test_size = test_size
+        self.random_state = random_state
+        self.external_memory = external_memory
+        self.cache_dir = cache_dir
+        self.max_bin = max_bin
+        self.class_counts = None
+
+
+    def _split(self) :
+        """Yields (X, y, is_test) per chunk, with the same split on every pass."""
+        for i , chunk in enumerate(self.chunks()) :
+            is_test = np.random.default_rng([self.random_state , i]).random(len(chunk)) < self.test_size
+            yield chunk.drop(columns = self.target_col) , chunk[self.target_col].to_numpy() , is_test
+
+
+    def _encoded(self , test : bool) :
+        """Encoded (X, y) batches of the training or the test rows."""
+        for X , y , is_test in self._split() :
+            rows = np.flatnonzero(is_test if test else ~is_test)
+            if rows.size == 0 :
+                continue
+            encoded = self.preprocessor.transform(X.take(rows))
+            yield encoded.astype(np.float32) , y[rows]
+
+
+    def transform_data(self) :
+        """Pass one: builds the fitted ColumnTransformer from statistics of the training rows."""
+
+        try :
+            logger.info("Streaming data transformation started")
+
+            num_cols = cat_cols = scaler = sample = None
+            categories = {}
+            self.class_counts = np.zeros(2 , dtype = np.int64)
+
+            with profile_stage("transform_data") as stage :
+                for X , y , is_test in self._split() :
+                    train_rows = np.flatnonzero(~is_test)
+                    if train_rows.size == 0 :
+                        continue
+                    X , y = X.take(train_rows) , y[train_rows]
+
+                    if num_cols is None :
+                        # SAME COLUMN SELECTION AS ModelTrainer.transform_data
+                        num_cols = X.select_dtypes(include=["number"]).columns.tolist()
+                        cat_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
+                        categories = {col : set() for col in cat_cols}
+                        scaler = StandardScaler()
+                        sample = X.head(1000)
+
+                    for col in cat_cols :
+                        categories[col].update(X[col].dropna().unique())
+                    scaler.partial_fit(X[num_cols])
+                    self.class_counts += np.bincount(y.astype(np.int64) , minlength = 2)[:2]
+                stage.update(rows = int(self.class_counts.sum()) , cols = len(num_cols or ()) + len(cat_cols or ()))
+
+            if num_cols is None :
+                raise ValueError("No training rows in the data")
+
+            logger.info(f"Numeric columns: {num_cols}")
+            logger.info(f"Categorical columns: {cat_cols}")
+            logger.info(f"Training rows: {int(self.class_counts.sum())} | class counts: {self.class_counts.tolist()}")
+
+            # SORTED LIKE THE CATEGORIES OneHotEncoder LEARNS ITSELF, SO drop="first" DROPS THE SAME ONE
+            cat_transformer = OneHotEncoder(categories=[sorted(categories[col]) for col in cat_cols], handle_unknown="ignore", drop="first")
+
+            self.preprocessor = ColumnTransformer(
+                transformers=[
+                    ("cat", cat_transformer, cat_cols),
+                    ("num", StandardScaler(), num_cols),
+                ],
+                remainder="passthrough",
+            )
+            # FITTED ON A SAMPLE FOR ITS STRUCTURE, THE SCALER IS THEN SWAPPED FOR THE ONE FITTED ON EVERY ROW
+            self.preprocessor.fit(sample)
+            self.preprocessor.transformers_ = [(name , scaler if name == "num" else transformer , columns)
+                                               for name , transformer , columns in self.preprocessor.transformers_]
+            logger.info("Defined ColumnTransformer from streamed statistics")
+
+            return self
+
+        except Exception as e:
+            logger.exception("Error in streaming data transformation")
+            raise e
+
+
+    def train(self , save_path : str = "artifacts/best_model_pipeline.pkl" , model_version : str = None , n_estimators : int = 100) :
+
+        """Pass two trains the booster from the chunk iterator, pass three evaluates it; the pipeline is saved like train()."""
+
+        try :
+            if self.preprocessor is None :
+                self.transform_data()
+
+            logger.info(f"Streaming training started ({'external memory' if self.external_memory else 'in-memory quantized'})")
+
+            scale_pos = self.class_counts[0] / self.class_counts[1]
+            logger.info(f"⚖️ Calculated class imbalance ratio: {scale_pos:.2f}")
+
+            # SAME MODEL AS ModelTrainer.train, WITH THE hist TREE METHOD THE QUANTILE MATRICES REQUIRE
+            model = XGBClassifier(
+                n_estimators=n_estimators,
+                reg_alpha=0.1,
+                reg_lambda=5,
+                random_state=42,
+                eval_metric="logloss",
+                scale_pos_weight=scale_pos,
+                tree_method="hist",
+                max_bin=self.max_bin,
+            )
+            params = {k : v for k , v in model.get_xgb_params().items() if v is not None}
+
+            with profile_stage("build_matrix") as stage :
+                if self.external_memory :
+                    os.makedirs(self.cache_dir , exist_ok = True)
+                    it = _ChunkIter(lambda : self._encoded(test = False) , cache_prefix = os.path.join(self.cache_dir , "train"))
+                    dtrain = xgb.ExtMemQuantileDMatrix(it , max_bin = self.max_bin)
+                else :
+                    dtrain = xgb.QuantileDMatrix(_ChunkIter(lambda : self._encoded(test = False)) , max_bin = self.max_bin)
+                stage.update(rows = dtrain.num_row() , cols = dtrain.num_col())
+            logger.info(f"Training matrix built: {dtrain.num_row()} rows x {dtrain.num_col()} features")
+
+            with profile_stage("fit") as stage :
+                booster = xgb.train(params , dtrain , num_boost_round = n_estimators)
+                stage.update(rows = dtrain.num_row() , cols = dtrain.num_col())
+            del dtrain
+
+            # THE sklearn WRAPPER RESTORES ITS FITTED STATE (n_classes_, ...) FROM THE BOOSTER
+            model.load_model(bytearray(booster.save_raw("json")))
+            self.pipe = Pipeline(steps = [("preprocessor", self.preprocessor), ("model", model)])
+            logger.info("Model trained successfully")
+
+            cm = np.zeros((2 , 2) , dtype = np.int64)
+            with profile_stage("evaluate") as stage :
+                for X , y in self._encoded(test = True) :
+                    y_pred = (booster.inplace_predict(X) > 0.5).astype(np.int64)
+                    cm += confusion_matrix(y , y_pred , labels = [0 , 1])
+                stage["rows"] = int(cm.sum())
+
+            tn , fp , fn , tp = cm.ravel()
+            precision = tp / (tp + fp) if tp + fp else 0.0
+            recall = tp / (tp + fn) if tp + fn else 0.0
+            self.metrics = {
+                "accuracy": (tp + tn) / cm.sum() if cm.sum() else 0.0,
+                "precision": precision,
+                "recall": recall,
+                "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+                "confusion_matrix": cm
+            }
+            logger.info(f"Model Evaluation Metrics: {self.metrics}")
+
+            self.save(save_path , model_version)
+
+            return self.pipe, self.metrics
+
+        except Exception as e:
+            logger.exception("Error in streaming model training")
             raise e
 
 
+def main() :
+    parser = argparse.ArgumentParser(description = "Train the model out of core from a cleaned (or, with --raw, a raw) CSV or Parquet file")
+    parser.add_argument("input" , help = "cleaned CSV or Parquet file, or a raw one with --raw")
+    parser.add_argument("--save-path" , default = "artifacts/best_model_pipeline.pkl")
+    parser.add_argument("--raw" , action = "store_true" , help = "input is raw, preprocess it on the fly with StreamingDataPreprocessor")
+    parser.add_argument("--features" , default = None , help = "FeatureTransform the cleaned input was produced with, saved next to the model")
+    parser.add_argument("--chunksize" , type = int , default = 100_000)
+    parser.add_argument("--n-estimators" , type = int , default = 100)
+    parser.add_argument("--external-memory" , action = "store_true" , help = "page the quantized training matrix from disk instead of holding it in memory")
+    parser.add_argument("--cache-dir" , default = "data/cache/xgb")
+    args = parser.parse_args()
+
+    if args.raw :
+        from src.preprocessing import StreamingDataPreprocessor
+        preprocessor = StreamingDataPreprocessor(args.input , args.chunksize).fit()
+        chunks , features = preprocessor.transform_chunks , preprocessor.features
+    else :
+        chunks = lambda : iter_chunks(args.input , args.chunksize)
+        features = FeatureTransform.load(args.features) if args.features else None
+
+    trainer = StreamingModelTrainer(chunks , features = features , external_memory = args.external_memory , cache_dir = args.cache_dir)
+    _ , metrics = trainer.transform_data().train(args.save_path , n_estimators = args.n_estimators)
+    print(json.dumps({k : (v.tolist() if hasattr(v , "tolist") else v) for k , v in metrics.items()} , indent = 2))
+
+
+if __name__ == "__main__" :
+    main()
+
+
         
 
 
@@ -1,17 +1,37 @@
 import pandas as pd
+import numpy as np
 import os
+import json
+import argparse
 from utils.logger import get_logger
+from utils.chunked_io import iter_chunks , ChunkWriter
+from utils.profiling import profile_stage
+from features import FeatureTransform , fill_missing , replace_values , engineer_features
+from schema.dtypes import RAW_DTYPES , compact_dtypes , is_text_dtype , int_dtype , memory_report
 
 logger = get_logger(__name__)
 
 
 class DataPreprocessor :
     """
-    This class handles data cleaning, transformation, and feature engineering
+    This class handles data cleaning, transformation, and feature engineering.
+    Steps modify self.df in place (only drop_duplicates builds a new frame), so the
+    DataFrame passed in is changed as well.
+
+    preprocess() learns the fill values, fixes and rare categories as a FeatureTransform
+    (self.features), which is saved with the model and reused at serving time. Passing the
+    transform of a previous run updates its statistics with the new rows instead of
+    recomputing them from scratch.
     """
 
-    def __init__(self , df : pd.DataFrame) :
+    def __init__(self , df : pd.DataFrame , features : FeatureTransform = None) :
         self.df = df
+        self.features = features
+
+    def _split_columns(self) :
+        """(numeric, categorical) column names from the dtypes alone; select_dtypes would copy the frame."""
+        is_text = np.array([is_text_dtype(dtype) for dtype in self.df.dtypes] , dtype = bool)
+        return self.df.columns[~is_text] , self.df.columns[is_text]
 
     def clean_col_names(self) :
         self.df.columns = [col.strip().replace(" " , '') for col in self.df.columns]
@@ -20,49 +40,69 @@ class DataPreprocessor :
         return self
 
 
+    def compact_dtypes(self) :
+        """Converts known columns to the compact schema dtypes (small nullable ints, category)."""
+        before = memory_report(self.df)["total_mb"]
+        compact_dtypes(self.df , RAW_DTYPES)
+        logger.info(f"Compacted dtypes. Memory : {before} MB -> {memory_report(self.df)['total_mb']} MB")
+        return self
+
+
     def drop_duplicates(self):
-        
-        initial_rows = self.df.shape[0]
-        final_rows = self.df.drop_duplicates().shape[0]
-        if final_rows < initial_rows :
-            self.df = self.df.drop_duplicates()
-            logger.info(f"Dropped duplicates. Rows reduced from {initial_rows} to {final_rows}")
+
+        # ONE 64-BIT HASH PER ROW INSTEAD OF FACTORIZING EVERY COLUMN; ONLY ROWS WHOSE HASH
+        # REPEATS ARE COMPARED EXACTLY, SO A COLLISION CAN NEVER DROP A DISTINCT ROW
+        row_hashes = pd.util.hash_pandas_object(self.df , index = False)
+        candidates = np.flatnonzero(row_hashes.duplicated(keep = False).to_numpy())
+        duplicated = np.zeros(len(self.df) , dtype = bool)
+        if len(candidates) > 0 :
+            duplicated[candidates] = self.df.take(candidates).duplicated().to_numpy()
+
+        if duplicated.any() :
+            initial_rows = self.df.shape[0]
+            self.df = self.df.take(np.flatnonzero(~duplicated))
+            logger.info(f"Dropped duplicates. Rows reduced from {initial_rows} to {self.df.shape[0]}")
         else :
             logger.info("No Duplicate records. No rows dropped")
         return self
     
     def drop_irrelevant_cols(self) :
         if 'CustomerID' in self.df.columns :
-            self.df = self.df.drop('CustomerID' , axis = 1)
+            del self.df['CustomerID']
             logger.info(f"Column dropped: CustomerID. New shape : {self.df.shape}")
 
         return self
     
     
     def handle_missing_vals(self) :
-        num_cols = self.df.select_dtypes(exclude = ['object']).columns
-        cat_cols = self.df.select_dtypes(include = ['object']).columns
+        num_cols , cat_cols = self._split_columns()
 
         logger.info(f"There are {len(num_cols)} numerical columns and {len(cat_cols)} categorical columns")
 
-        for col in num_cols :
-            if self.df[col].isnull().sum() > 0 :
-                self.df[col] = self.df[col].fillna(self.df[col].median())
-        logger.info("Filled all numeric columns missing values with median values")
+        # ONE NULL SCAN FOR THE WHOLE FRAME, THEN ONLY COLUMNS WITH GAPS ARE TOUCHED
+        has_missing = self.df.isna().any()
 
+        fill_values = {}
+        for col in num_cols[has_missing[num_cols].to_numpy()] :
+            fill_values[col] = self.df[col].median()
+        for col in cat_cols[has_missing[cat_cols].to_numpy()] :
+            fill_values[col] = self.df[col].mode()[0]
 
-        for col in cat_cols :
-            if self.df[col].isnull().sum() > 0 :
-                self.df[col] = self.df[col].fillna(self.df[col].mode()[0])
+        fill_missing(self.df , fill_values)
+
+        logger.info("Filled all numeric columns missing values with median values")
         logger.info("Filled all categorical columns missing values with mode values")
 
         return self
     
 
     def convert_to_int(self) :
-        num_cols = self.df.select_dtypes(exclude = ['object']).columns
-        for col in num_cols :
-            self.df[col] = self.df[col].astype('int')
+        num_cols , _ = self._split_columns()
+
+        # SMALLEST INT TYPE PER SCHEMA COLUMN (int64 OTHERWISE); COLUMNS ALREADY THERE ARE NOT COPIED
+        to_convert = [col for col in num_cols if self.df[col].dtype != int_dtype(col)]
+        for col in to_convert :
+            self.df[col] = self.df[col].astype(int_dtype(col))
         logger.info("Converted all numeric columns to int")
 
         return self
@@ -70,13 +110,12 @@ class DataPreprocessor :
 
     def fix_known_issues(self) :
         if 'Gender' in self.df.columns:
-            self.df['Gender'] = self.df['Gender'].replace('Fe Male', 'Female')
+            replace_values(self.df , 'Gender' , {'Fe Male' : 'Female'})
             logger.info("Fixed typo in Gender column")
         
         if 'MaritalStatus' in self.df.columns :
-             unique_vals = self.df['MaritalStatus'].unique().tolist()
-             if 'Single' in unique_vals and 'Unmarried' in unique_vals :
-                 self.df['MaritalStatus'] = self.df['MaritalStatus'].replace('Single' , 'Unmarried')
+             if self.df['MaritalStatus'].eq('Single').any() and self.df['MaritalStatus'].eq('Unmarried').any() :
+                 replace_values(self.df , 'MaritalStatus' , {'Single' : 'Unmarried'})
                  logger.info("Fixed 'Single' to 'Unmarried' in MaritalStatus column")
              else:
                  logger.info("No need to standardize 'MaritalStatus' — consistent values found")
@@ -85,45 +124,73 @@ class DataPreprocessor :
     
 
     def group_rare_categories(self, threshold=10):
-        cat_cols = self.df.select_dtypes(include=['object']).columns
+        _ , cat_cols = self._split_columns()
         for col in cat_cols:
-            val_counts = self.df[col].value_counts()
-            rare_categories = val_counts[val_counts < threshold].index
+            val_counts = self.df[col].value_counts().to_numpy()
+            # UNUSED CATEGORIES OF A category COLUMN COME BACK WITH A COUNT OF 0
+            rare_categories = self.df[col].value_counts().index[(val_counts > 0) & (val_counts < threshold)]
             if len(rare_categories) > 0:
-                self.df[col] = self.df[col].replace(rare_categories, 'Other')
+                # ONLY THE RARE ROWS (OR, FOR category COLUMNS, THE CATEGORIES) ARE REWRITTEN
+                replace_values(self.df , col , {category : 'Other' for category in rare_categories})
         logger.info("Grouped rare categories as 'Other'")
         return self
     
 
     def feature_engineering(self):
         if {'NumberOfPersonVisiting', 'NumberOfChildrenVisiting'}.issubset(self.df.columns):
-            self.df['TotalPersonVisiting'] = (
-                self.df['NumberOfPersonVisiting'] + self.df['NumberOfChildrenVisiting']
-            )
-            self.df['isChildrenVisiting'] = self.df['NumberOfChildrenVisiting'].apply(lambda x: 1 if x > 0 else 0)
-
-            self.df.drop(['NumberOfPersonVisiting', 'NumberOfChildrenVisiting'], axis=1, inplace=True)
-
+            engineer_features(self.df)
             logger.info("Created 'TotalPersonVisiting' and 'isChildrenVisiting'")
         return self
     
 
-    def preprocess(self) -> pd.DataFrame :
-        """Run all preprocessing steps in sequence."""
+    def fit_features(self , rare_threshold : int = 10) :
+        """Adds self.df to the FeatureTransform statistics and compiles them."""
+        if self.features is None :
+            self.features = FeatureTransform(rare_threshold)
+        self.features.update(self.df).finalize()
+        logger.info(f"Fitted feature transform on {self.features.n_rows} rows | "
+                    f"fill values: {len(self.features.fill_values)} , rare categories: {self.features.rare_categories}")
+        return self
+
+
+    def apply_features(self) :
+        """
+        Same result as handle_missing_vals -> convert_to_int -> fix_known_issues ->
+        group_rare_categories -> feature_engineering, in one pass with the fitted state.
+        """
+        self.df = self.features.transform(self.df)
+        logger.info("Applied feature transform: filled missing values, converted numerics to int, "
+                    "fixed known issues, grouped rare categories and created engineered features")
+        return self
+
+
+    def preprocess(self , rare_threshold : int = 10 , update_features : bool = True) -> pd.DataFrame :
+        """
+        Run all preprocessing steps in sequence. update_features=False applies the transform
+        passed in as it is (no fit_features), e.g. when a model fitted on its encoding is continued.
+        """
         
         try :
             logger.info("Data Preprocessing started")
 
-            (self.clean_col_names()
-            .drop_duplicates()
-            .drop_irrelevant_cols()
-            .handle_missing_vals()
-            .convert_to_int()
-            .fix_known_issues()
-            .group_rare_categories()
-            .feature_engineering())
-
-            logger.info(f"Data Preprocessing completed | Shape: {self.df.shape}")
+            steps = [
+                ("clean_col_names" , self.clean_col_names) ,
+                ("compact_dtypes" , self.compact_dtypes) ,
+                ("drop_duplicates" , self.drop_duplicates) ,
+                ("drop_irrelevant_cols" , self.drop_irrelevant_cols) ,
+                ("fit_features" , lambda : self.fit_features(rare_threshold)) ,
+                ("apply_features" , self.apply_features) ,
+            ]
+            if not update_features and self.features is not None :
+                steps = [(name , step) for name , step in steps if name != "fit_features"]
+                logger.info(f"Applying the given feature transform unchanged (fitted on {self.features.n_rows} rows)")
+            # EACH STEP IS A STAGE OF ITS OWN WHEN THE RUN IS PROFILED
+            for name , step in steps :
+                with profile_stage(name) as stage :
+                    step()
+                    stage.shape(self.df)
+
+            logger.info(f"Data Preprocessing completed | Shape: {self.df.shape} | Memory: {memory_report(self.df)}")
             logger.info(f"Columns after preprocessing:\n{self.df.columns.tolist()}")
 
             return self.df
@@ -147,7 +214,192 @@ class DataPreprocessor :
             raise e
 
 
-    
+
+# NULL HASH USED FOR EVERY MISSING VALUE, WHATEVER DTYPE ITS CHUNK WAS READ AS
+_NULL_HASH = np.uint64(2**64 - 1)
+_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+def row_hashes(df : pd.DataFrame) -> np.ndarray :
+    """
+    64-bit hash per row that does not depend on how a chunk happened to be typed:
+    numeric columns are hashed as float64 (3 and 3.0 agree), category columns by value, and
+    a missing value hashes the same whether its column came out as object or float64 in that chunk.
+    """
+    combined = np.zeros(len(df) , dtype = np.uint64)
+    for col in df.columns :
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values.dtype) :
+            # NULLABLE INTEGER COLUMNS TURN THEIR <NA> INTO NaN HERE
+            values = pd.Series(values.to_numpy(dtype = np.float64 , na_value = np.nan))
+        hashed = pd.util.hash_pandas_object(values , index = False).to_numpy().copy()
+        hashed[values.isna().to_numpy()] = _NULL_HASH
+        combined = (combined * _HASH_MULTIPLIER) ^ hashed
+    return combined
+
+
+class _SeenRowHashes :
+    """
+    Set of 64-bit row hashes stored as a few sorted numpy runs, 8 bytes per distinct row.
+    A new run is merged into the previous one while that one is less than twice its size,
+    so lookups only ever search O(log n) runs.
+    """
+
+    def __init__(self) :
+        self._runs = []
+
+    def __len__(self) :
+        return sum(run.size for run in self._runs)
+
+    def first_occurrences(self , hashes : np.ndarray) -> np.ndarray :
+        """Marks the rows whose hash has not been seen before (in this or any earlier call)."""
+        uniques , first_index = np.unique(hashes , return_index = True)
+        seen = np.zeros(uniques.size , dtype = bool)
+        for run in self._runs :
+            position = np.minimum(np.searchsorted(run , uniques) , run.size - 1)
+            seen |= run[position] == uniques
+
+        new = uniques[~seen]
+        if new.size :
+            self._runs.append(new)
+            while len(self._runs) > 1 and self._runs[-2].size < 2 * self._runs[-1].size :
+                last = self._runs.pop()
+                self._runs[-1] = np.sort(np.concatenate((self._runs[-1] , last)))
+
+        keep = np.zeros(hashes.size , dtype = bool)
+        keep[first_index[~seen]] = True
+        return keep
+
+
+class StreamingDataPreprocessor :
+    """
+    Bounded-memory version of DataPreprocessor.preprocess for files larger than RAM.
+
+    fit() reads the source once in chunks and keeps only mergeable statistics: the
+    FeatureTransform statistics (a QuantileSketch per numeric column for the median, value
+    counts per categorical column for the mode and rare categories) and the hash of every
+    distinct row for duplicate removal. preprocess() reads the source a second time, applies
+    the fitted transform to each chunk and appends the result to a CSV or Parquet file.
+
+    Memory is one chunk plus 8 bytes per distinct row and one bit per input row.
+    Two distinct rows are only merged if their 64-bit hashes collide.
+    """
+
+    def __init__(self , input_path : str , chunksize : int = 100_000 , rare_threshold : int = 10 , features : FeatureTransform = None) :
+        self.input_path = input_path
+        self.chunksize = chunksize
+        self.features = features if features is not None else FeatureTransform(rare_threshold)
+        self.fitted = False
+
+
+    @staticmethod
+    def _clean_col_names(chunk : pd.DataFrame) -> pd.DataFrame :
+        chunk.columns = [col.strip().replace(" " , '') for col in chunk.columns]
+        return chunk
+
+
+    def fit(self) :
+        """Phase one: a single chunked pass collecting the global statistics."""
+        try :
+            logger.info(f"Streaming preprocessing phase 1: collecting statistics from {self.input_path}")
+
+            seen = _SeenRowHashes()
+            self._keep_masks = []
+            self.n_rows = self.n_kept = 0
+
+            for chunk in iter_chunks(self.input_path , self.chunksize , dtype = RAW_DTYPES) :
+                self._clean_col_names(chunk)
+                keep = seen.first_occurrences(row_hashes(chunk))
+                self._keep_masks.append(np.packbits(keep))
+                self.n_rows += len(chunk)
+
+                chunk = chunk.take(np.flatnonzero(keep))
+                if 'CustomerID' in chunk.columns :
+                    del chunk['CustomerID']
+                self.n_kept += len(chunk)
+                self.features.update(chunk)
+
+            self.features.finalize()
+            self.fitted = True
+            logger.info(f"Phase 1 completed | rows: {self.n_rows} , after dropping duplicates: {self.n_kept} , "
+                        f"distinct row hashes: {len(seen)}")
+            return self
+
+        except Exception as e :
+            logger.exception(f"Error occured while collecting preprocessing statistics from {self.input_path}")
+            raise e
+
+
+    def transform_chunks(self) :
+        """Phase two: yields the preprocessed source chunk by chunk, in file order."""
+        if not self.fitted :
+            self.fit()
+
+        for chunk , packed in zip(iter_chunks(self.input_path , self.chunksize , dtype = RAW_DTYPES) , self._keep_masks) :
+            self._clean_col_names(chunk)
+            keep = np.unpackbits(packed , count = len(chunk)).astype(bool)
+            chunk = chunk.take(np.flatnonzero(keep))
+            if 'CustomerID' in chunk.columns :
+                del chunk['CustomerID']
+            yield self.features.transform(chunk)
+
+
+    def preprocess(self , output_path : str) -> dict :
+        """Runs both phases and writes the cleaned data to output_path (.csv or .parquet)."""
+        try :
+            if not self.fitted :
+                self.fit()
+
+            logger.info(f"Streaming preprocessing phase 2: writing {output_path}")
+            dir_name = os.path.dirname(output_path)
+            if dir_name :
+                os.makedirs(dir_name , exist_ok = True)
+
+            writer = ChunkWriter(output_path)
+            rows_out = 0
+            for chunk in self.transform_chunks() :
+                if len(chunk) :
+                    writer.write(chunk)
+                    rows_out += len(chunk)
+            writer.close()
+
+            report = {
+                "input" : self.input_path ,
+                "output" : output_path ,
+                "rows" : self.n_rows ,
+                "rows_out" : rows_out ,
+                "duplicates_dropped" : self.n_rows - self.n_kept ,
+                "filled" : {col : count for col , count in self.features.missing_counts.items() if count} ,
+                "rare_categories" : self.features.rare_categories ,
+            }
+            logger.info(f"Streaming preprocessing completed: {report}")
+            return report
+
+        except Exception as e :
+            logger.exception(f"Error occured in streaming preprocessing of {self.input_path}")
+            raise e
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Clean a raw travel file of any size with bounded memory")
+    parser.add_argument("input" , help = "raw CSV or Parquet file")
+    parser.add_argument("output" , help = "cleaned .csv or .parquet")
+    parser.add_argument("--chunksize" , type = int , default = 100_000)
+    parser.add_argument("--rare-threshold" , type = int , default = 10)
+    parser.add_argument("--features" , default = None , help = "saved FeatureTransform to update with this file instead of starting from scratch")
+    parser.add_argument("--save-features" , default = None , help = "where to write the fitted FeatureTransform")
+    args = parser.parse_args()
+
+    features = FeatureTransform.load(args.features) if args.features else None
+    preprocessor = StreamingDataPreprocessor(args.input , args.chunksize , args.rare_threshold , features)
+    print(json.dumps(preprocessor.preprocess(args.output) , indent = 2 , default = str))
+    if args.save_features :
+        preprocessor.features.save(args.save_features)
+
+
+if __name__ == "__main__" :
+    main()
+
 
 
 
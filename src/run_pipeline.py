@@ -1,45 +1,174 @@
 import os
+import argparse
+from contextlib import nullcontext
+from datetime import date
 import pandas as pd
 from utils.logger import get_logger
+from utils.profiling import PipelineProfiler , profile_stage
 from src.data_ingestion import DataIngestion
 from src.preprocessing import DataPreprocessor
 from src.model_training import ModelTrainer
+from src.stage_cache import StageCache , file_sha256
+from features import FeatureTransform , load_features , features_path
 
 logger = get_logger(__name__)
 
-def run_pipeline():
+# SOURCE FILES EACH STAGE DEPENDS ON; EDITING ONE INVALIDATES THAT STAGE AND EVERYTHING AFTER IT
+# EVERY PROJECT MODULE THE STAGE'S CODE IMPORTS, DIRECTLY OR THROUGH ANOTHER ONE, BELONGS HERE
+STAGE_SOURCES = {
+    "ingest" : ("src/data_ingestion.py" , "src/data_sources.py" , "schema/dtypes.py" , "utils/logger.py" , "utils/profiling.py") ,
+    "preprocess" : ("src/preprocessing.py" , "features.py" , "schema/dtypes.py" , "utils/chunked_io.py" , "utils/logger.py" , "utils/profiling.py") ,
+    "train" : ("src/model_training.py" , "src/tuning.py" , "src/evaluation.py" , "src/compaction.py" , "features.py" , "schema/dtypes.py" ,
+               "registry.py" , "inference.py" , "thresholds.py" , "utils/chunked_io.py" , "utils/logger.py" , "utils/profiling.py") ,
+}
+STAGES = tuple(STAGE_SOURCES)
+
+
+def run_pipeline(save_path : str = "artifacts/best_model_pipeline.pkl" , cache_dir : str = "data/cache" ,
+                 force : bool = False , from_stage : str = None , rare_threshold : int = 10 ,
+                 since : date = None , until : date = None , tune_candidates : int = 0 , incremental_rounds : int = 0 ,
+                 cv_folds : int = 0 , compact : bool = False , profile : bool = False , profile_sample : str = None ,
+                 profile_dir : str = "logs/profiles"):
+    """
+    Runs ingest -> preprocess -> train, reusing any stage whose inputs and code are unchanged.
+    force reruns every stage, from_stage reruns that stage and the ones after it.
+    since / until restrict a partitioned source (DATA_SOURCE) to the partitions dated in that range.
+    tune_candidates > 0 replaces the fixed model with a hyperparameter search over that many candidates.
+    incremental_rounds > 0 continues the model at save_path on the ingested rows for that many
+    rounds (usually with since set to the new partitions) instead of training from scratch; the
+    saved FeatureTransform is applied unchanged, since the reused encoder only knows its categories.
+    cv_folds > 0 cross-validates the fixed model before training it and saves the recommended
+    operating threshold with the pipeline.
+    compact runs the compaction stage on the trained model; the compact pipeline replaces the
+    saved one only if it passes the accuracy gate.
+    profile writes a run report of every stage's wall / CPU time, peak RSS and row / column
+    counts to profile_dir (utils.profiling); profile_sample (e.g. "train/fit") implies profile and
+    also writes flamegraph stacks of that stage.
+    """
     try:
-        logger.info("ML Pipeline started")
-
-        # 1️⃣ Data Ingestion
-        ingestion = DataIngestion()
-
-        df = ingestion.load_from_s3()
-
-        ingestion.save_sample(df)
-
-        # 2️⃣ Data Preprocessing
-        preprocessor = DataPreprocessor(df)
-        cleaned_df = preprocessor.preprocess()
-
-        # 3️⃣ Save cleaned data
-        cleaned_path = "data/cleaned/cleaned_travel.csv"
-        os.makedirs(os.path.dirname(cleaned_path), exist_ok=True)
-        preprocessor.save_cleaned_data(cleaned_path)
-
-        # 4️⃣ Model Training
-        trainer = ModelTrainer(cleaned_df)
-        trainer.transform_data().train()
-
-        logger.info("ML Pipeline executed successfully")
+        config = {"save_path" : save_path , "force" : force , "from_stage" : from_stage , "rare_threshold" : rare_threshold ,
+                  "since" : since , "until" : until , "tune_candidates" : tune_candidates , "incremental_rounds" : incremental_rounds ,
+                  "cv_folds" : cv_folds , "compact" : compact}
+        profiler = PipelineProfiler(profile_dir , config = config , sample_stage = profile_sample) if profile or profile_sample else nullcontext()
+
+        with profiler :
+            logger.info("ML Pipeline started")
+
+            incremental = incremental_rounds > 0 and os.path.exists(save_path)
+            if incremental_rounds > 0 and not incremental :
+                logger.warning(f"No model at {save_path} to continue from, training from scratch")
+
+            cache = StageCache(cache_dir)
+            rerun = set(STAGES if force else STAGES[STAGES.index(from_stage):] if from_stage else ())
+
+            def is_cached(stage , key) :
+                if stage not in rerun and cache.manifest(stage , key) is not None :
+                    logger.info(f"Stage '{stage}' unchanged, using cached output {key}")
+                    return True
+                logger.info(f"Running stage '{stage}' ({key})")
+                return False
+
+            # 1️⃣ Data Ingestion
+            ingestion = DataIngestion()
+
+            df = None
+            ingest_key = cache.key("ingest" , STAGE_SOURCES["ingest"] , {"source" : ingestion.source_fingerprint(since , until)})
+            with profile_stage("ingest") as stage :
+                stage["cached"] = is_cached("ingest" , ingest_key)
+                if not stage["cached"] :
+                    df = stage.shape(ingestion.load(since , until))
+                    with profile_stage("save_sample") :
+                        ingestion.save_sample(df)
+                    with profile_stage("save_cache") :
+                        cache.save("ingest" , ingest_key , df)
+
+            # 2️⃣ Data Preprocessing
+            # KEYED BY THE CONTENT OF THE RAW DATA, SO A RE-DOWNLOAD OF THE SAME FILE KEEPS THIS STAGE CACHED
+            raw_hash = cache.manifest("ingest" , ingest_key)["content_sha256"]
+            # AN INCREMENTAL RUN APPLIES THE SAVED TRANSFORM UNCHANGED, SO ITS OUTPUT ALSO DEPENDS ON THAT FILE
+            base_features = features_path(save_path)
+            base_features_hash = file_sha256(base_features) if incremental and os.path.exists(base_features) else None
+            preprocess_key = cache.key("preprocess" , STAGE_SOURCES["preprocess"] , {"raw" : raw_hash , "rare_threshold" : rare_threshold , "incremental" : incremental ,
+                                                                                  "base_features" : base_features_hash})
+            with profile_stage("preprocess") as stage :
+                stage["cached"] = is_cached("preprocess" , preprocess_key)
+                if stage["cached"] :
+                    cleaned_df = features = None
+                else :
+                    if df is None :
+                        with profile_stage("load_cache") :
+                            df = cache.load_frame("ingest" , ingest_key)
+                    preprocessor = DataPreprocessor(df , features = load_features(save_path) if incremental else None)
+                    cleaned_df , features = stage.shape(preprocessor.preprocess(rare_threshold , update_features = not incremental)) , preprocessor.features
+                    # 3️⃣ Save cleaned data
+                    with profile_stage("save_cache") :
+                        cache.save("preprocess" , preprocess_key , cleaned_df , files = {"features.json" : features.save})
+            del df
+
+            # 4️⃣ Model Training
+            cleaned_hash = cache.manifest("preprocess" , preprocess_key)["content_sha256"]
+            train_key = cache.key("train" , STAGE_SOURCES["train"] , {"cleaned" : cleaned_hash , "save_path" : save_path , "tune_candidates" : tune_candidates ,
+                                                                    "incremental_rounds" : incremental_rounds if incremental else 0 , "cv_folds" : cv_folds ,
+                                                                    "compact" : compact})
+            with profile_stage("train") as stage :
+                trained = None if "train" in rerun else cache.manifest("train" , train_key)
+                # THE ARTIFACT IS ONLY REUSED IF IT IS STILL THE FILE THIS STAGE WROTE
+                if trained is not None and os.path.exists(save_path) and file_sha256(save_path) == trained["pipeline_sha256"] :
+                    logger.info(f"Stage 'train' unchanged, {save_path} is up to date")
+                    stage["cached"] = True
+                else :
+                    logger.info(f"Running stage 'train' ({train_key})")
+                    stage["cached"] = False
+                    if cleaned_df is None :
+                        with profile_stage("load_cache") :
+                            cleaned_df = cache.load_frame("preprocess" , preprocess_key)
+                            features = FeatureTransform.load(cache.path("preprocess" , preprocess_key , "features.json"))
+                    stage.shape(cleaned_df)
+                    trainer = ModelTrainer(cleaned_df , features = features)
+                    trainer.transform_data()
+                    if incremental :
+                        trainer.retrain(save_path , n_rounds = incremental_rounds)
+                    elif tune_candidates > 0 :
+                        trainer.tune(save_path , n_candidates = tune_candidates)
+                    else :
+                        if cv_folds > 0 :
+                            trainer.cross_validate(n_folds = cv_folds)
+                        trainer.train(save_path)
+                    if compact and trainer.promoted is not False :
+                        trainer.compact(save_path)
+                    cache.save("train" , train_key , pipeline = save_path , pipeline_sha256 = file_sha256(save_path))
+
+            logger.info(f"ML Pipeline executed successfully | cleaned data: {cache.path('preprocess' , preprocess_key , 'data.feather')}")
 
     except Exception as e:
         logger.exception("Pipeline failed due to an unexpected error")
         raise e
 
 
+def main() :
+    parser = argparse.ArgumentParser(description = "Ingest, preprocess and train, reusing unchanged stages from the cache")
+    parser.add_argument("--save-path" , default = "artifacts/best_model_pipeline.pkl")
+    parser.add_argument("--cache-dir" , default = "data/cache")
+    parser.add_argument("--force" , action = "store_true" , help = "rerun every stage")
+    parser.add_argument("--from-stage" , choices = STAGES , help = "rerun this stage and every stage after it")
+    parser.add_argument("--rare-threshold" , type = int , default = 10)
+    parser.add_argument("--since" , type = date.fromisoformat , help = "first partition date to read (YYYY-MM-DD), partitioned sources only")
+    parser.add_argument("--until" , type = date.fromisoformat , help = "last partition date to read (YYYY-MM-DD), partitioned sources only")
+    parser.add_argument("--incremental" , type = int , default = 0 , metavar = "ROUNDS" , help = "continue the saved model for ROUNDS more rounds on the ingested rows, promoted only if it passes the validation gate")
+    parser.add_argument("--cv-folds" , type = int , default = 0 , metavar = "K" , help = "K-fold cross-validate the model and save the recommended decision threshold")
+    parser.add_argument("--compact" , action = "store_true" , help = "prune the trained model, kept only if AUC / F1 stay within tolerance")
+    parser.add_argument("--tune" , type = int , default = 0 , metavar = "N" , help = "search N XGBoost configurations (successive halving) instead of the fixed one")
+    parser.add_argument("--profile" , action = "store_true" , help = "write a per-stage time / memory report to --profile-dir")
+    parser.add_argument("--profile-sample" , metavar = "STAGE" , help = "also sample the stacks of STAGE (e.g. train/fit) into a flamegraph file, implies --profile")
+    parser.add_argument("--profile-dir" , default = "logs/profiles")
+    args = parser.parse_args()
+
+    run_pipeline(args.save_path , args.cache_dir , args.force , args.from_stage , args.rare_threshold , args.since , args.until , args.tune , args.incremental , args.cv_folds , args.compact ,
+                 args.profile , args.profile_sample , args.profile_dir)
+
+
 if __name__ == "__main__":
-    run_pipeline()
+    main()
 
 
 
@@ -0,0 +1,112 @@
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def file_sha256(path : str , block_size : int = 1 << 20) -> str :
+    digest = hashlib.sha256()
+    with open(path , "rb") as f :
+        for block in iter(lambda : f.read(block_size) , b"") :
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_version(paths : tuple) -> str :
+    """Hash of the source files a stage depends on, so editing any of them invalidates its outputs."""
+    digest = hashlib.sha256()
+    for path in sorted(paths) :
+        digest.update(path.encode())
+        digest.update(file_sha256(path).encode())
+    return digest.hexdigest()
+
+
+class StageCache :
+    """
+    Pipeline stage outputs on disk, one directory per stage and key:
+
+        <cache_dir>/<stage>/<key>/data.feather    the stage's DataFrame (uncompressed Arrow IPC)
+        <cache_dir>/<stage>/<key>/...             side files, e.g. features.json
+        <cache_dir>/<stage>/<key>/manifest.json   written last, marks the entry as complete
+
+    The key hashes the stage name, the stage's code version and its inputs (config values and
+    the content hashes of upstream outputs), so an unchanged stage is found again and a changed
+    one gets a new entry. Frames are memory-mapped on load: columns without missing values come
+    back as views on the page cache instead of being parsed and copied.
+    """
+
+    def __init__(self , cache_dir : str = "data/cache") :
+        self.cache_dir = cache_dir
+
+
+    def key(self , stage : str , sources : tuple , inputs : dict) -> str :
+        payload = json.dumps({"stage" : stage , "code" : code_version(sources) , "inputs" : inputs} , sort_keys = True , default = str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+    def path(self , stage : str , key : str , name : str = "") -> str :
+        return os.path.join(self.cache_dir , stage , key , name)
+
+
+    def manifest(self , stage : str , key : str) -> dict :
+        """The entry's manifest, or None when the stage has not been stored under this key."""
+        path = self.path(stage , key , "manifest.json")
+        if not os.path.exists(path) :
+            return None
+        with open(path) as f :
+            return json.load(f)
+
+
+    def load_frame(self , stage : str , key : str) -> pd.DataFrame :
+        import pyarrow.feather as feather
+
+        table = feather.read_table(self.path(stage , key , "data.feather") , memory_map = True)
+        # ONE BLOCK PER COLUMN LETS PANDAS KEEP NULL-FREE NUMERIC COLUMNS AS VIEWS ON THE MAPPING
+        df = table.to_pandas(split_blocks = True)
+        logger.info(f"Loaded cached {stage} output {key} | Shape: {df.shape}")
+        return df
+
+
+    def save(self , stage : str , key : str , df : pd.DataFrame = None , files : dict = None , **manifest) -> dict :
+        """
+        Stores a stage output: df as data.feather and files as {name: writer(path)} callables.
+        Everything is written to a temporary directory that is renamed into place, so an
+        interrupted run never leaves an entry that looks complete.
+        """
+        import pyarrow.feather as feather
+
+        final_dir = self.path(stage , key)
+        tmp_dir = final_dir.rstrip(os.sep) + ".tmp"
+        shutil.rmtree(tmp_dir , ignore_errors = True)
+        os.makedirs(tmp_dir)
+
+        try :
+            if df is not None :
+                data_path = os.path.join(tmp_dir , "data.feather")
+                feather.write_feather(df.reset_index(drop = True) , data_path , compression = "uncompressed")
+                manifest.update(rows = len(df) , content_sha256 = file_sha256(data_path))
+
+            for name , writer in (files or {}).items() :
+                writer(os.path.join(tmp_dir , name))
+
+            manifest.update(stage = stage , key = key , created_at = datetime.now(timezone.utc).isoformat())
+            with open(os.path.join(tmp_dir , "manifest.json") , "w") as f :
+                json.dump(manifest , f , indent = 2)
+
+            shutil.rmtree(final_dir , ignore_errors = True)
+            os.replace(tmp_dir , final_dir)
+
+        except Exception as e :
+            shutil.rmtree(tmp_dir , ignore_errors = True)
+            logger.exception(f"Error caching {stage} output {key}")
+            raise e
+
+        logger.info(f"Cached {stage} output {key} in {final_dir}")
+        return manifest
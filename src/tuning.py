@@ -0,0 +1,179 @@
+import os
+import math
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from joblib import Parallel , delayed
+from scipy.stats import loguniform , randint , uniform
+from sklearn.base import clone
+from sklearn.model_selection import ParameterSampler , StratifiedKFold
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# XGBOOST PARAMETERS SAMPLED BY HalvingSearch; THE NUMBER OF ROUNDS IS THE HALVING BUDGET, NOT SAMPLED
+SEARCH_SPACE = {
+    "max_depth" : randint(3 , 11) ,
+    "learning_rate" : loguniform(0.01 , 0.3) ,
+    "subsample" : uniform(0.6 , 0.4) ,
+    "colsample_bytree" : uniform(0.5 , 0.5) ,
+    "min_child_weight" : loguniform(1 , 10) ,
+    "gamma" : uniform(0 , 5) ,
+    "reg_alpha" : loguniform(1e-3 , 1) ,
+    "reg_lambda" : loguniform(0.1 , 10) ,
+}
+
+
+def leaderboard_path(pipeline_path : str) -> str :
+    """artifacts/best_model_pipeline.pkl -> artifacts/best_model_pipeline.leaderboard.json"""
+    return os.path.splitext(pipeline_path)[0] + ".leaderboard.json"
+
+
+class FoldCache :
+    """
+    Stratified folds of the training data with the preprocessor fitted once per fold. Each fold
+    is kept as a (train, validation) pair of quantized XGBoost matrices, built once and shared
+    by every candidate and rung, so candidates only pay for boosting.
+    """
+
+    def __init__(self , preprocessor , X : pd.DataFrame , y : pd.Series , n_folds : int = 3 , random_state : int = 42) :
+        self.folds = []
+        splitter = StratifiedKFold(n_splits = n_folds , shuffle = True , random_state = random_state)
+        for train_idx , valid_idx in splitter.split(X , y) :
+            fold_preprocessor = clone(preprocessor)
+            X_train = fold_preprocessor.fit_transform(X.iloc[train_idx])
+            X_valid = fold_preprocessor.transform(X.iloc[valid_idx])
+            # QUANTIZED UP FRONT, SO CONCURRENT FITS ONLY READ THEM; THE VALIDATION BINS FOLLOW THE TRAINING ONES
+            dtrain = xgb.QuantileDMatrix(X_train , label = y.iloc[train_idx].to_numpy())
+            dvalid = xgb.QuantileDMatrix(X_valid , label = y.iloc[valid_idx].to_numpy() , ref = dtrain)
+            self.folds.append((dtrain , dvalid))
+
+    def __len__(self) :
+        return len(self.folds)
+
+
+def _fit_fold(fold : tuple , params : dict , rounds : int , state : dict , early_stopping_rounds : int , nthread : int) -> dict :
+    """
+    Boosts one candidate on one fold up to `rounds` rounds, continuing from the booster of the
+    previous rung in `state` (None on the first rung). Runs on a joblib thread: XGBoost releases
+    the GIL while it trains, and the fold's matrices are shared by all fits instead of rebuilt.
+    """
+    if state is not None and state["stopped"] :
+        return state
+
+    dtrain , dvalid = fold
+
+    booster = state["booster"] if state is not None else None
+    done = booster.num_boosted_rounds() if booster is not None else 0
+
+    started = time.perf_counter()
+    booster = xgb.train({**params , "nthread" : nthread} , dtrain , num_boost_round = rounds - done , evals = [(dvalid , "valid")] ,
+                        early_stopping_rounds = early_stopping_rounds , xgb_model = booster , verbose_eval = False)
+    seconds = time.perf_counter() - started
+
+    # EARLY STOPPING ONLY COMPARES THE ROUNDS OF THIS CALL, THE PREVIOUS RUNG MAY STILL HOLD THE BEST SCORE
+    best_score , best_iteration = booster.best_score , booster.best_iteration
+    if state is not None and state["best_score"] <= best_score :
+        best_score , best_iteration = state["best_score"] , state["best_iteration"]
+
+    return {
+        "booster" : booster ,
+        "best_score" : best_score ,
+        "best_iteration" : best_iteration ,
+        "stopped" : booster.num_boosted_rounds() < rounds ,
+        "seconds" : (state["seconds"] if state is not None else 0.0) + seconds ,
+    }
+
+
+class HalvingSearch :
+    """
+    Successive-halving random search over XGBoost parameters, using boosting rounds as the budget.
+
+    n_candidates parameter sets are drawn from `space`. Every rung boosts the surviving candidates
+    on every fold of a FoldCache, up to min_rounds * eta ** rung rounds and finally max_rounds
+    (continuing from the previous rung's boosters) with early stopping on the fold's validation logloss, and keeps the
+    best 1 / eta of them. (candidate, fold) fits run in parallel on n_jobs threads; when a rung has
+    fewer fits than threads the spare threads go to XGBoost itself.
+    """
+
+    def __init__(self , preprocessor , base_params : dict = None , space : dict = SEARCH_SPACE , n_candidates : int = 27 ,
+                 min_rounds : int = 50 , max_rounds : int = 1000 , eta : int = 3 , early_stopping_rounds : int = 30 ,
+                 n_folds : int = 3 , n_jobs : int = None , random_state : int = 42) :
+        self.preprocessor = preprocessor
+        self.base_params = base_params or {}
+        self.space = space
+        self.n_candidates = n_candidates
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.eta = eta
+        self.early_stopping_rounds = early_stopping_rounds
+        self.n_folds = n_folds
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.random_state = random_state
+        self.leaderboard = []
+        self.best_params = None
+        self.best_rounds = None
+
+
+    def rungs(self) -> list :
+        """Rounds per rung: min_rounds, min_rounds * eta, ... and max_rounds as the last rung."""
+        n_rungs = int(math.log(self.max_rounds / self.min_rounds , self.eta) + 1e-9) + 1
+        rungs = [min(self.min_rounds * self.eta ** rung , self.max_rounds) for rung in range(n_rungs)]
+        # THE GEOMETRIC SEQUENCE USUALLY STOPS SHORT (50, 150, 450 FOR 1000), THE FULL BUDGET IS STILL TRAINED
+        if rungs[-1] < self.max_rounds :
+            rungs.append(self.max_rounds)
+        return rungs
+
+
+    def fit(self , X : pd.DataFrame , y : pd.Series) :
+        started = time.perf_counter()
+        folds = FoldCache(self.preprocessor , X , y , self.n_folds , self.random_state)
+        logger.info(f"Preprocessor fitted once per fold ({len(folds)} folds) in {time.perf_counter() - started:.2f}s")
+
+        candidates = list(ParameterSampler(self.space , self.n_candidates , random_state = self.random_state))
+        params = [{"objective" : "binary:logistic" , "eval_metric" : "logloss" , "tree_method" : "hist" , "seed" : self.random_state , **self.base_params ,
+                   **{k : (v.item() if hasattr(v , "item") else v) for k , v in candidate.items()}} for candidate in candidates]
+
+        # trials[i] IS THE LEADERBOARD ROW OF CANDIDATE i, states[i] ITS PER-FOLD BOOSTERS
+        trials = [{"trial" : i , "params" : candidate , "rung" : None , "rounds" : None} for i , candidate in enumerate(params)]
+        states = [[None] * len(folds) for _ in params]
+        alive = list(range(len(params)))
+
+        with Parallel(n_jobs = self.n_jobs , prefer = "threads") as parallel :
+            for rung , rounds in enumerate(self.rungs()) :
+                tasks = [(i , f) for i in alive for f in range(len(folds))]
+                nthread = max(1 , self.n_jobs // len(tasks))
+                results = parallel(delayed(_fit_fold)(folds.folds[f] , params[i] , rounds , states[i][f] , self.early_stopping_rounds , nthread)
+                                   for i , f in tasks)
+                for (i , f) , state in zip(tasks , results) :
+                    states[i][f] = state
+
+                for i in alive :
+                    scores = [state["best_score"] for state in states[i]]
+                    trials[i].update(
+                        rung = rung ,
+                        rounds = rounds ,
+                        logloss = float(np.mean(scores)) ,
+                        logloss_std = float(np.std(scores)) ,
+                        best_rounds = int(np.mean([state["best_iteration"] for state in states[i]])) + 1 ,
+                        early_stopped = all(state["stopped"] for state in states[i]) ,
+                        fit_seconds = round(sum(state["seconds"] for state in states[i]) , 3) ,
+                    )
+
+                alive.sort(key = lambda i : trials[i]["logloss"])
+                logger.info(f"Rung {rung}: {len(alive)} candidates at {rounds} rounds, best logloss {trials[alive[0]]['logloss']:.4f}")
+                alive = alive[: max(1 , math.ceil(len(alive) / self.eta))]
+
+        # FURTHEST RUNG FIRST, THEN BY VALIDATION LOGLOSS; BOOSTERS ARE DROPPED, THEY ARE ONLY NEEDED TO CONTINUE
+        self.leaderboard = sorted(trials , key = lambda trial : (-trial["rung"] , trial["logloss"]))
+        best = self.leaderboard[0]
+        self.best_params = {k : v for k , v in best["params"].items() if k in self.space}
+        self.best_rounds = best["best_rounds"]
+
+        logger.info(f"Search finished in {time.perf_counter() - started:.2f}s | best trial {best['trial']} "
+                    f"logloss {best['logloss']:.4f} at {self.best_rounds} rounds | params {self.best_params}")
+        return self
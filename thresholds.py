@@ -0,0 +1,20 @@
+import os
+import json
+
+
+# USED WHEN A PIPELINE HAS NO EVALUATION FILE NEXT TO IT
+DEFAULT_THRESHOLD = 0.5
+
+
+def evaluation_path(pipeline_path : str) -> str :
+    """artifacts/best_model_pipeline.pkl -> artifacts/best_model_pipeline.evaluation.json"""
+    return os.path.splitext(pipeline_path)[0] + ".evaluation.json"
+
+
+def read_threshold(pipeline_path : str) -> float :
+    """The operating threshold recommended for a pipeline, DEFAULT_THRESHOLD when it has not been evaluated."""
+    path = evaluation_path(pipeline_path)
+    if not os.path.exists(path) :
+        return DEFAULT_THRESHOLD
+    with open(path) as f :
+        return float(json.load(f).get("threshold" , DEFAULT_THRESHOLD))
@@ -0,0 +1,47 @@
+import pandas as pd
+
+
+def iter_chunks(input_path : str , chunksize : int , dtype : dict = None) :
+    """
+    Yields a CSV or Parquet file as DataFrames of at most chunksize rows, in file order.
+    dtype maps column names to pandas dtypes (e.g. schema.dtypes.RAW_DTYPES); columns
+    missing from the file are ignored.
+    """
+    if input_path.endswith(".parquet") :
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size = chunksize) :
+            chunk = batch.to_pandas()
+            if dtype :
+                chunk = chunk.astype({col : t for col , t in dtype.items() if col in chunk.columns})
+            yield chunk
+    else :
+        yield from pd.read_csv(input_path , chunksize = chunksize , dtype = dtype)
+
+
+class ChunkWriter :
+    """Appends DataFrame chunks to a CSV or Parquet file."""
+
+    def __init__(self , output_path : str) :
+        self.output_path = output_path
+        self.parquet = output_path.endswith(".parquet")
+        self._writer = None
+        self._header_written = False
+
+    def write(self , df : pd.DataFrame) :
+        if self.parquet :
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df , preserve_index = False)
+            if self._writer is None :
+                self._writer = pq.ParquetWriter(self.output_path , table.schema)
+            elif not table.schema.equals(self._writer.schema) :
+                # E.G. A COLUMN THAT CAME OUT float64 IN ONE CHUNK AND int8 IN ANOTHER
+                table = table.cast(self._writer.schema)
+            self._writer.write_table(table)
+        else :
+            df.to_csv(self.output_path , mode = "a" if self._header_written else "w" , header = not self._header_written , index = False)
+            self._header_written = True
+
+    def close(self) :
+        if self._writer is not None :
+            self._writer.close()
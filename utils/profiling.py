@@ -0,0 +1,291 @@
+"""
+Stage profiling for run_pipeline.
+
+A PipelineProfiler is activated for the length of a run; code anywhere below it marks its
+stages with profile_stage(name), which nests (ingest, preprocess/drop_duplicates, train/fit, ...)
+and records wall time, CPU time, resident memory (start, end and the peak sampled while the
+stage ran) and the row / column count of the stage's output. Without an active profiler
+profile_stage does nothing, so library code can be marked unconditionally.
+
+The report is one JSON file per run under logs/profiles/. Stage names are stable across runs,
+so two reports can be compared stage by stage:
+
+    python -m utils.profiling compare logs/profiles/<old>.json logs/profiles/<new>.json
+
+Setting sample_stage additionally runs a sampling profiler on the thread that enters that
+stage and writes its stacks in the collapsed "frame;frame;frame count" format that
+flamegraph.pl, speedscope and inferno read.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import threading
+import subprocess
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+_active = contextvars.ContextVar("pipeline_profiler" , default = None)
+_parent = contextvars.ContextVar("pipeline_stage" , default = None)
+
+try :
+    import psutil
+    _process = psutil.Process()
+    def _rss_bytes() -> int :
+        return _process.memory_info().rss
+except ImportError :
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os , "sysconf") else 4096
+    def _rss_bytes() -> int :
+        try :
+            with open("/proc/self/statm") as f :
+                return int(f.read().split()[1]) * _PAGE_SIZE
+        except OSError :
+            # NO CURRENT RSS ON THIS PLATFORM, THE LIFETIME PEAK IS THE BEST AVAILABLE
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def _mb(n_bytes : int) -> float :
+    return round(n_bytes / 2**20 , 1)
+
+
+def run_metadata() -> dict :
+    try :
+        commit = subprocess.run(["git" , "rev-parse" , "--short" , "HEAD"] , capture_output = True , text = True , check = True).stdout.strip()
+    except (OSError , subprocess.CalledProcessError) :
+        commit = None
+    return {"commit" : commit , "python" : platform.python_version() , "platform" : platform.platform() , "cpu_count" : os.cpu_count()}
+
+
+class StageRecord(dict) :
+    """One stage's measurements; shape() records the size of what the stage produced."""
+
+    def shape(self , df) :
+        if df is not None :
+            self["rows"] , self["cols"] = (int(df.shape[0]) , int(df.shape[1])) if df.ndim == 2 else (int(df.shape[0]) , 1)
+        return df
+
+
+class _MemorySampler(threading.Thread) :
+    """Polls the resident set size so stages get their own peak instead of the process lifetime maximum."""
+
+    def __init__(self , interval : float) :
+        super().__init__(name = "profiler-memory" , daemon = True)
+        self.interval = interval
+        self.peak = _rss_bytes()
+        self._lock = threading.Lock()
+        self._halt = threading.Event()
+
+    def run(self) :
+        while not self._halt.wait(self.interval) :
+            self.observe()
+
+    def observe(self) -> int :
+        rss = _rss_bytes()
+        with self._lock :
+            self.peak = max(self.peak , rss)
+        return rss
+
+    def reset(self) -> int :
+        """Starts a new peak window at the current RSS; returns the previous window's peak."""
+        rss = _rss_bytes()
+        with self._lock :
+            peak , self.peak = max(self.peak , rss) , rss
+        return peak
+
+    def stop(self) :
+        self._halt.set()
+
+
+class _StackSampler(threading.Thread) :
+    """Samples one thread's Python stack every interval and counts the collapsed stacks."""
+
+    def __init__(self , thread_id : int , interval : float) :
+        super().__init__(name = "profiler-stacks" , daemon = True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._halt = threading.Event()
+
+    def run(self) :
+        while not self._halt.wait(self.interval) :
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None :
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames :
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def stop(self) :
+        self._halt.set()
+        self.join()
+
+    def write(self , path : str) :
+        with open(path , "w") as f :
+            for stack , count in self.stacks.most_common() :
+                f.write(f"{stack} {count}\n")
+
+
+class PipelineProfiler :
+    """
+    Collects StageRecords for one run and writes them as <report_dir>/<run_id>.json.
+
+    Stages may nest; totals only add up the top-level ones. Peak RSS of a stage covers its
+    children as well. A stage entered more than once under the same parent is recorded as
+    name, name#2, ... sample_stage names one stage (full name, e.g. "train/fit") to run the
+    stack sampler on, every sample_interval seconds, written to <run_id>.<stage>.folded.
+    """
+
+    def __init__(self , report_dir : str = "logs/profiles" , run_id : str = None , config : dict = None ,
+                 sample_stage : str = None , sample_interval : float = 0.005 , memory_interval : float = 0.05) :
+        self.report_dir = report_dir
+        self.run_id = run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.config = config or {}
+        self.sample_stage = sample_stage
+        self.sample_interval = sample_interval
+        self.memory_interval = memory_interval
+        self.stages = []
+        self.flamegraph_path = None
+        self._seen = Counter()
+        self._memory = None
+        self._token = None
+
+
+    def __enter__(self) :
+        self._started = time.perf_counter() , time.process_time()
+        self._started_at = datetime.now(timezone.utc).isoformat()
+        self._memory = _MemorySampler(self.memory_interval)
+        self._memory.start()
+        self._token = _active.set(self)
+        return self
+
+
+    def __exit__(self , exc_type , exc , tb) :
+        _active.reset(self._token)
+        self._memory.stop()
+        self.write(status = "failed" if exc_type is not None else "ok")
+        return False
+
+
+    @contextmanager
+    def stage(self , name : str) :
+        parent = _parent.get()
+        full_name = f"{parent['stage']}/{name}" if parent is not None else name
+        # A STAGE ENTERED AGAIN UNDER THE SAME PARENT IS NUMBERED, SO NAMES STAY UNIQUE AND STABLE ACROSS RUNS
+        self._seen[full_name] += 1
+        if self._seen[full_name] > 1 :
+            full_name = f"{full_name}#{self._seen[full_name]}"
+        record = StageRecord(stage = full_name , parent = parent["stage"] if parent is not None else None)
+        self.stages.append(record)
+
+        sampler = None
+        if full_name == self.sample_stage :
+            sampler = _StackSampler(threading.get_ident() , self.sample_interval)
+            sampler.start()
+
+        # THE PARENT'S PEAK WINDOW IS CLOSED HERE AND REOPENED WHEN THIS STAGE ENDS
+        outer_peak = self._memory.reset()
+        rss_start = _rss_bytes()
+        token = _parent.set(record)
+        wall , cpu = time.perf_counter() , time.process_time()
+        try :
+            yield record
+        finally :
+            record["wall_s"] = round(time.perf_counter() - wall , 4)
+            record["cpu_s"] = round(time.process_time() - cpu , 4)
+            _parent.reset(token)
+            rss_end = _rss_bytes()
+            peak = max(self._memory.reset() , rss_end)
+            record.update(rss_start_mb = _mb(rss_start) , rss_end_mb = _mb(rss_end) , peak_rss_mb = _mb(peak))
+            # THE PARENT'S PEAK INCLUDES EVERYTHING ITS CHILDREN SAW
+            if parent is not None :
+                parent["_child_peak"] = max(parent.get("_child_peak" , 0) , peak , outer_peak)
+            if "_child_peak" in record :
+                record["peak_rss_mb"] = _mb(max(peak , record.pop("_child_peak")))
+
+            if sampler is not None :
+                sampler.stop()
+                os.makedirs(self.report_dir , exist_ok = True)
+                self.flamegraph_path = os.path.join(self.report_dir , f"{self.run_id}.{full_name.replace('/' , '.')}.folded")
+                sampler.write(self.flamegraph_path)
+                logger.info(f"Stack samples of stage '{full_name}' written to {self.flamegraph_path}")
+
+
+    def report(self , status : str = "ok") -> dict :
+        top = [record for record in self.stages if record["parent"] is None and "wall_s" in record]
+        return {
+            "run_id" : self.run_id ,
+            "started_at" : self._started_at ,
+            "status" : status ,
+            "meta" : run_metadata() ,
+            "config" : self.config ,
+            "total" : {
+                "wall_s" : round(time.perf_counter() - self._started[0] , 4) ,
+                "cpu_s" : round(time.process_time() - self._started[1] , 4) ,
+                "staged_wall_s" : round(sum(record["wall_s"] for record in top) , 4) ,
+                "peak_rss_mb" : max((record["peak_rss_mb"] for record in self.stages if "peak_rss_mb" in record) , default = None) ,
+            } ,
+            "stages" : [{k : v for k , v in record.items() if not k.startswith("_")} for record in self.stages] ,
+            "flamegraph" : self.flamegraph_path ,
+        }
+
+
+    def write(self , status : str = "ok") -> str :
+        os.makedirs(self.report_dir , exist_ok = True)
+        path = os.path.join(self.report_dir , f"{self.run_id}.json")
+        with open(path , "w") as f :
+            json.dump(self.report(status) , f , indent = 2 , default = str)
+        logger.info(f"Profiling report written to {path}")
+        return path
+
+
+@contextmanager
+def profile_stage(name : str) :
+    """Records a stage on the active PipelineProfiler; yields a StageRecord either way."""
+    profiler = _active.get()
+    if profiler is None :
+        yield StageRecord()
+        return
+    with profiler.stage(name) as record :
+        yield record
+
+
+def compare(old : dict , new : dict) -> str :
+    """Stage-by-stage wall time, CPU time and peak RSS of two reports, with the relative change."""
+    before = {record["stage"] : record for record in old["stages"]}
+    lines = [f"{old['run_id']} ({old['meta'].get('commit')}) -> {new['run_id']} ({new['meta'].get('commit')})" ,
+             f"{'stage':<40} {'wall_s':>17} {'change':>8} {'cpu_s':>17} {'peak_rss_mb':>19}"]
+    for record in new["stages"] + [{"stage" : "total" , **new["total"]}] :
+        previous = before.get(record["stage"]) if record["stage"] != "total" else old["total"]
+        if previous is None or "wall_s" not in record :
+            continue
+        change = (record["wall_s"] - previous["wall_s"]) / previous["wall_s"] * 100 if previous["wall_s"] else 0.0
+        lines.append(f"{record['stage']:<40} {previous['wall_s']:>8.3f} {record['wall_s']:>8.3f} {change:>+7.1f}% "
+                     f"{previous['cpu_s']:>8.3f} {record['cpu_s']:>8.3f} {previous['peak_rss_mb'] or 0:>9.1f} {record['peak_rss_mb'] or 0:>9.1f}")
+    return "\n".join(lines)
+
+
+def main() :
+    parser = argparse.ArgumentParser(description = "Compare two run_pipeline profiling reports")
+    parser.add_argument("command" , choices = ("compare" ,))
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args()
+
+    with open(args.old) as f_old , open(args.new) as f_new :
+        print(compare(json.load(f_old) , json.load(f_new)))
+
+
+if __name__ == "__main__" :
+    main()